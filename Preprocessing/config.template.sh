@@ -57,6 +57,98 @@ NUM_PROCESSES=""
 # Example: ERROR_LOG="./preprocessing_errors.log"
 ERROR_LOG=""
 
+# Worker pool tuning (leave empty for defaults)
+# CHUNKSIZE: volumes sent to a worker per task (default: 8)
+# MAX_TASKS_PER_CHILD: tasks before a worker is replaced (default: 200)
+# MAX_WORKER_MEMORY: per-worker memory cap in MB (default: none)
+CHUNKSIZE=""
+MAX_TASKS_PER_CHILD=""
+MAX_WORKER_MEMORY=""
+
+# Per-volume limits (leave empty for defaults)
+# VOLUME_TIMEOUT: wall-clock seconds per volume before it is quarantined (default: none)
+# QUARANTINE: list of volumes that hit a limit (default: <OUTPUT_DIR>.quarantine.jsonl)
+# RETRY_FACTOR: retry quarantined volumes one at a time with limits x this; 0 for no retry (default: 4)
+VOLUME_TIMEOUT=""
+QUARANTINE=""
+RETRY_FACTOR=""
+
+# Read input files ahead of the workers (slow or network filesystems)
+# PREFETCH_THREADS: reader threads, 0 to let workers read their own files (default: 0)
+# PREFETCH_DEPTH: files read ahead of the workers (default: 32)
+PREFETCH_THREADS=""
+PREFETCH_DEPTH=""
+
+# Stream input files a batch of pages at a time (bounds worker memory on very large volumes)
+# PAGE_BATCH: pages counted per batch, e.g. 64; 0 parses whole files (default: 0)
+PAGE_BATCH=""
+
+# Manifest of processed volumes, used by --resume
+# Leave empty for <OUTPUT_DIR>.manifest.jsonl (kept outside OUTPUT_DIR)
+# Example: MANIFEST="./preprocessing_manifest.jsonl"
+MANIFEST=""
+
+# Cached file catalog, refreshed on each run
+# Leave empty for <OUTPUT_DIR>.catalog.json (kept outside OUTPUT_DIR)
+# Example: CATALOG="./input_catalog.json"
+CATALOG=""
+
+# Time each pipeline stage per volume ("true"/"false")
+# Writes <OUTPUT_DIR>.profile.csv plus a summary of p50/p95/p99 per stage
+# Example: PROFILE="true"
+PROFILE=""
+
+# Lemma/stem lookup caches (leave empty for defaults)
+# LOOKUP_CACHE_SIZE: entries per cache in each worker, 0 to disable (default: 200000)
+# LOOKUP_SNAPSHOT: snapshot that warms the caches and is updated after each run
+#   (default: reference_data/.cache/lookup_v<N>_<hash>.pkl)
+# NO_LOOKUP_SNAPSHOT: "true" to start cold and not save a snapshot
+LOOKUP_CACHE_SIZE=""
+LOOKUP_SNAPSHOT=""
+NO_LOOKUP_SNAPSHOT=""
+
+# Number of shards for multi-node runs (used with --shard-index on the command line)
+# Example: SHARD_COUNT="16"
+SHARD_COUNT=""
+
+# Per-volume cleaning implementation: "vectorized" (default) or "pandas"
+# Both produce identical output; "pandas" is the original implementation
+# Example: ENGINE="pandas"
+ENGINE=""
+
+# How volumes are read: "direct" (default) or "htrc-features"
+# Both produce identical output
+# Example: READER="htrc-features"
+READER=""
+
+# Resolve the corpus vocabulary once before processing volumes ("true"/"false")
+# Requires the vectorized engine; output is unchanged
+# Example: TWO_PASS="true"
+TWO_PASS=""
+
+# Output format: "files" (default, one .txt per volume for mallet import-dir)
+# or "corpus" (per-worker one-document-per-line shards for mallet import-file)
+# or "archive" (per-worker rolling tar shards of .txt members, with an index)
+# Example: OUTPUT_FORMAT="corpus"
+OUTPUT_FORMAT=""
+
+# gzip-compress corpus shards, or each archive member ("true"/"false"; corpus and archive formats)
+# Example: COMPRESS="true"
+COMPRESS=""
+
+# Size in MB at which a worker starts a new archive shard (archive format; default: 1024)
+# Example: ARCHIVE_SHARD_SIZE="4096"
+ARCHIVE_SHARD_SIZE=""
+
+# Also write word:count sidecar shards ("true"/"false"; corpus format only)
+# Example: COUNTS_SIDECAR="true"
+COUNTS_SIDECAR=""
+
+# Also write a sparse doc-term matrix to <OUTPUT_DIR>.doc_term/ ("true"/"false")
+# Requires scipy
+# Example: DOC_TERM_MATRIX="true"
+DOC_TERM_MATRIX=""
+
 # ============================================================================
 # PROCESSING PARAMETERS (Read-Only)
 # ============================================================================
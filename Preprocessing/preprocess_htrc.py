@@ -11,20 +11,59 @@ Last Updated: 2025-11-01
 
 import os
 import sys
+import bz2
+import codecs
+import gzip
+import io
 import unicodedata
-import pycountry
-import pandas as pd
+import numpy as np
 from tqdm import tqdm
 import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import logging
-from htrc_features import FeatureReader
-import nltk
-from nltk.stem import WordNetLemmatizer, SnowballStemmer
-from nltk.corpus import names, stopwords
-from nltk.corpus import words as nltk_words
 import argparse
+import csv
+import heapq
+import itertools
+import json
 import re
+import signal
+import tarfile
+import time
+import hashlib
+import pickle
+from collections import OrderedDict, deque
+from dataclasses import dataclass, replace
+from multiprocessing import util as mp_util
+from importlib import metadata as importlib_metadata
+
+try:
+    import resource  # POSIX only; used for worker memory limits and RSS reporting
+except ImportError:
+    resource = None
+
+# pandas, htrc_features, NLTK and pycountry take seconds to import (NLTK
+# pulls in scipy.stats), so they are imported by import_dependencies() only
+# when processing starts; see load_processing_data() at the end of the file.
+pd = None
+pycountry = None
+nltk = None
+FeatureReader = None
+WordNetLemmatizer = SnowballStemmer = None
+names = stopwords = nltk_words = None
+
+
+def import_dependencies():
+    """Import the heavy processing dependencies into the module namespace"""
+    global pd, pycountry, nltk, FeatureReader, WordNetLemmatizer, SnowballStemmer, names, stopwords, nltk_words
+    import pandas as pd
+    import pycountry
+    import nltk
+    from htrc_features import FeatureReader
+    from nltk.stem import WordNetLemmatizer, SnowballStemmer
+    from nltk.corpus import names, stopwords
+    from nltk.corpus import words as nltk_words
 
 
 # POS tags to retain (standard practice for topic modeling)
@@ -69,10 +108,9 @@ STOPWORD_FILTERS = {
 # ============================================================================
 
 
-# Initialize lemmatizer and stemmer
-lemmatizer = WordNetLemmatizer()
-stemmer = SnowballStemmer('english')
-idx = pd.IndexSlice
+# Lemmatizer and stemmer, created by load_processing_data()
+lemmatizer = None
+stemmer = None
 
 # Character deletion (remove all non-alphabetic characters)
 non_alpha_chars = ''.join(c for c in map(chr, range(256)) if not c.isalpha())
@@ -80,11 +118,13 @@ non_alpha_translator = str.maketrans('', '', non_alpha_chars)
 
 
 # ============================================================================
-# MODULE-LEVEL DICTIONARY LOADING
+# REFERENCE DICTIONARY LOADING
 # ============================================================================
-# These dictionaries are loaded when the module is imported (not at runtime).
-# This ensures each multiprocessing worker gets its own copy of the data.
-# Dictionaries are loaded from the reference_data/ subdirectory.
+# The dictionaries are loaded by load_reference_tables() when processing
+# starts (or when the module is imported as a library), before any worker
+# is started, so forked workers inherit them. They are loaded from the
+# reference_data/ subdirectory, through the precompiled cache in
+# reference_data/.cache/ when it is current.
 # ============================================================================
 
 # Helper function for Roman numerals (needed before loading)
@@ -120,32 +160,114 @@ DEFAULT_DICT_CORRECTIONS = Path(__file__).parent / "reference_data" / "Master_Co
 DEFAULT_DICT_MA = Path(__file__).parent / "reference_data" / "MA_Dict_Final.csv"
 DEFAULT_WORLD_CITIES = Path(__file__).parent / "reference_data" / "world_cities.csv"
 
-# Load spelling corrections dictionaries
-spelling_corrections = pd.read_csv(DEFAULT_DICT_CORRECTIONS)
-spelling_corrections = spelling_corrections.rename(columns={'lemma':'orig','correct_spelling':'stand'}).set_index('orig')
-spelling_corrections_index = set(spelling_corrections.index)
+# Precompiled reference-data cache. Building the sets below (stemming the
+# ~236k NLTK words in particular) takes several seconds, and every process
+# that imports this module pays for it. The derived sets and tables are
+# pickled once under a name keyed by a hash of their sources, so later
+# imports (spawned workers, reruns, the test suite) load them in
+# milliseconds. Bump REFERENCE_CACHE_VERSION whenever the derivation changes.
+REFERENCE_CACHE_VERSION = 1
+REFERENCE_CACHE_DIR = Path(os.environ.get(
+    'HTRC_REFERENCE_CACHE_DIR', Path(__file__).parent / "reference_data" / ".cache"))
+REFERENCE_NLTK_CORPORA = ('words', 'names', 'stopwords')
 
-archaic_to_modern_dict = pd.read_csv(DEFAULT_DICT_MA)
-archaic_to_modern_dict = archaic_to_modern_dict.set_index('orig')
-archaic_words_index = set(archaic_to_modern_dict.index)
 
-# Load geographic data
-cities_df = pd.read_csv(DEFAULT_WORLD_CITIES)
-cities = set(city.lower() for city in cities_df['name'])
+def nltk_corpus_files(corpus):
+    """List the files backing an installed NLTK corpus (a directory or a .zip)"""
+    pointer = nltk.data.find(f'corpora/{corpus}')
+    if isinstance(pointer, nltk.data.ZipFilePathPointer):
+        return [Path(pointer.zipfile.filename)]
+    return sorted(path for path in Path(pointer.path).rglob('*') if path.is_file())
 
-countries = set([country.name.lower() for country in pycountry.countries])
 
-continents = set(['africa', 'asia', 'europe', 'america', 'australia', 'antartica'])
+def reference_data_fingerprint():
+    """
+    Hash everything the derived reference data depends on.
+
+    Covers the cache format version, the reference CSVs, the NLTK corpora
+    and the nltk/pycountry versions (the stemmer and country list come from
+    those packages).
+    """
+    digest = hashlib.sha256(f"v{REFERENCE_CACHE_VERSION}".encode())
+    for package in ('nltk', 'pycountry'):
+        try:
+            digest.update(f"{package}={importlib_metadata.version(package)}".encode())
+        except importlib_metadata.PackageNotFoundError:
+            digest.update(f"{package}=unknown".encode())
+    sources = [DEFAULT_DICT_CORRECTIONS, DEFAULT_DICT_MA, DEFAULT_WORLD_CITIES]
+    for corpus in REFERENCE_NLTK_CORPORA:
+        sources.extend(nltk_corpus_files(corpus))
+    for source in sources:
+        digest.update(source.name.encode())
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def reference_cache_path(fingerprint):
+    """Cache file for a given reference-data fingerprint"""
+    return REFERENCE_CACHE_DIR / f"reference_v{REFERENCE_CACHE_VERSION}_{fingerprint[:16]}.pkl"
+
+
+def build_reference_data():
+    """Load the reference CSVs and NLTK corpora and derive the lookup sets"""
+    spelling_corrections = pd.read_csv(DEFAULT_DICT_CORRECTIONS)
+    spelling_corrections = spelling_corrections.rename(columns={'lemma':'orig','correct_spelling':'stand'}).set_index('orig')
+
+    archaic_to_modern_dict = pd.read_csv(DEFAULT_DICT_MA)
+    archaic_to_modern_dict = archaic_to_modern_dict.set_index('orig')
+
+    cities_df = pd.read_csv(DEFAULT_WORLD_CITIES)
+    modern_words = set([word.lower() for word in nltk_words.words()])
+
+    return {
+        'spelling_corrections': spelling_corrections,
+        'archaic_to_modern_dict': archaic_to_modern_dict,
+        'cities': set(city.lower() for city in cities_df['name']),
+        'countries': set([country.name.lower() for country in pycountry.countries]),
+        'people_names': set([name.lower() for name in names.words()]),
+        'english_stopwords': set(stopwords.words('english')),
+        'modern_words': modern_words,
+        'stems': set([stemmer.stem(word) for word in modern_words]),
+    }
+
+
+def load_reference_data():
+    """
+    Return the derived reference data, from the cache when it is current.
+
+    On a miss the data is built and written atomically (workers may race
+    to write the same file). Set HTRC_REFERENCE_CACHE=0 to bypass the
+    cache; an unwritable cache directory only costs the rebuild.
+
+    Returns:
+        tuple: (reference data dict, whether it came from the cache)
+    """
+    if os.environ.get('HTRC_REFERENCE_CACHE', '1') == '0':
+        return build_reference_data(), False
 
-# Load NLTK data
-people_names = set([name.lower() for name in names.words()])
-english_stopwords = set(stopwords.words('english'))
-modern_words = set([word.lower() for word in nltk_words.words()])
+    cache_path = reference_cache_path(reference_data_fingerprint())
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f), True
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable reference cache {cache_path}: {e}")
 
-# Generate stems
-stems = set([stemmer.stem(word) for word in modern_words])
+    reference = build_reference_data()
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(reference, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logging.warning(f"Could not write reference cache {cache_path}: {e}")
+    return reference, False
 
-# Days and months
+
+# Fixed word lists
+continents = set(['africa', 'asia', 'europe', 'america', 'australia', 'antartica'])
 days = set(['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'])
 months = set(['jan', 'feb', 'mar', 'apr', 'may', 'jun',
              'jul', 'aug', 'sep', 'oct', 'nov', 'dec'])
@@ -153,34 +275,76 @@ months = set(['jan', 'feb', 'mar', 'apr', 'may', 'jun',
 # Generate Roman numerals (0-500)
 roman_numerals = set([int_to_roman_lowercase(i) for i in range(501)])
 
-# Stopword sets with different purposes:
-# 1. stem_validation_dict: Large reference dictionary (~500k terms) used in lemmatize_or_stem()
-#    to validate whether a stemmed form is a legitimate word (not for filtering)
-stem_validation_dict = cities.union(
-    countries, people_names, english_stopwords, modern_words,
-    continents, stems, days, months, roman_numerals
-)
-# 2. filtered_stopwords: Words to actually remove from output based on STOPWORD_FILTERS configuration
-#    Only 2 categories are filtered: english_stopwords + roman_numerals (~680 terms)
-filtered_stopwords = set()
-if STOPWORD_FILTERS.get('cities', False):
-    filtered_stopwords = filtered_stopwords.union(cities)
-if STOPWORD_FILTERS.get('countries', False):
-    filtered_stopwords = filtered_stopwords.union(countries)
-if STOPWORD_FILTERS.get('people_names', False):
-    filtered_stopwords = filtered_stopwords.union(people_names)
-if STOPWORD_FILTERS.get('english_stopwords', False):
-    filtered_stopwords = filtered_stopwords.union(english_stopwords)
-if STOPWORD_FILTERS.get('modern_words', False):
-    filtered_stopwords = filtered_stopwords.union(modern_words)
-if STOPWORD_FILTERS.get('continents', False):
-    filtered_stopwords = filtered_stopwords.union(continents)
-if STOPWORD_FILTERS.get('days_months', False):
-    filtered_stopwords = filtered_stopwords.union(days, months)
-if STOPWORD_FILTERS.get('roman_numerals', False):
-    filtered_stopwords = filtered_stopwords.union(roman_numerals)
-if STOPWORD_FILTERS.get('stems', False):
-    filtered_stopwords = filtered_stopwords.union(stems)
+# Reference tables, filled in by load_reference_tables()
+reference_data, reference_data_from_cache = None, False
+spelling_corrections = spelling_corrections_index = spelling_corrections_map = None
+archaic_to_modern_dict = archaic_words_index = archaic_to_modern_map = None
+cities = countries = people_names = english_stopwords = modern_words = stems = None
+stem_validation_dict = filtered_stopwords = None
+
+
+def load_reference_tables():
+    """Load the reference data and derive the lookup tables used by the pipeline"""
+    global reference_data, reference_data_from_cache
+    global spelling_corrections, spelling_corrections_index, spelling_corrections_map
+    global archaic_to_modern_dict, archaic_words_index, archaic_to_modern_map
+    global cities, countries, people_names, english_stopwords, modern_words, stems
+    global stem_validation_dict, filtered_stopwords
+
+    reference_data, reference_data_from_cache = load_reference_data()
+
+    # Load spelling corrections dictionaries
+    spelling_corrections = reference_data['spelling_corrections']
+    spelling_corrections_index = set(spelling_corrections.index)
+
+    archaic_to_modern_dict = reference_data['archaic_to_modern_dict']
+    archaic_words_index = set(archaic_to_modern_dict.index)
+
+    # Plain dict views of the two correction tables for the vectorized engine
+    # (dict lookups avoid a DataFrame .loc call per word)
+    spelling_corrections_map = spelling_corrections['stand'].to_dict()
+    archaic_to_modern_map = archaic_to_modern_dict['stand'].to_dict()
+
+    # Geographic data
+    cities = reference_data['cities']
+    countries = reference_data['countries']
+
+    # NLTK data
+    people_names = reference_data['people_names']
+    english_stopwords = reference_data['english_stopwords']
+    modern_words = reference_data['modern_words']
+
+    # Stems of the modern word list
+    stems = reference_data['stems']
+
+    # Stopword sets with different purposes:
+    # 1. stem_validation_dict: Large reference dictionary (~500k terms) used in lemmatize_or_stem()
+    #    to validate whether a stemmed form is a legitimate word (not for filtering)
+    stem_validation_dict = cities.union(
+        countries, people_names, english_stopwords, modern_words,
+        continents, stems, days, months, roman_numerals
+    )
+    # 2. filtered_stopwords: Words to actually remove from output based on STOPWORD_FILTERS configuration
+    #    Only 2 categories are filtered: english_stopwords + roman_numerals (~680 terms)
+    filtered_stopwords = set()
+    if STOPWORD_FILTERS.get('cities', False):
+        filtered_stopwords = filtered_stopwords.union(cities)
+    if STOPWORD_FILTERS.get('countries', False):
+        filtered_stopwords = filtered_stopwords.union(countries)
+    if STOPWORD_FILTERS.get('people_names', False):
+        filtered_stopwords = filtered_stopwords.union(people_names)
+    if STOPWORD_FILTERS.get('english_stopwords', False):
+        filtered_stopwords = filtered_stopwords.union(english_stopwords)
+    if STOPWORD_FILTERS.get('modern_words', False):
+        filtered_stopwords = filtered_stopwords.union(modern_words)
+    if STOPWORD_FILTERS.get('continents', False):
+        filtered_stopwords = filtered_stopwords.union(continents)
+    if STOPWORD_FILTERS.get('days_months', False):
+        filtered_stopwords = filtered_stopwords.union(days, months)
+    if STOPWORD_FILTERS.get('roman_numerals', False):
+        filtered_stopwords = filtered_stopwords.union(roman_numerals)
+    if STOPWORD_FILTERS.get('stems', False):
+        filtered_stopwords = filtered_stopwords.union(stems)
 
 # ============================================================================
 
@@ -272,6 +436,78 @@ For detailed documentation, see README.md
                        help='Number of CPU processes (default: auto-detect)')
     parser.add_argument('--error-log', type=Path, dest='error_log',
                        help='Error log file path (optional)')
+    parser.add_argument('--chunksize', type=int, dest='chunksize',
+                       help=f'Volumes sent to a worker per task (default: {DEFAULT_CHUNKSIZE})')
+    parser.add_argument('--max-tasks-per-child', type=int, dest='max_tasks_per_child',
+                       help=f'Tasks a worker runs before it is replaced (default: {DEFAULT_MAX_TASKS_PER_CHILD})')
+    parser.add_argument('--max-worker-memory', type=int, dest='max_worker_memory',
+                       help='Per-worker memory cap in MB; volumes exceeding it are recorded as failed')
+    parser.add_argument('--volume-timeout', type=float, dest='volume_timeout',
+                       help='Per-volume wall-clock limit in seconds; volumes that exceed it are quarantined '
+                            '(default: none)')
+    parser.add_argument('--quarantine', type=Path, dest='quarantine',
+                       help='List of volumes that hit the time or memory limit '
+                            '(default: <output>.quarantine.jsonl)')
+    parser.add_argument('--retry-factor', type=float, dest='retry_factor',
+                       help='Retry quarantined volumes one at a time with the limits multiplied by this '
+                            f'factor; 0 to skip the retry (default: {DEFAULT_RETRY_FACTOR})')
+    parser.add_argument('--engine', choices=sorted(PIPELINE_ENGINES), dest='engine',
+                       help=f'Per-volume cleaning implementation (default: {DEFAULT_ENGINE}); '
+                            'both produce identical output')
+    parser.add_argument('--reader', choices=sorted(VOLUME_READERS), dest='reader',
+                       help=f'How volumes are read (default: {DEFAULT_READER}); '
+                            'both produce identical output')
+    parser.add_argument('--prefetch-threads', type=int, dest='prefetch_threads',
+                       help='Threads reading input files ahead of the workers, for slow or network '
+                            'filesystems (default: 0, workers read their own files; direct reader only)')
+    parser.add_argument('--prefetch-depth', type=int, dest='prefetch_depth',
+                       help=f'Files read ahead of the workers with --prefetch-threads (default: {DEFAULT_PREFETCH_DEPTH})')
+    parser.add_argument('--page-batch', type=int, dest='page_batch',
+                       help='Stream each input file, counting this many pages at a time, so worker memory '
+                            f'stays bounded on very large volumes, e.g. {DEFAULT_PAGE_BATCH} '
+                            '(default: 0, parse whole files; direct reader only)')
+    parser.add_argument('--two-pass', action='store_true', dest='two_pass',
+                       help='Resolve the corpus vocabulary once before processing volumes '
+                            '(vectorized engine only)')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, dest='output_format',
+                       help=f'files: one .txt per volume (mallet import-dir); corpus: sharded '
+                            f'one-document-per-line files (mallet import-file) (default: {DEFAULT_OUTPUT_FORMAT})')
+    parser.add_argument('--compress', action='store_true',
+                       help='gzip-compress corpus and sidecar shards, or each archive member '
+                            '(corpus and archive formats)')
+    parser.add_argument('--archive-shard-size', type=int, dest='archive_shard_size',
+                       help='Size in MB at which a worker starts a new archive shard '
+                            f'(archive format; default: {DEFAULT_ARCHIVE_SHARD_SIZE})')
+    parser.add_argument('--counts-sidecar', action='store_true', dest='counts_sidecar',
+                       help='Also write word:count shards alongside the corpus (corpus format only)')
+    parser.add_argument('--doc-term-matrix', action='store_true', dest='doc_term_matrix',
+                       help='Also write a sparse document-term matrix (requires scipy) '
+                            'to <output>.doc_term/')
+    parser.add_argument('--catalog', type=Path, dest='catalog',
+                       help='Cached file catalog, refreshed on each run (default: <output>.catalog.json)')
+    parser.add_argument('--rescan', action='store_true',
+                       help='Ignore the file catalog and list every input directory')
+    parser.add_argument('--profile', action='store_true',
+                       help='Time each pipeline stage per volume; writes <output>.profile.csv and a summary')
+    parser.add_argument('--lookup-cache-size', type=int, dest='lookup_cache_size',
+                       help=f'Entries per lemma/stem lookup cache in each worker, 0 to disable '
+                            f'(default: {DEFAULT_LOOKUP_CACHE_SIZE})')
+    parser.add_argument('--lookup-snapshot', type=Path, dest='lookup_snapshot',
+                       help='Snapshot that warms the lookup caches and is updated after the run '
+                            '(default: one per reference-data version under reference_data/.cache/)')
+    parser.add_argument('--no-lookup-snapshot', action='store_true', dest='no_lookup_snapshot',
+                       help='Start with empty lookup caches and do not save them')
+    parser.add_argument('--shard-index', type=int, dest='shard_index',
+                       help='Process only this shard (0-based) of a --shard-count split, e.g. $SLURM_ARRAY_TASK_ID')
+    parser.add_argument('--shard-count', type=int, dest='shard_count',
+                       help='Split the input into this many size-balanced shards')
+    parser.add_argument('--merge-shards', action='store_true', dest='merge_shards',
+                       help='Verify that all --shard-count shards processed every volume exactly once, '
+                            'and combine their manifests')
+    parser.add_argument('--manifest', type=Path, dest='manifest',
+                       help='Manifest of processed volumes (default: <output>.manifest.jsonl)')
+    parser.add_argument('--resume', action='store_true',
+                       help='Skip volumes the manifest records as completed')
     parser.add_argument('--dry-run', action='store_true',
                        help='Show what would be processed without running')
     parser.add_argument('--verbose', '-v', action='store_true',
@@ -300,6 +536,103 @@ For detailed documentation, see README.md
             args.num_processes = int(config['NUM_PROCESSES'])
         if not args.error_log and 'ERROR_LOG' in config:
             args.error_log = Path(config['ERROR_LOG'])
+        if not args.engine and 'ENGINE' in config:
+            args.engine = config['ENGINE']
+        if not args.chunksize and 'CHUNKSIZE' in config:
+            args.chunksize = int(config['CHUNKSIZE'])
+        if not args.max_tasks_per_child and 'MAX_TASKS_PER_CHILD' in config:
+            args.max_tasks_per_child = int(config['MAX_TASKS_PER_CHILD'])
+        if not args.max_worker_memory and 'MAX_WORKER_MEMORY' in config:
+            args.max_worker_memory = int(config['MAX_WORKER_MEMORY'])
+        if args.prefetch_threads is None and 'PREFETCH_THREADS' in config:
+            args.prefetch_threads = int(config['PREFETCH_THREADS'])
+        if args.prefetch_depth is None and 'PREFETCH_DEPTH' in config:
+            args.prefetch_depth = int(config['PREFETCH_DEPTH'])
+        if args.page_batch is None and 'PAGE_BATCH' in config:
+            args.page_batch = int(config['PAGE_BATCH'])
+        if not args.volume_timeout and 'VOLUME_TIMEOUT' in config:
+            args.volume_timeout = float(config['VOLUME_TIMEOUT'])
+        if not args.quarantine and 'QUARANTINE' in config:
+            args.quarantine = Path(config['QUARANTINE'])
+        if args.retry_factor is None and 'RETRY_FACTOR' in config:
+            args.retry_factor = float(config['RETRY_FACTOR'])
+        if not args.reader and 'READER' in config:
+            args.reader = config['READER']
+        if not args.manifest and 'MANIFEST' in config:
+            args.manifest = Path(config['MANIFEST'])
+        if not args.catalog and 'CATALOG' in config:
+            args.catalog = Path(config['CATALOG'])
+        if args.lookup_cache_size is None and 'LOOKUP_CACHE_SIZE' in config:
+            args.lookup_cache_size = int(config['LOOKUP_CACHE_SIZE'])
+        if not args.lookup_snapshot and 'LOOKUP_SNAPSHOT' in config:
+            args.lookup_snapshot = Path(config['LOOKUP_SNAPSHOT'])
+        if not args.no_lookup_snapshot and 'NO_LOOKUP_SNAPSHOT' in config:
+            args.no_lookup_snapshot = config['NO_LOOKUP_SNAPSHOT'].lower() in ('1', 'true', 'yes')
+        if args.shard_count is None and 'SHARD_COUNT' in config:
+            args.shard_count = int(config['SHARD_COUNT'])
+        if not args.profile and 'PROFILE' in config:
+            args.profile = config['PROFILE'].lower() in ('1', 'true', 'yes')
+        if not args.two_pass and 'TWO_PASS' in config:
+            args.two_pass = config['TWO_PASS'].lower() in ('1', 'true', 'yes')
+        if not args.output_format and 'OUTPUT_FORMAT' in config:
+            args.output_format = config['OUTPUT_FORMAT']
+        if not args.archive_shard_size and 'ARCHIVE_SHARD_SIZE' in config:
+            args.archive_shard_size = int(config['ARCHIVE_SHARD_SIZE'])
+        if not args.compress and 'COMPRESS' in config:
+            args.compress = config['COMPRESS'].lower() in ('1', 'true', 'yes')
+        if not args.counts_sidecar and 'COUNTS_SIDECAR' in config:
+            args.counts_sidecar = config['COUNTS_SIDECAR'].lower() in ('1', 'true', 'yes')
+        if not args.doc_term_matrix and 'DOC_TERM_MATRIX' in config:
+            args.doc_term_matrix = config['DOC_TERM_MATRIX'].lower() in ('1', 'true', 'yes')
+
+    if args.engine is None:
+        args.engine = DEFAULT_ENGINE
+    elif args.engine not in PIPELINE_ENGINES:
+        parser.error(f"Unknown engine: {args.engine} (choose from {', '.join(sorted(PIPELINE_ENGINES))})")
+    if args.chunksize is None:
+        args.chunksize = DEFAULT_CHUNKSIZE
+    if args.max_tasks_per_child is None:
+        args.max_tasks_per_child = DEFAULT_MAX_TASKS_PER_CHILD
+    if args.reader is None:
+        args.reader = DEFAULT_READER
+    elif args.reader not in VOLUME_READERS:
+        parser.error(f"Unknown reader: {args.reader} (choose from {', '.join(sorted(VOLUME_READERS))})")
+    if args.retry_factor is None:
+        args.retry_factor = DEFAULT_RETRY_FACTOR
+    if args.retry_factor < 0 or (args.volume_timeout is not None and args.volume_timeout <= 0):
+        parser.error("--volume-timeout must be positive and --retry-factor 0 or more")
+    if args.prefetch_threads is None:
+        args.prefetch_threads = 0
+    if args.prefetch_depth is None:
+        args.prefetch_depth = DEFAULT_PREFETCH_DEPTH
+    if args.prefetch_threads < 0 or args.prefetch_depth < 1:
+        parser.error("--prefetch-threads must be 0 or more and --prefetch-depth at least 1")
+    if args.page_batch is None:
+        args.page_batch = 0
+    if args.page_batch < 0:
+        parser.error("--page-batch must be 0 or more")
+    if args.page_batch and args.reader != 'direct':
+        parser.error("--page-batch requires the direct reader")
+    if args.prefetch_threads and args.reader != 'direct':
+        parser.error("--prefetch-threads requires the direct reader")
+    if args.two_pass and args.engine != 'vectorized':
+        parser.error("--two-pass requires the vectorized engine")
+    if args.output_format is None:
+        args.output_format = DEFAULT_OUTPUT_FORMAT
+    elif args.output_format not in OUTPUT_FORMATS:
+        parser.error(f"Unknown output format: {args.output_format} (choose from {', '.join(OUTPUT_FORMATS)})")
+    if args.compress and args.output_format == 'files':
+        parser.error("--compress requires --output-format corpus or archive")
+    if args.counts_sidecar and args.output_format != 'corpus':
+        parser.error("--counts-sidecar requires --output-format corpus")
+    if args.archive_shard_size is None:
+        args.archive_shard_size = DEFAULT_ARCHIVE_SHARD_SIZE
+    elif args.archive_shard_size < 1:
+        parser.error("--archive-shard-size must be at least 1 MB")
+    if args.lookup_cache_size is None:
+        args.lookup_cache_size = DEFAULT_LOOKUP_CACHE_SIZE
+    elif args.lookup_cache_size < 0:
+        parser.error("--lookup-cache-size must be 0 or more")
 
 
     required = {
@@ -315,6 +648,21 @@ For detailed documentation, see README.md
             "Run with --help for more information."
         )
 
+    if args.shard_index is not None and not args.shard_count:
+        parser.error("--shard-index requires --shard-count")
+    if args.shard_index is not None and not 0 <= args.shard_index < args.shard_count:
+        parser.error(f"--shard-index must be between 0 and {args.shard_count - 1}")
+    if args.merge_shards and (not args.shard_count or args.shard_index is not None):
+        parser.error("--merge-shards requires --shard-count and no --shard-index")
+    args.shard = shard_tag(args.shard_index, args.shard_count) if args.shard_index is not None else None
+
+    if args.manifest is None:
+        args.manifest = sibling_path(args.output, '.manifest.jsonl', args.shard)
+    if args.catalog is None:
+        args.catalog = sibling_path(args.output, '.catalog.json')
+    if args.quarantine is None:
+        args.quarantine = sibling_path(args.output, '.quarantine.jsonl', args.shard)
+
     return args
 
 
@@ -338,16 +686,11 @@ def validate_environment(args):
 
     print("Validating environment...")
 
-    # Check input directory exists and has files
-    if not args.input.exists():
+    # Check input directory exists (its files are counted by the single scan in step 1)
+    if not args.input.is_dir():
         errors.append(f"Input directory does not exist: {args.input}")
     else:
-        # Check for .json.bz2 files
-        json_files = list(args.input.rglob('*.json.bz2'))
-        if not json_files:
-            errors.append(f"No .json.bz2 files found in: {args.input}")
-        else:
-            print(f"  [OK] Found {len(json_files)} .json.bz2 files in input directory")
+        print(f"  [OK] Input directory exists")
 
     # Check output directory
     if args.output.exists() and not args.dry_run:
@@ -368,6 +711,12 @@ def validate_environment(args):
         print("  [OK] All required Python libraries are installed")
     except ImportError as e:
         errors.append(f"Required library not installed: {e}")
+    if args.doc_term_matrix:
+        try:
+            import scipy
+            print("  [OK] scipy is installed (needed for --doc-term-matrix)")
+        except ImportError:
+            errors.append("--doc-term-matrix requires scipy\n    Install with: pip install scipy")
 
     # Check NLTK data
     nltk_data_required = ['words', 'names', 'stopwords', 'wordnet']
@@ -420,6 +769,34 @@ def print_configuration(args):
 
     if args.error_log:
         print(f"  Error Log:            {args.error_log}")
+    if args.shard:
+        print(f"  Shard:                {args.shard_index} of {args.shard_count} ({args.shard})")
+    elif args.merge_shards:
+        print(f"  Merging Shards:       {args.shard_count}")
+    print(f"  Manifest:             {args.manifest}{' (resuming)' if args.resume else ''}")
+    print(f"  File Catalog:         {args.catalog}{' (full rescan)' if args.rescan else ''}")
+    if args.doc_term_matrix:
+        print(f"  Doc-Term Matrix:      {sibling_path(args.output, '.doc_term')}")
+    if args.profile:
+        print(f"  Profile:              {sibling_path(args.output, '.profile.csv', args.shard)}")
+    print(f"  Engine:               {args.engine}{' (two-pass)' if args.two_pass else ''}")
+    print(f"  Reader:               {args.reader}")
+    print(f"  Output Format:        {args.output_format}"
+          f"{' (gzip)' if args.compress else ''}{' + word:count sidecar' if args.counts_sidecar else ''}")
+    print(f"  Pool:                 chunksize {args.chunksize}, worker recycled every "
+          f"{args.max_tasks_per_child} tasks"
+          f"{f', memory cap {args.max_worker_memory} MB' if args.max_worker_memory else ''}"
+          f"{f', {args.volume_timeout:g} s per volume' if args.volume_timeout else ''}")
+    if args.volume_timeout or args.max_worker_memory:
+        print(f"  Quarantine:           {args.quarantine} (retry with limits x{args.retry_factor:g})"
+              if args.retry_factor else f"  Quarantine:           {args.quarantine} (no retry)")
+    if args.prefetch_threads:
+        print(f"  Prefetch:             {args.prefetch_threads} threads, {args.prefetch_depth} files ahead")
+    if args.page_batch:
+        print(f"  Streaming Reads:      {args.page_batch} pages per batch")
+    print(f"  Lookup Caches:        {args.lookup_cache_size} entries per worker"
+          f"{'' if args.lookup_cache_size else ' (disabled)'}"
+          f"{' (no snapshot)' if args.no_lookup_snapshot else ''}")
 
     print("\nProcessing Parameters (FIXED FOR REPLICATION):")
     print(f"  POS Tags:             {len(POS_TAGS)} tags")
@@ -432,11 +809,11 @@ def print_configuration(args):
 
 
 def validate_reference_data(args):
-    """Validate that reference data was loaded successfully at module import time"""
+    """Validate that reference data was loaded successfully by load_processing_data()"""
     print("Validating reference data...")
 
     try:
-        # Check that dictionaries were loaded (they load at import time)
+        # Check that dictionaries were loaded
         if spelling_corrections is None or len(spelling_corrections) == 0:
             logging.error("Spelling corrections not loaded")
             sys.exit(1)
@@ -455,34 +832,158 @@ def validate_reference_data(args):
         print(f"  [OK] Reference dictionary for stem validation: {len(stem_validation_dict)} terms")
         enabled_filters = sum(1 for v in STOPWORD_FILTERS.values() if v)
         print(f"  [OK] Stopwords filtered from output: {len(filtered_stopwords)} terms ({enabled_filters} of {len(STOPWORD_FILTERS)} categories: english_stopwords + roman_numerals)")
+        if reference_data_from_cache:
+            print(f"  [OK] Reference data loaded from cache ({REFERENCE_CACHE_DIR})")
+        else:
+            print(f"  [OK] Reference data built from source files")
 
     except Exception as e:
         logging.error(f"Error validating reference data: {e}")
         sys.exit(1)
 
 
-def scan_htrc_files(input_path: Path) -> pd.DataFrame:
+def htid_from_filename(filename):
+    """HathiTrust ID encoded in an Extracted Features filename"""
+    return filename.replace(".json.bz2","").replace("+",":").replace(",",".").replace("=", "/")
+
+
+def sibling_path(output_path, suffix, shard=None):
+    """
+    Path of a run file next to (not inside) the output directory.
+
+    The manifest, catalog, summary and other run files are named after the
+    output directory (<output>[.<shard>]<suffix>) and kept beside it, so
+    `mallet import-dir` never sees them; with a shard tag each shard gets
+    its own file.
+    """
+    return output_path.parent / f"{output_path.name}{f'.{shard}' if shard else ''}{suffix}"
+
+
+# ============================================================================
+# CORPUS CATALOG
+# ============================================================================
+# The input tree is scanned in a single os.scandir pass, with the top-level
+# directories scanned in parallel threads (the work is metadata I/O, which
+# releases the GIL). The result is saved as a catalog of every directory's
+# .json.bz2 files with their size and mtime. On the next run a directory
+# whose own mtime is unchanged is taken from the catalog without being
+# listed: adding, removing or renaming a file always changes the mtime of
+# its directory. Files rewritten in place keep their directory's mtime, so
+# use --rescan after modifying volumes.
+# ============================================================================
+
+CATALOG_VERSION = 1
+DEFAULT_SCAN_THREADS = 16
+
+
+def load_catalog(catalog_path, root):
+    """Directory entries of a saved catalog, or {} if it is missing, stale or for another input"""
+    try:
+        with open(catalog_path, 'r', encoding='utf8') as f:
+            catalog = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if catalog.get('version') != CATALOG_VERSION or catalog.get('root') != root:
+        return {}
+    return catalog['directories']
+
+
+def save_catalog(catalog_path, root, directories):
+    """Write the catalog atomically"""
+    Path(catalog_path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = Path(f"{catalog_path}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf8') as f:
+        # json.dumps uses the C encoder; json.dump would stream through the pure-Python one
+        f.write(json.dumps({'version': CATALOG_VERSION, 'root': root, 'directories': directories}))
+    os.replace(tmp_path, catalog_path)
+
+
+def scan_directory(root, rel, previous):
+    """
+    Catalog one directory, reusing its previous entry if its mtime is unchanged.
+
+    Returns:
+        dict: {'mtime': ns, 'subdirs': [names], 'files': [[name, size, mtime], ...]}
+    """
+    path = os.path.join(root, rel) if rel else root
+    mtime = os.stat(path).st_mtime_ns
+    entry = previous.get(rel)
+    if entry is not None and entry['mtime'] == mtime:
+        return entry
+    subdirs, files = [], []
+    with os.scandir(path) as it:
+        for item in it:
+            if item.is_dir(follow_symlinks=False):
+                subdirs.append(item.name)
+            elif '.json.bz2' in item.name:
+                stat = item.stat()
+                files.append([item.name, stat.st_size, stat.st_mtime])
+    return {'mtime': mtime, 'subdirs': sorted(subdirs), 'files': sorted(files)}
+
+
+def scan_tree(root, rel, previous):
+    """Catalog a directory and everything below it; returns {relative path: entry}"""
+    directories = {}
+    stack = [rel]
+    while stack:
+        rel = stack.pop()
+        entry = directories[rel] = scan_directory(root, rel, previous)
+        stack.extend(os.path.join(rel, name) for name in entry['subdirs'])
+    return directories
+
+
+def catalog_files(input_path: Path, catalog_path=None, threads=DEFAULT_SCAN_THREADS, rescan=False):
+    """
+    List the .json.bz2 files under input_path, refreshing the catalog.
+
+    Needs no processing dependencies, so --dry-run can use it directly.
+
+    Returns:
+        list: [htid, filename, directory, size, mtime] rows sorted by path
+    """
+    root = str(input_path)
+    catalog_root = os.path.abspath(root)
+    previous = load_catalog(catalog_path, catalog_root) if catalog_path and not rescan else {}
+    print(f"Scanning: {input_path}{' (refreshing catalog)' if previous else ''}")
+
+    directories = {'': scan_directory(root, '', previous)}
+    top_level = directories['']['subdirs']
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        futures = [executor.submit(scan_tree, root, name, previous) for name in top_level]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Scanning directories", unit=" dirs"):
+            directories.update(future.result())
+
+    unchanged = len(directories) == len(previous) and all(
+        entry is previous.get(rel) for rel, entry in directories.items())
+    if catalog_path and not unchanged:
+        try:
+            save_catalog(catalog_path, catalog_root, directories)
+        except OSError as e:
+            logging.warning(f"Could not write file catalog {catalog_path}: {e}")
+
+    rows = [[htid_from_filename(name), name, os.path.join(root, rel) if rel else root, size, mtime]
+            for rel, entry in directories.items() for name, size, mtime in entry['files']]
+    rows.sort(key=lambda row: (row[2], row[1]))
+    return rows
+
+
+def scan_htrc_files(input_path: Path, catalog_path=None, threads=DEFAULT_SCAN_THREADS,
+                    rescan=False) -> 'pd.DataFrame':
     """
     Generate a DataFrame of HTRC Extracted Features files.
 
     Args:
         input_path: Directory containing .json.bz2 files
+        catalog_path: Catalog to refresh and save (None to scan without one)
+        threads: Top-level directories scanned concurrently
+        rescan: Ignore the saved catalog and list every directory
 
     Returns:
-        pd.DataFrame: A DataFrame with columns 'HTID', 'Filename', and 'Path', indexed by 'HTID'.
-    """
-    def generate_files():
-        total_files = sum(len(files) for _, _, files in os.walk(input_path))
-        print(f"Scanning: {input_path}")
-        with tqdm(total=total_files, desc="Scanning files", unit=" files") as pbar:
-            for r, d, f in os.walk(input_path):
-                for file in f:
-                    if '.json.bz2' in file:
-                        htid = file.replace(".json.bz2","").replace("+",":").replace(",",".").replace("=", "/")
-                        yield [htid, file, r]
-                    pbar.update(1)
-
-    htrc_files = pd.DataFrame(generate_files(), columns=["HTID", "Filename", "Path"]).set_index('HTID')
+        pd.DataFrame: A DataFrame with columns 'HTID', 'Filename', 'Path', 'Size' and 'Mtime',
+        indexed by 'HTID' and sorted by path.
+    """
+    rows = catalog_files(input_path, catalog_path, threads, rescan)
+    htrc_files = pd.DataFrame(rows, columns=["HTID", "Filename", "Path", "Size", "Mtime"]).set_index('HTID')
     return htrc_files
 
 
@@ -495,33 +996,558 @@ def getFeatureReader(final_ids):
     return corpus
 
 
-def lemmatize_or_stem(cleaned):
-    """Lemmatize or stem a word based on POS tag"""
-    if cleaned[1].startswith('N'):
-        lemmatized = lemmatizer.lemmatize(cleaned[0], 'n')
-    elif cleaned[1].startswith('V'):
-        lemmatized = lemmatizer.lemmatize(cleaned[0], 'v')
-    elif cleaned[1].startswith('J'):
-        lemmatized = lemmatizer.lemmatize(cleaned[0], 'a')
-    elif cleaned[1].startswith('R'):
-        lemmatized = lemmatizer.lemmatize(cleaned[0], 'r')
+# ============================================================================
+# DIRECT EXTRACTED FEATURES READER
+# ============================================================================
+# Reads body token counts straight from the .json.bz2 file instead of going
+# through htrc_features, which builds a page/section/token/POS DataFrame for
+# the whole volume before the pipeline folds it back down.
+# ============================================================================
+
+# htrc_features stores tokens in a fixed-width numpy 'U64' field, which cuts
+# longer tokens to 64 characters and drops trailing NULs; the direct reader
+# does the same so that both readers produce identical counts.
+EF_TOKEN_WIDTH = 64
+
+
+class ExtractedFeaturesVolume:
+    """Body token counts of one volume, as read by read_extracted_features()"""
+
+    def __init__(self, htid, tokens, pos_tags, counts):
+        self.id = htid
+        self.tokens = tokens
+        self.pos_tags = pos_tags
+        self.counts = counts
+
+    def tokenlist(self, pages=False, case=False, section='body'):
+        """Same layout as htrc_features Volume.tokenlist(pages=False, case=False, section='body')"""
+        if pages or case or section != 'body':
+            raise ValueError("Only folded, lowercased body token counts are available")
+        index = pd.MultiIndex.from_arrays(
+            [np.full(len(self.tokens), 'body', dtype=object), self.tokens, self.pos_tags],
+            names=['section', 'lowercase', 'pos'])
+        return pd.DataFrame({'count': self.counts}, index=index)
+
+
+def count_page_tokens(pages, counts, pos_tags=POS_TAGS):
+    """
+    Add the body (lowercase token, POS) counts of pages to counts.
+
+    Returns:
+        bool: Whether any page has tokens in any section
+    """
+    has_tokens = False
+    for page in pages:
+        for section in ('header', 'body', 'footer'):
+            if page.get(section) and page[section]['tokenPosCount']:
+                has_tokens = True
+        body = page.get('body')
+        if body is None:
+            continue
+        for token, pos_counts in body['tokenPosCount'].items():
+            lowercase = None
+            for pos, count in pos_counts.items():
+                if pos not in pos_tags:
+                    continue
+                if lowercase is None:
+                    lowercase = token[:EF_TOKEN_WIDTH].rstrip('\x00').lower()
+                key = (lowercase, pos)
+                counts[key] = counts.get(key, 0) + count
+    return has_tokens
+
+
+def read_extracted_features(path, pos_tags=POS_TAGS, data=None, page_batch=None):
+    """
+    Read an Extracted Features .json.bz2 file into lowercase (token, POS) body counts.
+
+    Page-level counts are summed as they are read and POS tags outside
+    pos_tags are skipped, so no per-page DataFrame is ever built.
+
+    Args:
+        path: Path to a .json.bz2 file
+        pos_tags: POS tags to keep
+        data: The file's compressed bytes, if already read (see prefetch_files())
+        page_batch: Stream the file this many pages at a time (see
+            stream_extracted_features()); 0 parses it whole, None uses the
+            worker's --page-batch setting
+
+    Returns:
+        ExtractedFeaturesVolume: Counts sorted by (token, POS), as uint32
+    """
+    if page_batch is None:
+        page_batch = page_batch_size
+    if page_batch:
+        return stream_extracted_features(path, pos_tags, data, page_batch)
+
+    if data is not None:
+        obj = json.loads(bz2.decompress(data))
     else:
-        lemmatized = lemmatizer.lemmatize(cleaned[0])
+        with bz2.open(path, 'rb') as f:
+            obj = json.load(f)
+
+    counts = {}
+    has_tokens = count_page_tokens(obj['features']['pages'], counts, pos_tags)
+    return counted_volume(obj.get('htid') or obj.get('id'), counts, has_tokens)
+
+
+def counted_volume(htid, counts, has_tokens):
+    """Build an ExtractedFeaturesVolume from (token, POS) -> count"""
+    if not has_tokens:
+        # htrc_features cannot build a tokenlist for a volume with no tokens at all
+        raise ValueError(f"No tokens in volume {htid}")
+
+    keys = sorted(counts)
+    return ExtractedFeaturesVolume(
+        htid,
+        np.array([token for token, _ in keys], dtype=object),
+        np.array([pos for _, pos in keys], dtype=object),
+        np.array([counts[key] for key in keys], dtype=np.uint32))
+
+
+# ============================================================================
+# STREAMING READER
+# ============================================================================
+# json.load() holds the whole decompressed document and every parsed page of
+# a volume at once, which for the largest volumes (thousands of pages) is
+# what sets a worker's peak memory. With --page-batch N the direct reader
+# instead decompresses the file incrementally, parses one page object at a
+# time and folds every N pages into the running (token, POS) counter, so
+# memory is bounded by N pages plus one read buffer. Counts are summed in
+# the same order as the whole-volume path, so output is identical.
+# ============================================================================
+
+DEFAULT_PAGE_BATCH = 64
+STREAM_CHUNK_SIZE = 1 << 20  # decompressed bytes per read
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+JSON_NUMBER_TAIL = re.compile(r'[-+.eE0-9]*')
+json_decoder = json.JSONDecoder()
+
+# Pages per batch in this process (0 = parse whole files), set by init_worker()
+page_batch_size = 0
+
+
+class JSONStream:
+    """
+    Incremental reader of one JSON document from a binary file.
+
+    Walks objects and arrays with members() and elements() and parses every
+    other value whole with value(), keeping only the unread part of the
+    current chunk in memory.
+    """
+
+    def __init__(self, f, chunk_size=STREAM_CHUNK_SIZE):
+        self.file = f
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Append the next chunk to the unread part of the buffer"""
+        chunk = self.file.read(self.chunk_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.pos:] + self.decoder.decode(chunk, final=self.eof)
+        self.pos = 0
+
+    def peek(self):
+        """Next non-whitespace character"""
+        while True:
+            self.pos = JSON_WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                raise ValueError("Unexpected end of JSON document")
+            self.fill()
+
+    def expect(self, characters):
+        """Consume one of characters and return it"""
+        character = self.peek()
+        if character not in characters:
+            raise ValueError(f"Expected one of {characters!r} in JSON document, found {character!r}")
+        self.pos += 1
+        return character
+
+    def value(self):
+        """Parse the next value whole"""
+        self.peek()
+        while True:
+            try:
+                value, end = json_decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A number followed by nothing but number characters up to the end of
+                # the buffer ('1e' of '1e-07') may continue in the next chunk
+                if self.eof or JSON_NUMBER_TAIL.match(self.buffer, end).end() < len(self.buffer):
+                    self.pos = end
+                    return value
+            self.fill()
+
+    def members(self):
+        """Keys of the object that starts here; read each value before asking for the next key"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+    def elements(self):
+        """Values of the array that starts here, parsed one at a time"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+def stream_extracted_features(path, pos_tags=POS_TAGS, data=None, page_batch=DEFAULT_PAGE_BATCH):
+    """
+    Read an Extracted Features .json.bz2 file page_batch pages at a time.
+
+    Same arguments and result as read_extracted_features(), which calls it
+    when page_batch is set.
+    """
+    counts, fields = {}, {}
+    has_tokens = False
+    with bz2.open(io.BytesIO(data) if data is not None else path, 'rb') as f:
+        stream = JSONStream(f)
+        for key in stream.members():
+            if key != 'features':
+                value = stream.value()
+                if key in ('htid', 'id'):
+                    fields[key] = value
+                continue
+            for feature in stream.members():
+                if feature != 'pages':
+                    stream.value()
+                    continue
+                batch = []
+                for page in stream.elements():
+                    batch.append(page)
+                    if len(batch) == page_batch:
+                        has_tokens |= count_page_tokens(batch, counts, pos_tags)
+                        batch = []
+                has_tokens |= count_page_tokens(batch, counts, pos_tags)
+    return counted_volume(fields.get('htid') or fields.get('id'), counts, has_tokens)
+
+
+def read_with_feature_reader(path):
+    """Load a volume through htrc_features"""
+    return FeatureReader([path]).first()
+
+
+# Ways of loading a volume from its file path (--reader)
+VOLUME_READERS = {
+    'htrc-features': read_with_feature_reader,
+    'direct': read_extracted_features,
+}
+DEFAULT_READER = 'direct'
+
+
+# ============================================================================
+# I/O PREFETCH
+# ============================================================================
+# On network filesystems a worker that opens and reads its own .json.bz2
+# leaves its core idle for the duration of the read. With --prefetch-threads
+# the parent reads the raw compressed bytes of upcoming volumes in a thread
+# pool, up to --prefetch-depth files ahead of the volumes handed to the
+# pool, and workers only decompress and process them. Requires the direct
+# reader (htrc_features opens files itself).
+# ============================================================================
+
+DEFAULT_PREFETCH_DEPTH = 32
 
-    if lemmatized == cleaned[0]:
-        lemmatized = lemmatizer.lemmatize(cleaned[0])  # Try without POS
 
-    if lemmatized == cleaned[0]:
-        stem = stemmer.stem(cleaned[0])  # Try stemming
+def read_file_bytes(path):
+    """Raw contents of a file and the seconds it took to read them"""
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        data = f.read()
+    return data, time.perf_counter() - start
+
+
+def prefetch_files(paths, threads, depth=DEFAULT_PREFETCH_DEPTH, stats=None):
+    """
+    Yield (path, compressed bytes, read seconds) for each path, in order.
+
+    Reads run in a pool of threads and at most depth files are held ahead
+    of the consumer. A file that cannot be read is yielded with data None,
+    so that the worker reads it itself and records the error.
+
+    stats, if given, is updated with 'io_seconds' (summed read time),
+    'io_wait_seconds' (time the consumer waited for a read to finish, i.e.
+    the run was I/O bound) and 'io_bytes'.
+    """
+    stats = stats if stats is not None else {}
+    for key in ('io_seconds', 'io_wait_seconds', 'io_bytes'):
+        stats.setdefault(key, 0)
+
+    def take(pending):
+        path, future = pending.popleft()
+        start = time.perf_counter()
+        try:
+            data, seconds = future.result()
+        except OSError as e:
+            logging.warning(f"Prefetch of {path} failed: {e}")
+            data, seconds = None, 0.0
+        stats['io_wait_seconds'] += time.perf_counter() - start
+        stats['io_seconds'] += seconds
+        stats['io_bytes'] += len(data) if data is not None else 0
+        return path, data, seconds
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = deque()
+        for path in paths:
+            pending.append((path, executor.submit(read_file_bytes, path)))
+            if len(pending) >= max(depth, 1):
+                yield take(pending)
+        while pending:
+            yield take(pending)
+
+
+def volume_token_arrays(volume):
+    """Body (lowercase token, POS, count) arrays of a volume from either reader"""
+    if isinstance(volume, ExtractedFeaturesVolume):
+        return volume.tokens, volume.pos_tags, volume.counts
+    token_list = volume.tokenlist(pages=False, case=False, section='body')
+    token_list.index = token_list.index.droplevel(0)
+    return (token_list.index.get_level_values(0),
+            token_list.index.get_level_values(1),
+            token_list['count'].to_numpy())
+
+
+# ============================================================================
+# LOOKUP CACHES
+# ============================================================================
+# lemmatize_or_stem() can call WordNet up to three times and the Snowball
+# stemmer once per (word, POS) pair, and stem() stems every lemma again.
+# Both are pure functions of their arguments over a Zipfian vocabulary, so
+# each process keeps a bounded LRU cache in front of them. Workers save
+# their caches when they exit; the parent merges them into a snapshot that
+# warms the caches of the next run. Snapshots are keyed by the reference
+# data and WordNet they were computed with.
+# ============================================================================
+
+DEFAULT_LOOKUP_CACHE_SIZE = 200000
+LOOKUP_SNAPSHOT_VERSION = 1
+
+
+class LookupCache:
+    """Bounded LRU cache of a one-argument function, with hit statistics"""
+
+    def __init__(self, function, maxsize=DEFAULT_LOOKUP_CACHE_SIZE):
+        self.function = function
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, key):
+        """function(key), from the cache when present"""
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            value = self.function(key)
+            if self.maxsize > 0:
+                self.entries[key] = value
+                if len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+            return value
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def resize(self, maxsize):
+        """Change the bound, evicting the least recently used entries"""
+        self.maxsize = maxsize
+        while len(self.entries) > max(maxsize, 0):
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def warm(self, items):
+        """Preload (key, value) items, least recently used first; statistics are not counted"""
+        for key, value in items[-self.maxsize:] if self.maxsize > 0 else ():
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+        self.resize(self.maxsize)
+
+    def counts(self):
+        """(hits, misses, evictions) so far"""
+        return self.hits, self.misses, self.evictions
+
+
+def lemmatize_uncached(key):
+    """lemmatize_or_stem() for a (word, first letter of POS) key, the part of the tag it depends on"""
+    word, pos = key
+    if pos == 'N':
+        lemmatized = lemmatizer.lemmatize(word, 'n')
+    elif pos == 'V':
+        lemmatized = lemmatizer.lemmatize(word, 'v')
+    elif pos == 'J':
+        lemmatized = lemmatizer.lemmatize(word, 'a')
+    elif pos == 'R':
+        lemmatized = lemmatizer.lemmatize(word, 'r')
+    else:
+        lemmatized = lemmatizer.lemmatize(word)
+
+    if lemmatized == word:
+        lemmatized = lemmatizer.lemmatize(word)  # Try without POS
+
+    if lemmatized == word:
+        stem = stemmer.stem(word)  # Try stemming
         if stem in stem_validation_dict:
             return stem
 
     return lemmatized
 
 
-def normalize_and_clean_word(row):
-    """Transform a word: remove punctuation, fix Greek chars, normalize Unicode"""
-    string = row.name[0]
+def stem_uncached(word):
+    """stem() without the cache"""
+    return stemmer.stem(word)
+
+
+lemma_cache = LookupCache(lemmatize_uncached)
+stem_cache = LookupCache(stem_uncached)
+LOOKUP_CACHES = {'lemma': lemma_cache, 'stem': stem_cache}
+
+
+def lemmatize_or_stem(cleaned):
+    """Lemmatize or stem a word based on POS tag"""
+    return lemma_cache.lookup((cleaned[0], cleaned[1][:1]))
+
+
+def lookup_cache_counts():
+    """{cache name: (hits, misses, evictions)} of this process"""
+    return {name: cache.counts() for name, cache in LOOKUP_CACHES.items()}
+
+
+def lookup_cache_rates(totals):
+    """Hit rate of each cache from summed (hits, misses, evictions) counts"""
+    return {name: {'hits': hits, 'misses': misses, 'evictions': evictions,
+                   'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None}
+            for name, (hits, misses, evictions) in totals.items()}
+
+
+def lookup_snapshot_fingerprint():
+    """Hash of the reference data and WordNet corpus the cached results depend on"""
+    digest = hashlib.sha256(f"v{LOOKUP_SNAPSHOT_VERSION}:{reference_data_fingerprint()}".encode())
+    for source in nltk_corpus_files('wordnet'):
+        digest.update(source.name.encode())
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def default_lookup_snapshot_path(fingerprint):
+    """Snapshot file for a given fingerprint, next to the reference-data cache"""
+    return REFERENCE_CACHE_DIR / f"lookup_v{LOOKUP_SNAPSHOT_VERSION}_{fingerprint[:16]}.pkl"
+
+
+def lookup_snapshot_parts_path(snapshot_path):
+    """Directory where workers save their caches for merge_lookup_snapshot()"""
+    return snapshot_path.with_name(f"{snapshot_path.name}.parts")
+
+
+def load_lookup_snapshot(snapshot_path, fingerprint):
+    """
+    Read a snapshot written by merge_lookup_snapshot().
+
+    Returns:
+        dict: {cache name: [(key, value), ...]}, empty if the file is
+        missing, unreadable or was computed from other reference data
+    """
+    try:
+        with open(snapshot_path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable lookup snapshot {snapshot_path}: {e}")
+        return {}
+    if snapshot.get('fingerprint') != fingerprint:
+        return {}
+    return snapshot['caches']
+
+
+def configure_lookup_caches(maxsize, snapshot=None):
+    """Bound this process's lookup caches and warm them from a loaded snapshot"""
+    for name, cache in LOOKUP_CACHES.items():
+        cache.resize(maxsize)
+        if snapshot and name in snapshot:
+            cache.warm(snapshot[name])
+
+
+def save_lookup_part(parts_dir):
+    """Save this process's cache entries for merging (run when a worker exits)"""
+    part = {name: list(cache.entries.items()) for name, cache in LOOKUP_CACHES.items()}
+    path = Path(parts_dir) / f"lookup-{os.getpid()}.pkl"
+    try:
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(part, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not save lookup cache part {path}: {e}")
+
+
+def merge_lookup_snapshot(snapshot_path, fingerprint, maxsize, previous=None):
+    """
+    Merge the worker parts (and the snapshot the run started from) into a new snapshot.
+
+    Entries held by the most workers are kept, up to maxsize per cache; the
+    parts are removed afterwards. A worker that was killed leaves no part,
+    which only makes the snapshot smaller.
+
+    Returns:
+        dict: {cache name: entries written}
+    """
+    parts_dir = lookup_snapshot_parts_path(snapshot_path)
+    parts = sorted(parts_dir.glob('lookup-*.pkl'))
+    sources = [previous or {}]
+    for part_path in parts:
+        try:
+            with open(part_path, 'rb') as f:
+                sources.append(pickle.load(f))
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable lookup cache part {part_path}: {e}")
+
+    caches = {}
+    for name in LOOKUP_CACHES:
+        values = {}
+        holders = {}
+        for source in sources:
+            for key, value in source.get(name, ()):
+                values[key] = value
+                holders[key] = holders.get(key, 0) + 1
+        # Least recently used first, as LookupCache.warm() expects
+        keep = sorted(values, key=holders.__getitem__)[-maxsize:] if maxsize > 0 else []
+        caches[name] = [(key, values[key]) for key in keep]
+
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({'fingerprint': fingerprint, 'caches': caches}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, snapshot_path)
+    for part_path in parts:
+        part_path.unlink(missing_ok=True)
+    return {name: len(entries) for name, entries in caches.items()}
+
+
+def normalize_token(string):
+    """Remove punctuation, fix Greek chars and ligatures, apply NFKC to one token"""
     string = string.translate(non_alpha_translator)
     string = string.translate(GREEK_CORRECTION)
 
@@ -529,8 +1555,12 @@ def normalize_and_clean_word(row):
     for ligature, replacement in LIGATURES.items():
         string = string.replace(ligature, replacement)
 
-    string = unicodedata.normalize('NFKC', string)
-    return pd.Series({'corrected': string})
+    return unicodedata.normalize('NFKC', string)
+
+
+def normalize_and_clean_word(row):
+    """Transform a word: remove punctuation, fix Greek chars, normalize Unicode"""
+    return pd.Series({'corrected': normalize_token(row.name[0])})
 
 
 def clean_punctuation(words):
@@ -549,14 +1579,14 @@ def ma_search(row):
             return selection.stand
         else:
             return row
-    except Exception as e:
+    except KeyError as e:
         logging.error(f"Error in ma_search: {e}")
         return 'error'
 
 
 def stem(row):
     """Stem a word"""
-    return stemmer.stem(row)
+    return stem_cache.lookup(row)
 
 
 def spell_correction_lookup(row):
@@ -567,7 +1597,7 @@ def spell_correction_lookup(row):
             return selection.stand
         else:
             return row
-    except Exception as e:
+    except KeyError as e:
         logging.error(f"Error in spell_correction_lookup: {e}")
         return 'error'
 
@@ -577,80 +1607,1457 @@ def process_volume_pipeline(volume):
     token_list = volume.tokenlist(pages=False, case=False, section='body')
     token_list.index = token_list.index.droplevel(0)
     filtered_tokens = token_list[token_list.index.get_level_values(1).isin(POS_TAGS)]
+    mark_stage('tokenlist', len(filtered_tokens))
     filtered_tokens = clean_punctuation(filtered_tokens)
+    mark_stage('punctuation', len(filtered_tokens))
     filtered_tokens = filtered_tokens.assign(corrected=filtered_tokens.corrected.map(spell_correction_lookup))
+    mark_stage('spelling', len(filtered_tokens))
     filtered_tokens = filtered_tokens.groupby(['corrected','pos']).sum()
     filtered_tokens = filtered_tokens[filtered_tokens['count'] >= MIN_WORD_FREQUENCY]
     filtered_tokens = filtered_tokens.loc[~filtered_tokens.index.get_level_values('corrected').isin(filtered_stopwords)]
+    mark_stage('groupby', len(filtered_tokens))
     filtered_tokens = filtered_tokens.assign(lemma=filtered_tokens.index.map(lemmatize_or_stem))
+    mark_stage('lemmatize', len(filtered_tokens))
     filtered_tokens = filtered_tokens.groupby('lemma').sum()
     filtered_tokens = filtered_tokens.loc[~filtered_tokens.index.get_level_values('lemma').isin(filtered_stopwords)]
+    mark_stage('groupby', len(filtered_tokens))
     words_without_archaic = filtered_tokens.loc[~filtered_tokens.index.get_level_values('lemma').isin(archaic_words_index)]
     words_with_archaic = filtered_tokens.loc[filtered_tokens.index.get_level_values('lemma').isin(archaic_words_index)]
     words_with_archaic = words_with_archaic.assign(corrected_ma=words_with_archaic.index.get_level_values('lemma').map(ma_search))
     words_with_archaic = words_with_archaic.groupby('corrected_ma').sum()
     words_with_archaic = words_with_archaic.loc[~words_with_archaic.index.get_level_values('corrected_ma').isin(filtered_stopwords)]
     combined_processed_words = pd.concat([words_without_archaic, words_with_archaic])
+    mark_stage('archaic', len(combined_processed_words))
     combined_processed_words = combined_processed_words.assign(stem=combined_processed_words.index.map(stem))
+    mark_stage('stem', len(combined_processed_words))
     combined_processed_words = combined_processed_words.groupby('stem').sum()
+    mark_stage('groupby', len(combined_processed_words))
     return combined_processed_words
 
 
-def process_volume(volume, output_path):
-    """Process a single volume and write to file"""
-    save_path = output_path / f"{volume.id.replace(':','+').replace('/','=')}.txt"
+def isin_set(values, lookup):
+    """Boolean mask of which values are members of a set"""
+    return np.fromiter((value in lookup for value in values), dtype=bool, count=len(values))
+
+
+def empty_stem_counts(dtype):
+    """Empty result frame with the same layout as process_volume_pipeline"""
+    return pd.DataFrame({'count': np.array([], dtype=dtype)},
+                        index=pd.Index([], dtype=object, name='stem'))
+
+
+def resolve_token(token):
+    """
+    Steps 2-5 for one lowercase token: character cleaning, length filter, spelling correction.
+
+    Returns:
+        str or None: Corrected word, or None if the cleaned token is too short
+    """
+    normalized = normalize_token(token)
+    if len(normalized) <= MIN_WORD_LENGTH:
+        return None
+    return spelling_corrections_map.get(normalized, normalized)
+
+
+def resolve_word(word, pos):
+    """
+    Steps 6-9 for one (corrected word, POS) pair: lemmatization, archaic mapping,
+    stopword filters and final stemming.
+
+    Returns:
+        str or None: Final stem, or None if a stopword filter removes the word
+    """
+    if word in filtered_stopwords:
+        return None
+    lemma = lemmatize_or_stem((word, pos))
+    if lemma in filtered_stopwords:
+        return None
+    if lemma in archaic_words_index:
+        lemma = archaic_to_modern_map[lemma]
+        if lemma in filtered_stopwords:
+            return None
+    return stem(lemma)
+
+
+# Corpus-wide lookup tables for --two-pass mode, filled in each worker by
+# set_vocabulary_tables(). Keys missing from a table are resolved on the fly.
+vocabulary_token_table = {}   # lowercase token -> resolve_token(token)
+vocabulary_word_table = {}    # (corrected word, POS) -> resolve_word(word, pos)
+
+
+def set_vocabulary_tables(token_table, word_table):
+    """Install corpus-wide lookup tables in this process (pool initializer)"""
+    global vocabulary_token_table, vocabulary_word_table, token_vocabulary
+    vocabulary_token_table = token_table
+    vocabulary_word_table = word_table
+    # Drop results cached before the tables were installed
+    token_vocabulary = None
+
+
+# Markers in the TokenVocabulary remaps
+UNRESOLVED = -2   # not looked up yet
+DROPPED = -1      # removed by the length or stopword filters
+
+
+class TokenVocabulary:
+    """
+    Per-process interning of strings to integer IDs for the vectorized engine.
+
+    Tokens, corrected words and stems share one ID space. What resolve_token()
+    and resolve_word() return is cached as ID -> ID remaps, so each token and
+    pair is resolved once per worker instead of once per volume, and every
+    regroup in clean_token_counts() is an np.unique/np.bincount over integers.
+    Strings are only looked up again for a volume's final stems. Token -> word
+    is an array indexed by ID; (word, POS) -> stem is a dict keyed by pair,
+    since only the few strings that are corrected words ever form pairs and a
+    row of tags for every ID would mostly sit empty.
+
+    The vocabulary grows with the distinct tokens a worker sees and is
+    released when the worker is recycled (--max-tasks-per-child).
+    """
+
+    def __init__(self, tags=POS_TAGS):
+        self.ids = {}
+        self.strings = []
+        self.tags = list(tags)
+        self.tag_index = pd.Index(self.tags)
+        self.token_word = np.full(1024, UNRESOLVED, dtype=np.int64)
+        self.pair_stem = {}   # word ID * len(tags) + tag code -> stem ID
+
+    def __len__(self):
+        return len(self.strings)
+
+    def intern(self, string):
+        """ID of a string, adding it if new"""
+        string_id = self.ids.get(string)
+        if string_id is None:
+            string_id = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+    def intern_all(self, strings):
+        """IDs of an array of strings"""
+        ids = np.fromiter((self.intern(string) for string in strings), dtype=np.int64, count=len(strings))
+        self.grow()
+        return ids
+
+    def grow(self):
+        """Extend the token -> word array to cover every ID"""
+        capacity = len(self.token_word)
+        if len(self.strings) > capacity:
+            extra = max(len(self.strings), 2 * capacity) - capacity
+            self.token_word = np.concatenate([self.token_word, np.full(extra, UNRESOLVED, dtype=np.int64)])
+
+    def words(self, token_ids):
+        """Corrected word ID of each token ID (DROPPED if too short), resolving unseen tokens"""
+        for token_id in np.unique(token_ids[self.token_word[token_ids] == UNRESOLVED]):
+            token = self.strings[token_id]
+            word = vocabulary_token_table[token] if token in vocabulary_token_table else resolve_token(token)
+            self.token_word[token_id] = DROPPED if word is None else self.intern(word)
+        self.grow()
+        return self.token_word[token_ids]
+
+    def stems(self, word_ids, tag_codes):
+        """Stem ID of each (word ID, tag code) pair (DROPPED if filtered), resolving unseen pairs"""
+        pair_keys = (np.asarray(word_ids) * len(self.tags) + np.asarray(tag_codes)).tolist()
+        stem_ids = np.fromiter((self.pair_stem.get(key, UNRESOLVED) for key in pair_keys),
+                               dtype=np.int64, count=len(pair_keys))
+        for index in np.flatnonzero(stem_ids == UNRESOLVED).tolist():
+            key = pair_keys[index]
+            if key not in self.pair_stem:
+                word_id, tag_code = divmod(key, len(self.tags))
+                pair = (self.strings[word_id], self.tags[tag_code])
+                stem = vocabulary_word_table[pair] if pair in vocabulary_word_table else resolve_word(*pair)
+                self.pair_stem[key] = DROPPED if stem is None else self.intern(stem)
+            stem_ids[index] = self.pair_stem[key]
+        self.grow()
+        return stem_ids
+
+
+# TokenVocabulary of this process, created on first use
+token_vocabulary = None
+
+
+def worker_vocabulary():
+    """This process's TokenVocabulary"""
+    global token_vocabulary
+    if token_vocabulary is None:
+        token_vocabulary = TokenVocabulary()
+    return token_vocabulary
+
+
+def clean_token_counts(tokens, pos_tags, counts):
+    """
+    Array-based equivalent of the cleaning steps in process_volume_pipeline.
+
+    Tokens are interned into the worker's TokenVocabulary; each distinct
+    token and (word, POS) pair is resolved once per worker (or taken from
+    the --two-pass lookup tables), and every regroup is an np.bincount over
+    integer IDs instead of a DataFrame.groupby on strings.
+
+    Args:
+        tokens: Lowercase body tokens, one entry per (token, POS) pair
+        pos_tags: POS tag of each entry
+        counts: Integer volume-level count of each entry
+
+    Returns:
+        pd.DataFrame: Counts indexed by 'stem', identical to process_volume_pipeline
+    """
+    vocabulary = worker_vocabulary()
+    tokens = np.asarray(tokens, dtype=object)
+    counts = np.asarray(counts)
+
+    # POS filter, keeping each entry's tag as a code for the (word, POS) regroup
+    tag_codes = vocabulary.tag_index.get_indexer(np.asarray(pos_tags, dtype=object))
+    keep = tag_codes >= 0
+    tokens, tag_codes, counts = tokens[keep], tag_codes[keep], counts[keep]
+    mark_stage('pos_filter', len(tokens))
+
+    # Character cleaning, length filter and spelling corrections, as a token -> word remap
+    word_ids = vocabulary.words(vocabulary.intern_all(tokens))
+    keep = word_ids >= 0
+    mark_stage('resolve_tokens', int(keep.sum()))
+    if not keep.any():
+        return empty_stem_counts(counts.dtype)
+    word_ids, tag_codes, counts = word_ids[keep], tag_codes[keep], counts[keep]
+
+    # Regroup on (corrected, pos) and apply the frequency threshold
+    tag_count = len(vocabulary.tags)
+    pair_keys, pair_codes = np.unique(word_ids * tag_count + tag_codes, return_inverse=True)
+    pair_counts = np.bincount(pair_codes, weights=counts, minlength=len(pair_keys)).astype(counts.dtype)
+    keep = pair_counts >= MIN_WORD_FREQUENCY
+    pair_keys, pair_counts = pair_keys[keep], pair_counts[keep]
+    mark_stage('groupby', len(pair_keys))
+
+    # Lemmatization, archaic mapping, stopword filters and stemming, as a (word, POS) -> stem remap
+    stem_ids = vocabulary.stems(pair_keys // tag_count, pair_keys % tag_count)
+    keep = stem_ids >= 0
+    mark_stage('resolve_words', int(keep.sum()))
+    if not keep.any():
+        return empty_stem_counts(counts.dtype)
+
+    # Sum by stem, then materialize the stem strings in groupby('stem') order
+    unique_stems, stem_codes = np.unique(stem_ids[keep], return_inverse=True)
+    stem_counts = np.bincount(stem_codes, weights=pair_counts[keep], minlength=len(unique_stems))
+    stem_strings = np.array([vocabulary.strings[stem_id] for stem_id in unique_stems], dtype=object)
+    order = np.argsort(stem_strings)
+    mark_stage('groupby', len(unique_stems))
+    return pd.DataFrame({'count': stem_counts[order].astype(counts.dtype)},
+                        index=pd.Index(stem_strings[order], dtype=object, name='stem'))
+
+
+def process_volume_pipeline_vectorized(volume):
+    """Process a volume with the array-based engine (same output as process_volume_pipeline)"""
+    tokens, pos_tags, counts = volume_token_arrays(volume)
+    mark_stage('tokenlist', len(tokens))
+    return clean_token_counts(tokens, pos_tags, counts)
+
+
+# Items per worker task when resolving the vocabulary in --two-pass mode
+VOCABULARY_CHUNKSIZE = 10000
+
+# Pool tuning for CleanAndWrite: volumes sent to a worker per task, and tasks
+# a worker handles before it is replaced (returns fragmented memory to the OS)
+DEFAULT_CHUNKSIZE = 8
+DEFAULT_MAX_TASKS_PER_CHILD = 200
+
+# Selectable implementations of the per-volume pipeline (--engine)
+PIPELINE_ENGINES = {
+    'pandas': process_volume_pipeline,
+    'vectorized': process_volume_pipeline_vectorized,
+}
+DEFAULT_ENGINE = 'vectorized'
+
+
+def output_filename(htid):
+    """Output .txt filename for a HathiTrust ID"""
+    return f"{htid.replace(':','+').replace('/','=')}.txt"
+
+
+# ============================================================================
+# OUTPUT FORMATS
+# ============================================================================
+# 'files' (default) writes one .txt per volume for `mallet import-dir`.
+# 'corpus' appends one line per volume to a few large shard files for
+# `mallet import-file`, avoiding one file creation per volume on shared
+# filesystems. Each worker process appends to its own shard, named
+# <kind>-<run tag>-<pid>.txt[.gz], so no locking is needed. Shards may be
+# gzip-compressed, and a word:count sidecar can be written alongside.
+# 'archive' appends each volume's .txt as a member of a rolling tar shard
+# per worker, volumes-<run tag>-<pid>-<n>.tar, with an index of where each
+# member's data starts; see ARCHIVE OUTPUT below.
+# ============================================================================
+
+OUTPUT_FORMATS = ('files', 'corpus', 'archive')
+DEFAULT_OUTPUT_FORMAT = 'files'
+DEFAULT_ARCHIVE_SHARD_SIZE = 1024  # MB
+
+# Shard files opened by this process, kept open between volumes
+open_shards = {}
+
+
+def volume_text(clean_df):
+    """Document text: each stem repeated count times, in clean_df order"""
+    return ''.join((item + ' ') * int(count) for item, count in zip(clean_df.index, clean_df['count']))
+
+
+def corpus_line(htid, label, clean_df):
+    """One `mallet import-file` line: name, label and text, tab-separated"""
+    return f"{htid}\t{label}\t{volume_text(clean_df).rstrip(' ')}\n"
+
+
+def counts_line(htid, clean_df):
+    """
+    One sidecar line: the HTID, then word:count pairs in clean_df order.
+
+    A few modern/archaic mappings yield multi-word stems ('public hous'), so
+    the pairs count whitespace-separated words, exactly as a tokenizer
+    reading the document text would.
+    """
+    counts = {}
+    for item, count in zip(clean_df.index, clean_df['count']):
+        for word in item.split():
+            counts[word] = counts.get(word, 0) + int(count)
+    pairs = ' '.join(f"{word}:{count}" for word, count in counts.items())
+    return f"{htid}\t{pairs}\n"
+
+
+def shard_path(output_path, kind, options):
+    """This process's shard of kind 'corpus' or 'counts' for the current run"""
+    suffix = '.txt.gz' if options.compress else '.txt'
+    return output_path / f"{kind}-{options.run_tag}-{os.getpid()}{suffix}"
+
+
+def append_to_shard(path, text, compress=False):
+    """
+    Append text to a shard and flush it.
+
+    Compressed text is written as a complete gzip member per call, so the
+    shard is a valid (multi-member) .gz file after every volume, even if
+    the worker is later killed or recycled without closing it.
+    """
+    handle = open_shards.get(path)
+    if handle is None:
+        handle = open_shards[path] = open(path, 'ab')
+    data = text.encode('utf8')
+    handle.write(gzip.compress(data) if compress else data)
+    handle.flush()
+
+
+def close_shards():
+    """Close the shard files opened by this process"""
+    while open_shards:
+        open_shards.popitem()[1].close()
+
+
+# ============================================================================
+# ARCHIVE OUTPUT
+# ============================================================================
+# Members are written by hand rather than through tarfile.TarFile so that the
+# end-of-archive blocks can be rewritten after every volume: a shard is a
+# valid tar file at all times, even if the worker is killed. Each shard has
+# an index, <shard>.idx, with one "htid<TAB>member<TAB>offset<TAB>size" line
+# per volume, where offset is the position of the member's data in the
+# shard, so a single volume can be read with one seek. With --compress
+# each member is gzip-compressed on its own (<name>.txt.gz), which keeps it
+# seekable. A worker starts a new shard once its current one reaches
+# --archive-shard-size MB. Shards are only ever created, never reopened: a
+# recycled or retry worker can get the pid of an earlier one under the same
+# run tag, so it skips to the next free shard number instead of truncating
+# a shard whose index still lists its volumes.
+# ============================================================================
+
+# Shard number each process is writing, per (output directory, run tag)
+archive_sequences = {}
+
+
+def archive_shard_path(output_path, options):
+    """This process's current archive shard for the run"""
+    sequence = archive_sequences.get((str(output_path), options.run_tag), 0)
+    return output_path / f"volumes-{options.run_tag}-{os.getpid()}-{sequence:03d}.tar"
+
+
+def archive_index_path(archive_path):
+    """Index file of an archive shard"""
+    return Path(f"{archive_path}.idx")
+
+
+def open_archive_shard(output_path, options):
+    """
+    This process's current archive shard, created if it is not open yet.
+
+    A shard number whose shard or index already exists belongs to an
+    earlier process with the same pid, and is skipped.
+
+    Returns:
+        Path: The open shard's path
+    """
+    key = (str(output_path), options.run_tag)
+    while True:
+        path = archive_shard_path(output_path, options)
+        if path in open_shards:
+            return path
+        if not archive_index_path(path).exists():
+            try:
+                open_shards[path] = open(path, 'xb')
+                return path
+            except FileExistsError:
+                pass
+        archive_sequences[key] = archive_sequences.get(key, 0) + 1
+
+
+def append_to_archive(path, name, data):
+    """
+    Append one member to an open tar shard, keeping the shard a complete tar file.
+
+    Returns:
+        int: Offset of the member's data in the shard
+    """
+    handle = open_shards[path]
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    info.mode = 0o644
+    header = info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+    offset = handle.tell() + len(header)
+    end_of_archive = b'\0' * (2 * tarfile.BLOCKSIZE)
+    handle.write(header + data + b'\0' * (-len(data) % tarfile.BLOCKSIZE) + end_of_archive)
+    handle.flush()
+    # The next member overwrites the end-of-archive blocks
+    handle.seek(-len(end_of_archive), os.SEEK_CUR)
+    return offset
+
+
+def write_to_archive(htid, clean_df, output_path, options):
+    """Append a volume to this process's archive shard, starting a new shard when it is full"""
+    path = archive_shard_path(output_path, options)
+    handle = open_shards.get(path)
+    if handle is not None and handle.tell() >= options.archive_shard_size * 1024 * 1024:
+        handle.close()
+        del open_shards[path]
+        key = (str(output_path), options.run_tag)
+        archive_sequences[key] = archive_sequences.get(key, 0) + 1
+    path = open_archive_shard(output_path, options)
+
+    data = volume_text(clean_df).encode('utf8')
+    name = output_filename(htid)
+    if options.compress:
+        data = gzip.compress(data)
+        name += '.gz'
+    offset = append_to_archive(path, name, data)
+    append_to_shard(archive_index_path(path), f"{htid}\t{name}\t{offset}\t{len(data)}\n")
+
+
+def load_archive_index(output_path):
+    """
+    Index of every archive shard in an output directory.
+
+    Returns:
+        dict: htid -> (shard path, member name, data offset, data size);
+        if a volume was written more than once, the latest shard wins
+    """
+    index = {}
+    for index_path in sorted(Path(output_path).glob('volumes-*.tar.idx')):
+        shard = index_path.with_suffix('')
+        with open(index_path, encoding='utf8') as f:
+            for line in f:
+                htid, name, offset, size = line.rstrip('\n').split('\t')
+                index[htid] = (shard, name, int(offset), int(size))
+    return index
+
+
+def read_archive_volume(entry):
+    """Text of one volume from its load_archive_index() entry, with a single seek"""
+    shard, name, offset, size = entry
+    with open(shard, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size)
+    if name.endswith('.gz'):
+        data = gzip.decompress(data)
+    return data.decode('utf8')
+
+
+def iter_archive(shard):
+    """Stream (member name, text) for every volume in an archive shard, in order"""
+    with tarfile.open(shard, 'r|') as tar:
+        for member in tar:
+            data = tar.extractfile(member).read()
+            if member.name.endswith('.gz'):
+                data = gzip.decompress(data)
+            yield member.name, data.decode('utf8')
+
+
+def volume_output_path(htid, output_path, options=None):
+    """Where a volume's text is written: its own .txt, or this process's corpus or archive shard"""
+    if options and options.output_format == 'corpus':
+        return shard_path(output_path, 'corpus', options)
+    if options and options.output_format == 'archive':
+        return archive_shard_path(output_path, options)
+    return output_path / output_filename(htid)
+
+
+def write_volume(htid, clean_df, output_path, options=None):
+    """Write a cleaned volume (sorted by descending count) in the output format of options (RunOptions)"""
+    save_path = volume_output_path(htid, output_path, options)
+    if options and options.output_format == 'corpus':
+        append_to_shard(save_path, corpus_line(htid, output_path.name, clean_df), options.compress)
+        if options.counts_sidecar:
+            append_to_shard(shard_path(output_path, 'counts', options),
+                            counts_line(htid, clean_df), options.compress)
+    elif options and options.output_format == 'archive':
+        write_to_archive(htid, clean_df, output_path, options)
+    else:
+        with open(save_path, 'w', encoding='utf8') as output:
+            output.write(volume_text(clean_df))
+    if options and options.doc_term_dir:
+        append_to_shard(shard_path(doc_term_parts_path(options.doc_term_dir), 'counts', options),
+                        counts_line(htid, clean_df), options.compress)
+
+
+# ============================================================================
+# DOC-TERM MATRIX
+# ============================================================================
+# With --doc-term-matrix, each worker also appends its volumes' word counts
+# (the sidecar line format) to a part file under <output>.doc_term/parts/.
+# After the run the parts are merged into one CSR matrix with rows sorted by
+# HTID and columns by word:
+#   matrix.npz       scipy.sparse CSR (uint32 counts), volumes x words
+#   htids.txt        one HTID per row
+#   vocabulary.txt   one word per column
+# Parts are kept, so a --resume run merges old and new parts together.
+# ============================================================================
+
+def doc_term_parts_path(doc_term_dir):
+    """Directory of the per-worker count parts"""
+    return Path(doc_term_dir) / "parts"
+
+
+def read_counts_shard(path):
+    """
+    Yield (htid, words, counts) for each line of a word:count shard (.txt or .txt.gz).
+
+    A worker killed mid-write can leave a truncated last line, or with
+    --compress a truncated gzip member; the complete lines before it are
+    read and the rest of the shard is skipped with a warning.
+    """
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rt', encoding='utf8') as f:
+        try:
+            for line in f:
+                if not line.endswith('\n'):
+                    continue
+                htid, _, pairs = line.rstrip('\n').partition('\t')
+                pairs = [pair.rsplit(':', 1) for pair in pairs.split()]
+                yield htid, [word for word, _ in pairs], [int(count) for _, count in pairs]
+        except (EOFError, gzip.BadGzipFile) as e:
+            logging.warning(f"Ignoring the truncated end of {path}: {e}")
+
+
+def merge_doc_term_parts(doc_term_dir):
+    """
+    Merge the count parts into matrix.npz, htids.txt and vocabulary.txt.
+
+    Two streaming passes over the parts keep memory at the size of the
+    final matrix: the first finds the line holding each HTID's latest
+    counts (parts are read in name order, which is run order, and a later
+    line of a part wins over an earlier one), the second fills the CSR
+    arrays from those lines only, collecting the vocabulary as it goes.
+    Rows are sorted by HTID and columns by word, so the result does not
+    depend on worker scheduling.
+
+    Returns:
+        tuple: (matrix shape, number of stored entries)
+    """
+    from scipy import sparse
+
+    doc_term_dir = Path(doc_term_dir)
+    parts = sorted(doc_term_parts_path(doc_term_dir).glob('counts-*'))
+
+    # htid -> (part number, line number, number of words) of its latest counts
+    latest = {}
+    for part_number, part in enumerate(parts):
+        for line_number, (htid, words, _) in enumerate(read_counts_shard(part)):
+            latest[htid] = (part_number, line_number, len(words))
+
+    htids = sorted(latest)
+    rows = {htid: row for row, htid in enumerate(htids)}
+    indptr = np.zeros(len(htids) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([latest[htid][2] for htid in htids])
+    indices = np.empty(indptr[-1], dtype=np.int32)
+    data = np.empty(indptr[-1], dtype=np.uint32)
+    # Words get IDs in order of appearance, remapped to sorted columns below
+    word_ids = {}
+    for part_number, part in enumerate(parts):
+        for line_number, (htid, words, counts) in enumerate(read_counts_shard(part)):
+            if latest[htid][:2] != (part_number, line_number):
+                continue
+            start, end = indptr[rows[htid]], indptr[rows[htid] + 1]
+            indices[start:end] = [word_ids.setdefault(word, len(word_ids)) for word in words]
+            data[start:end] = counts
+
+    vocabulary = sorted(word_ids)
+    columns = np.empty(len(word_ids), dtype=np.int32)
+    columns[[word_ids[word] for word in vocabulary]] = np.arange(len(vocabulary), dtype=np.int32)
+    indices = columns[indices]
+
+    matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(htids), len(vocabulary)))
+    matrix.sort_indices()
+    sparse.save_npz(doc_term_dir / "matrix.npz", matrix)
+    (doc_term_dir / "htids.txt").write_text(''.join(f"{htid}\n" for htid in htids), encoding='utf8')
+    (doc_term_dir / "vocabulary.txt").write_text(''.join(f"{word}\n" for word in vocabulary), encoding='utf8')
+    return matrix.shape, matrix.nnz
+
+
+def load_doc_term_matrix(doc_term_dir):
+    """
+    Load a merged doc-term matrix.
+
+    Returns:
+        tuple: (CSR matrix, list of HTIDs per row, list of words per column)
+    """
+    from scipy import sparse
+
+    doc_term_dir = Path(doc_term_dir)
+    matrix = sparse.load_npz(doc_term_dir / "matrix.npz")
+    htids = (doc_term_dir / "htids.txt").read_text(encoding='utf8').splitlines()
+    vocabulary = (doc_term_dir / "vocabulary.txt").read_text(encoding='utf8').splitlines()
+    return matrix, htids, vocabulary
+
+
+# ============================================================================
+# PROFILING
+# ============================================================================
+# With --profile, each worker times the stages of every volume (the time
+# between consecutive mark_stage() calls) and returns them in the volume's
+# record. The parent streams them to a CSV timing log, one row per volume
+# and stage, and summarizes the log at the end of the run. Without
+# --profile, mark_stage() returns immediately.
+# ============================================================================
+
+PROFILE_COLUMNS = ['htid', 'stage', 'seconds', 'rows']
+PROFILE_QUANTILES = (0.5, 0.95, 0.99)
+PROFILE_SLOWEST = 10
+
+# StageTimer of the volume being profiled in this process, if any
+stage_timer = None
+
+
+class StageTimer:
+    """Wall time and row count of each pipeline stage of one volume"""
+
+    def __init__(self):
+        self.stages = {}
+        self.last = time.perf_counter()
+
+    def mark(self, stage, rows=None):
+        """Add the time since the previous mark to stage; rows is the row count after it"""
+        now = time.perf_counter()
+        seconds = self.stages[stage][0] if stage in self.stages else 0.0
+        self.stages[stage] = (seconds + now - self.last, rows)
+        self.last = now
+
+
+def mark_stage(stage, rows=None):
+    """End a pipeline stage of the volume being profiled (no-op unless --profile)"""
+    if stage_timer is not None:
+        stage_timer.mark(stage, rows)
+
+
+def summarize_profile(profile_path):
+    """
+    Summarize a timing log.
+
+    Returns:
+        tuple: (per-stage DataFrame of volume count, total seconds and the
+        PROFILE_QUANTILES of seconds per volume, with a 'total' row for whole
+        volumes; DataFrame of the PROFILE_SLOWEST volumes by total seconds)
+    """
+    timings = pd.read_csv(profile_path)
+    totals = timings.groupby('htid', sort=False)['seconds'].sum()
+    per_stage = dict(list(timings.groupby('stage', sort=False)['seconds']) + [('total', totals)])
+    summary = pd.DataFrame({
+        stage: {'volumes': len(seconds), 'seconds': seconds.sum(),
+                **{f'p{int(q * 100)}': seconds.quantile(q) for q in PROFILE_QUANTILES}}
+        for stage, seconds in per_stage.items()
+    }).T
+    summary['volumes'] = summary['volumes'].astype(int)
+    summary.index.name = 'stage'
+    slowest = timings.pivot_table(index='htid', columns='stage', values='seconds', aggfunc='sum', sort=False)
+    slowest.insert(0, 'total', totals)
+    return summary, slowest.nlargest(PROFILE_SLOWEST, 'total')
+
+
+# ============================================================================
+# VOLUME LIMITS AND QUARANTINE
+# ============================================================================
+# A corrupt or enormous volume can hold a worker far longer than the rest.
+# With --volume-timeout each worker arms a SIGALRM timer per volume, and
+# --max-worker-memory caps its address space; a volume that hits either
+# limit is abandoned with VolumeTimeout or MemoryError, recorded as
+# 'quarantined' with the reason, and listed in the quarantine file. After
+# the main pass, quarantined volumes are retried one at a time, each in a
+# fresh worker, with both limits multiplied by --retry-factor.
+# ============================================================================
+
+DEFAULT_RETRY_FACTOR = 4
+
+
+class VolumeTimeout(BaseException):
+    """
+    Raised in a worker when a volume runs past --volume-timeout.
+
+    A BaseException, like KeyboardInterrupt, so that no `except Exception`
+    handler along the pipeline, here or in the libraries it calls, can
+    swallow it and let the volume run on unbounded.
+    """
+
+
+# Exceptions that quarantine a volume instead of failing it
+LIMIT_ERRORS = (VolumeTimeout, MemoryError)
+
+# Per-volume wall-clock limit of this process in seconds (set by init_worker),
+# and whether the timer is armed for the current volume
+volume_timeout = None
+volume_timer_armed = False
+
+
+def raise_volume_timeout(signum, frame):
+    """SIGALRM handler: abandon the current volume"""
+    if volume_timer_armed:
+        raise VolumeTimeout(f"exceeded {volume_timeout} s")
+
+
+def start_volume_timer():
+    """Arm the per-volume timer (no-op without --volume-timeout)"""
+    global volume_timer_armed
+    if volume_timeout:
+        volume_timer_armed = True
+        signal.setitimer(signal.ITIMER_REAL, volume_timeout)
+
+
+def stop_volume_timer():
+    """Disarm the per-volume timer"""
+    global volume_timer_armed
+    if volume_timer_armed:
+        volume_timer_armed = False
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def load_quarantine(quarantine_path):
+    """
+    Latest quarantine entry per HTID.
+
+    Returns:
+        dict: htid -> entry ({'htid', 'input', 'reason', 'attempt', limits, 'time'})
+    """
+    entries = {}
+    if quarantine_path and Path(quarantine_path).exists():
+        with open(quarantine_path, encoding='utf8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry['htid']] = entry
+    return entries
+
+
+def process_volume(volume, output_path, engine=DEFAULT_ENGINE, options=None):
+    """Process a single volume and write it out"""
     try:
-        clean_df = process_volume_pipeline(volume)
+        clean_df = PIPELINE_ENGINES[engine](volume)
         if clean_df is None:
             logging.warning(f"No clean data for volume {volume.id}")
             return None
         clean_df = clean_df.sort_values('count', ascending=False)
-        with open(save_path, 'w', encoding='utf8') as output:
-           for item, value in clean_df.iterrows():
-               to_print = [(item + ' ') * int(value['count'])]
-               output.write(str(to_print[0]))
+        # A volume that got this far is written in full, never cut off by the timer
+        stop_volume_timer()
+        write_volume(volume.id, clean_df, output_path, options)
+        mark_stage('write', len(clean_df))
         return clean_df
+    except LIMIT_ERRORS:
+        raise
     except Exception as e:
         logging.error(f"Error processing volume {volume.id}: {e}")
         return None
 
 
 def process_volume_wrapper(args_tuple):
-    """Wrapper for multiprocessing"""
-    volume, output_path = args_tuple
-    return process_volume(volume, output_path)
+    """
+    Wrapper for multiprocessing: read and process one volume, return its manifest record
+
+    args_tuple is (input path, output directory, RunOptions, prefetched);
+    prefetched is None, or (compressed bytes, read seconds) from
+    prefetch_files(); the bytes are parsed with the direct reader, and the
+    read time is profiled as the 'io' stage. The record's 'seconds' is the
+    time this worker spent on the volume. A volume that runs into the
+    per-volume limits is recorded as 'quarantined', with the 'reason'
+    ('timeout' or 'memory').
+
+    With a profile_path set, the record also carries the volume's stage timings
+    under 'stages' ({stage: (seconds, rows)}) and its lookup cache counts
+    under 'lookups' ({cache: (hits, misses, evictions)}).
+    """
+    global stage_timer
+    path, output_path, options, prefetched = args_tuple
+    profile = options.profile_path is not None
+    start = time.perf_counter()
+    stage_timer = StageTimer() if profile else None
+    lookups_before = lookup_cache_counts() if profile else None
+    htid = htid_from_filename(os.path.basename(path))
+    reason = None
+    start_volume_timer()
+    try:
+        try:
+            if prefetched and prefetched[0] is not None:
+                data, io_seconds = prefetched
+                if stage_timer is not None:
+                    stage_timer.stages['io'] = (io_seconds, None)
+                volume = read_extracted_features(path, data=data)
+            else:
+                volume = VOLUME_READERS[options.reader](path)
+            htid = volume.id
+            mark_stage('read')
+        except LIMIT_ERRORS:
+            raise
+        except Exception as e:
+            logging.error(f"Error reading volume {path}: {e}")
+            volume = None
+        clean_df = process_volume(volume, output_path, options.engine, options) if volume is not None else None
+    except LIMIT_ERRORS as e:
+        reason = 'timeout' if isinstance(e, VolumeTimeout) else 'memory'
+        logging.error(f"Quarantining volume {htid} ({reason}): {e}")
+        volume = clean_df = None
+    finally:
+        stop_volume_timer()
+    try:
+        stat = os.stat(path)
+        size, mtime = stat.st_size, stat.st_mtime
+    except OSError as e:
+        # Removed or unreadable since the scan: recorded as failed so that --resume retries it
+        logging.error(f"Error reading volume {path}: {e}")
+        size = mtime = None
+    # Only this small fixed-size record goes back to the parent, never the DataFrame
+    record = {
+        'htid': htid,
+        'input': str(path),
+        'size': size,
+        'mtime': mtime,
+        'output': str(volume_output_path(htid, output_path, options)),
+        'tokens': int(clean_df['count'].sum()) if clean_df is not None else 0,
+        'stems': len(clean_df) if clean_df is not None else 0,
+        'status': 'quarantined' if reason else 'ok' if clean_df is not None and size is not None else 'failed',
+        'time': time.time(),
+        'seconds': round(time.perf_counter() - start, 4),
+        'pid': os.getpid(),
+        'peak_rss_mb': peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+    }
+    if reason:
+        record['reason'] = reason
+    if profile:
+        record['stages'] = stage_timer.stages
+        record['lookups'] = {name: tuple(after - before for after, before in zip(counts, lookups_before[name]))
+                             for name, counts in lookup_cache_counts().items()}
+        stage_timer = None
+    return record
 
 
-def CleanAndWrite(corpus, output_path, num_processes=None, volume_limit=None):
-    """Process all volumes using multiprocessing"""
-    total_volumes = len(corpus)
+def peak_rss_mb(who):
+    """Peak resident set size in MB from getrusage (RUSAGE_SELF or RUSAGE_CHILDREN)"""
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
 
+def load_wordnet():
+    """
+    Force NLTK's lazy WordNet load (several seconds).
+
+    Called in the parent before a pool starts so that forked workers, including
+    the ones that replace recycled workers, inherit it instead of each reloading it.
+    """
+    lemmatizer.lemmatize('volumes')
+
+
+def init_worker(vocabulary_tables=None, max_worker_memory=None, lookup_caches=None, timeout=None,
+                page_batch=0):
+    """
+    Pool initializer for CleanAndWrite.
+
+    Installs the --two-pass lookup tables, and caps the worker's address
+    space at max_worker_memory MB so that a runaway volume fails with a
+    MemoryError (recorded as a failed volume) instead of exhausting the node.
+    lookup_caches is (cache size, loaded snapshot, parts directory or None):
+    the caches are sized and warmed, and saved to the parts directory when
+    the worker exits. timeout is the per-volume wall-clock limit in seconds.
+    page_batch streams input files that many pages at a time (0 parses
+    them whole).
+    """
+    global volume_timeout, page_batch_size
+    page_batch_size = page_batch
+    if vocabulary_tables:
+        set_vocabulary_tables(*vocabulary_tables)
+    if lookup_caches:
+        maxsize, snapshot, parts_dir = lookup_caches
+        configure_lookup_caches(maxsize, snapshot)
+        if parts_dir:
+            mp_util.Finalize(None, save_lookup_part, args=(parts_dir,), exitpriority=10)
+    if timeout:
+        volume_timeout = timeout
+        signal.signal(signal.SIGALRM, raise_volume_timeout)
+    if max_worker_memory:
+        limit = int(max_worker_memory) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, resource.getrlimit(resource.RLIMIT_AS)[1]))
+
+
+# ============================================================================
+# OUTPUT MANIFEST
+# ============================================================================
+# One JSON record per processed volume is appended to the manifest as results
+# arrive, so an interrupted run can be resumed with --resume. The manifest is
+# kept outside the output directory so `mallet import-dir` never sees it.
+# ============================================================================
+
+def load_manifest(manifest_path):
+    """
+    Read a manifest, keeping the latest record for each HTID.
+
+    Args:
+        manifest_path: Path to a JSONL manifest (may not exist yet)
+
+    Returns:
+        dict: HTID -> latest manifest record
+    """
+    records = {}
+    if not manifest_path.exists():
+        return records
+    with open(manifest_path, 'r', encoding='utf8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a truncated last line
+                continue
+            records[record['htid']] = record
+    return records
+
+
+def is_completed(record, path):
+    """True if a manifest record is a success for this exact input file and its output exists"""
+    if record is None or record.get('status') != 'ok':
+        return False
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    return (record.get('size') == stat.st_size and record.get('mtime') == stat.st_mtime
+            and os.path.exists(record['output']))
+
+
+def pending_volumes(htrc_files, manifest):
+    """
+    Drop volumes the manifest records as completed.
+
+    Args:
+        htrc_files: DataFrame from scan_htrc_files()
+        manifest: Records from load_manifest()
+
+    Returns:
+        pd.DataFrame: The subset of htrc_files still to process (failed, changed or missing)
+    """
+    done = [is_completed(manifest.get(htid), os.path.join(row.Path, row.Filename))
+            for htid, row in zip(htrc_files.index, htrc_files.itertuples())]
+    return htrc_files[~np.array(done, dtype=bool)]
+
+
+# ============================================================================
+# MULTI-NODE SHARDING
+# ============================================================================
+# --shard-index/--shard-count split the scanned catalog into shards of about
+# equal total file size, so that a job array can process one shard per
+# node. The assignment depends only on the catalog (HTIDs and sizes), so
+# every node computes the same split without coordinating. Each shard keeps
+# its own manifest and summary; --merge-shards then checks that every
+# volume was processed exactly once and combines the shard manifests.
+# ============================================================================
+
+def shard_tag(shard_index, shard_count):
+    """Name of a shard in side-file names, e.g. shard-003-of-016"""
+    return f"shard-{shard_index:03d}-of-{shard_count:03d}"
+
+
+def assign_shards(htrc_files, shard_count):
+    """
+    Split volumes into shard_count shards of about equal total size.
+
+    Largest files first, each goes to the shard with the smallest total so
+    far (ties to the lowest shard number). Equal sizes are ordered by HTID,
+    so the result does not depend on the order of htrc_files.
+
+    Args:
+        htrc_files: DataFrame from scan_htrc_files() (needs 'Size')
+        shard_count: Number of shards
+
+    Returns:
+        np.ndarray: Shard number of each row of htrc_files
+    """
+    sizes, htids = htrc_files['Size'].tolist(), htrc_files.index.tolist()
+    totals = [(0, shard) for shard in range(shard_count)]
+    assignment = np.empty(len(htrc_files), dtype=int)
+    for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i], htids[i])):
+        total, shard = heapq.heappop(totals)
+        assignment[i] = shard
+        heapq.heappush(totals, (total + sizes[i], shard))
+    return assignment
+
+
+def select_shard(htrc_files, shard_index, shard_count):
+    """The rows of htrc_files in shard shard_index"""
+    return htrc_files[assign_shards(htrc_files, shard_count) == shard_index]
+
+
+def verify_shards(htrc_files, output_path, shard_count):
+    """
+    Check that every volume was processed exactly once across the shards.
+
+    Args:
+        htrc_files: DataFrame from scan_htrc_files() for the whole input
+        output_path: Output directory the shards wrote to
+        shard_count: Number of shards
+
+    Returns:
+        dict: 'records' (HTID -> latest record), and lists of HTIDs that are
+        'missing' (in no shard manifest), 'incomplete' (recorded but failed,
+        changed or without output), 'duplicated' (in more than one shard) and
+        'unexpected' (not in the input); 'missing_manifests' lists shards
+        without a manifest
+    """
+    shards_of, records, missing_manifests = {}, {}, []
+    for shard in range(shard_count):
+        manifest_path = sibling_path(output_path, '.manifest.jsonl', shard_tag(shard, shard_count))
+        if not manifest_path.exists():
+            missing_manifests.append(shard)
+        for htid, record in load_manifest(manifest_path).items():
+            shards_of.setdefault(htid, []).append(shard)
+            records[htid] = record
+
+    paths = {htid: os.path.join(row.Path, row.Filename) for htid, row in zip(htrc_files.index, htrc_files.itertuples())}
+    return {
+        'records': records,
+        'missing': [htid for htid in paths if htid not in records],
+        'incomplete': [htid for htid, path in paths.items()
+                       if htid in records and not is_completed(records[htid], path)],
+        'duplicated': [htid for htid, shards in shards_of.items() if len(shards) > 1],
+        'unexpected': [htid for htid in records if htid not in paths],
+        'missing_manifests': missing_manifests,
+    }
+
+
+def merge_shards(args, htrc_files):
+    """
+    --merge-shards: verify the shard runs and combine their manifests.
+
+    Writes the combined manifest to args.manifest and merges doc-term matrix
+    parts if there are any. Exits with status 1 if any volume was missed,
+    failed or processed more than once.
+    """
+    report = verify_shards(htrc_files, args.output, args.shard_count)
+    with open(args.manifest, 'w', encoding='utf8') as f:
+        for record in report['records'].values():
+            f.write(json.dumps(record) + '\n')
+    print(f"Combined manifest: {len(report['records'])} volumes from {args.shard_count} shards -> {args.manifest}")
+
+    if doc_term_parts_path(sibling_path(args.output, '.doc_term')).exists():
+        shape, nnz = merge_doc_term_parts(sibling_path(args.output, '.doc_term'))
+        print(f"Doc-term matrix: {shape[0]} volumes x {shape[1]} words, {nnz} nonzeros")
+
+    problems = {
+        'missing_manifests': "Shards without a manifest",
+        'missing': "Volumes not processed by any shard",
+        'incomplete': "Volumes failed, changed since processing, or without output",
+        'duplicated': "Volumes processed by more than one shard",
+        'unexpected': "Processed volumes no longer in the input",
+    }
+    failed = False
+    for key, description in problems.items():
+        if report[key]:
+            failed = True
+            examples = ', '.join(str(item) for item in report[key][:5])
+            print(f"  [ERROR] {description}: {len(report[key])} (e.g. {examples})")
+    if failed:
+        sys.exit(1)
+    print(f"  [OK] All {len(htrc_files)} volumes processed exactly once")
+
+
+def volume_vocabulary(args_tuple):
+    """Return the distinct (lowercase token, POS) body pairs of one volume, for --two-pass"""
+    path, reader = args_tuple
+    try:
+        tokens, pos_tags, _ = volume_token_arrays(VOLUME_READERS[reader](path))
+        tokens, pos_tags = np.asarray(tokens, dtype=object), np.asarray(pos_tags, dtype=object)
+        keep = isin_set(pos_tags, POS_TAGS)
+        return set(zip(tokens[keep], pos_tags[keep]))
+    except Exception as e:
+        logging.error(f"Error collecting vocabulary from {path}: {e}")
+        return set()
+
+
+def build_vocabulary_tables(file_paths, num_processes=None, chunksize=VOCABULARY_CHUNKSIZE,
+                            reader=DEFAULT_READER, page_batch=0):
+    """
+    First pass of --two-pass mode: resolve the corpus vocabulary once.
+
+    Collects the distinct (lowercase token, POS) pairs of every volume, then
+    resolves each distinct token and each distinct (corrected word, POS) pair
+    in parallel. The second pass only looks the results up.
+
+    Args:
+        file_paths: Paths to .json.bz2 files
+        num_processes: Worker processes (default: all CPUs)
+        chunksize: Items per task when resolving
+        reader: Key of VOLUME_READERS
+        page_batch: Pages per batch when streaming input files (0 parses them whole)
+
+    Returns:
+        tuple: (token_table, word_table) for set_vocabulary_tables()
+    """
     if num_processes is None:
         num_processes = mp.cpu_count()
 
+    load_wordnet()
+    pairs = set()
+    with mp.Pool(processes=num_processes, initializer=init_worker,
+                 initargs=(None, None, None, None, page_batch)) as pool:
+        tasks = ((path, reader) for path in file_paths)
+        for volume_pairs in tqdm(pool.imap_unordered(volume_vocabulary, tasks),
+                                 total=len(file_paths), desc="Collecting vocabulary"):
+            pairs.update(volume_pairs)
+
+        tokens = list({token for token, _ in pairs})
+        print(f"Resolving {len(tokens)} distinct tokens ({len(pairs)} token/POS pairs)")
+        token_table = dict(zip(tokens, pool.map(resolve_token, tokens, chunksize=chunksize)))
+
+        words = list({(token_table[token], pos) for token, pos in pairs if token_table[token] is not None})
+        print(f"Resolving {len(words)} distinct word/POS pairs")
+        word_table = dict(zip(words, pool.starmap(resolve_word, words, chunksize=chunksize)))
+
+    return token_table, word_table
+
+
+@dataclass
+class RunOptions:
+    """
+    Settings of a CleanAndWrite() run.
+
+    The workers get the options with every task (as process_volume_wrapper()'s
+    options), so they hold only small picklable values. run_tag is filled in
+    by CleanAndWrite() when the run starts.
+    """
+    # Pool
+    num_processes: int = None  # default: all CPUs
+    volume_limit: int = None  # process only the first volume_limit volumes
+    chunksize: int = DEFAULT_CHUNKSIZE  # volumes per worker task
+    max_tasks_per_child: int = DEFAULT_MAX_TASKS_PER_CHILD  # tasks before a worker is replaced
+
+    # Reading and processing
+    engine: str = DEFAULT_ENGINE  # key of PIPELINE_ENGINES
+    reader: str = DEFAULT_READER  # key of VOLUME_READERS
+    # Pages per batch when streaming input files (0 parses them whole, see stream_extracted_features())
+    page_batch: int = 0
+    # Threads reading input files ahead of the workers, at most prefetch_depth files ahead
+    # (0 lets workers read their own files, see prefetch_files())
+    prefetch_threads: int = 0
+    prefetch_depth: int = DEFAULT_PREFETCH_DEPTH
+    lookup_cache_size: int = DEFAULT_LOOKUP_CACHE_SIZE  # entries per lookup cache in each worker (0 disables them)
+    # Snapshot file that warms the caches and is updated with the workers' caches at the end
+    # (see merge_lookup_snapshot())
+    lookup_snapshot: Path = None
+
+    # Per-volume limits
+    max_worker_memory: int = None  # per-worker address-space cap in MB
+    volume_timeout: float = None  # wall-clock limit in seconds
+    # Volumes that hit a limit are quarantined, then retried one at a time with the limits
+    # multiplied by retry_factor (0 skips the retry)
+    retry_factor: float = DEFAULT_RETRY_FACTOR
+
+    # Output
+    output_format: str = DEFAULT_OUTPUT_FORMAT  # key of OUTPUT_FORMATS
+    compress: bool = False  # gzip 'corpus' and 'archive' shards
+    counts_sidecar: bool = False  # also write counts shards next to 'corpus' shards
+    archive_shard_size: int = DEFAULT_ARCHIVE_SHARD_SIZE  # MB per 'archive' shard
+    doc_term_dir: Path = None  # where to write doc-term matrix parts (see merge_doc_term_parts())
+    # shard_tag() of a --shard-index run, prefixed to the names of shard files so that nodes
+    # never write to the same one
+    shard: str = None
+    run_tag: str = None  # names this run's shard files
+
+    # Run files
+    manifest_path: Path = None  # JSONL record of every volume, streamed as results arrive
+    summary_path: Path = None  # JSON run totals
+    profile_path: Path = None  # CSV timing log for --profile, summarized at the end
+    quarantine_path: Path = None  # JSONL list of the volumes that hit a limit
+
+
+def CleanAndWrite(corpus, output_path, options=None, vocabulary_tables=None):
+    """
+    Process all volumes using multiprocessing
+
+    Workers read their own volumes and return one small record per volume,
+    which is streamed to the manifest (JSONL) as it arrives and folded into
+    running totals, so parent memory stays flat however many volumes are
+    processed. Results arrive in completion order (imap_unordered).
+
+    Args:
+        corpus: FeatureReader of the volumes to process
+        output_path: Output directory
+        options: RunOptions (default: RunOptions())
+        vocabulary_tables: See build_vocabulary_tables()
+    """
+    total_volumes = len(corpus)
+    options = replace(options or RunOptions())
+
+    if options.num_processes is None:
+        options.num_processes = mp.cpu_count()
+    timestamp = time.strftime('%Y%m%dT%H%M%S')
+    options.run_tag = f"{options.shard}-{timestamp}" if options.shard else timestamp
+    if options.doc_term_dir:
+        doc_term_parts_path(options.doc_term_dir).mkdir(parents=True, exist_ok=True)
+
+    # Adjust total if limiting
+    if options.volume_limit is not None:
+        print(f"Limiting processing to first {options.volume_limit} volumes (out of {total_volumes} total)")
+        total_volumes = min(options.volume_limit, total_volumes)
+
+    if options.max_worker_memory and resource is None:
+        logging.warning("Worker memory limits are not supported on this platform; ignoring")
+        options.max_worker_memory = None
+    if options.volume_timeout and not hasattr(signal, 'setitimer'):
+        logging.warning("Per-volume timeouts are not supported on this platform; ignoring")
+        options.volume_timeout = None
+
     # Use generator to avoid loading all volumes into memory at once (critical for 264K volumes)
+    io_stats = {}
+
     def volume_generator():
-        count = 0
-        for volume in corpus.volumes():
-            if volume_limit is not None and count >= volume_limit:
-                break
-            yield (volume, output_path)
-            count += 1
+        paths = itertools.islice(corpus.ids, options.volume_limit)
+        if options.prefetch_threads:
+            for path, data, seconds in prefetch_files(paths, options.prefetch_threads, options.prefetch_depth,
+                                                      io_stats):
+                yield (path, output_path, options, (data, seconds))
+        else:
+            for path in paths:
+                yield (path, output_path, options, None)
+
+    load_wordnet()
+    snapshot = fingerprint = parts_dir = None
+    if options.lookup_snapshot and options.lookup_cache_size > 0:
+        lookup_snapshot = Path(options.lookup_snapshot)
+        fingerprint = lookup_snapshot_fingerprint()
+        snapshot = load_lookup_snapshot(lookup_snapshot, fingerprint)
+        parts_dir = lookup_snapshot_parts_path(lookup_snapshot)
+        parts_dir.mkdir(parents=True, exist_ok=True)
+        if snapshot:
+            print(f"Warming lookup caches from {lookup_snapshot} "
+                  f"({', '.join(f'{len(entries)} {name}' for name, entries in snapshot.items())} entries)")
+
+    summary = {'volumes': 0, 'ok': 0, 'failed': 0, 'quarantined': 0, 'retried': 0, 'tokens': 0,
+               'worker_peak_rss_mb': None, 'compute_seconds': 0.0}
+    lookup_totals = {name: (0, 0, 0) for name in LOOKUP_CACHES}
+    quarantined = []
+    start = time.time()
+    manifest = open(options.manifest_path, 'a', encoding='utf8') if options.manifest_path else None
+    quarantine = None
+    profile_log = open(options.profile_path, 'w', encoding='utf8', newline='') if options.profile_path else None
+    if profile_log:
+        profile_writer = csv.writer(profile_log)
+        profile_writer.writerow(PROFILE_COLUMNS)
+
+    def collect(record, attempt, timeout, memory):
+        """Fold one worker record into the totals and logs"""
+        nonlocal lookup_totals, quarantine
+        if attempt > 1:
+            # The volume was counted as quarantined on its first attempt
+            summary['volumes'] -= 1
+            summary['quarantined'] -= 1
+            summary['retried'] += 1
+        summary['volumes'] += 1
+        summary[record['status']] += 1
+        summary['tokens'] += record['tokens']
+        summary['compute_seconds'] += record['seconds']
+        if record['peak_rss_mb'] is not None:
+            summary['worker_peak_rss_mb'] = max(summary['worker_peak_rss_mb'] or 0, record['peak_rss_mb'])
+        stages = record.pop('stages', None)
+        lookups = record.pop('lookups', None)
+        if lookups:
+            lookup_totals = {name: tuple(map(sum, zip(lookup_totals[name], counts)))
+                             for name, counts in lookups.items()}
+        if profile_log and stages:
+            profile_writer.writerows([record['htid'], stage, f"{seconds:.6f}", rows]
+                                     for stage, (seconds, rows) in stages.items())
+        if manifest:
+            manifest.write(json.dumps(record) + '\n')
+            manifest.flush()
+        if record['status'] == 'quarantined':
+            quarantined.append(record['input'])
+            if options.quarantine_path:
+                # Opened on first use, so runs without quarantined volumes leave no file
+                quarantine = quarantine or open(options.quarantine_path, 'a', encoding='utf8')
+                quarantine.write(json.dumps({
+                    'htid': record['htid'], 'input': record['input'], 'reason': record['reason'],
+                    'attempt': attempt, 'volume_timeout': timeout, 'max_worker_memory': memory,
+                    'seconds': record['seconds'], 'time': record['time']}) + '\n')
+                quarantine.flush()
 
-    # Adjust total if limiting
-    if volume_limit is not None:
-        print(f"Limiting processing to first {volume_limit} volumes (out of {total_volumes} total)")
-        total_volumes = min(volume_limit, total_volumes)
+    try:
+        with mp.Pool(processes=options.num_processes, initializer=init_worker,
+                     initargs=(vocabulary_tables, options.max_worker_memory,
+                               (options.lookup_cache_size, snapshot, str(parts_dir) if parts_dir else None),
+                               options.volume_timeout, options.page_batch),
+                     maxtasksperchild=options.max_tasks_per_child) as pool:
+            for record in tqdm(pool.imap_unordered(process_volume_wrapper, volume_generator(),
+                                                   chunksize=options.chunksize),
+                               total=total_volumes, desc="Processing volumes"):
+                collect(record, 1, options.volume_timeout, options.max_worker_memory)
+            # Let the workers exit normally so that they save their lookup caches
+            pool.close()
+            pool.join()
+        pool_elapsed, pool_compute = time.time() - start, summary['compute_seconds']
+
+        if quarantined and options.retry_factor:
+            retry_timeout = options.volume_timeout * options.retry_factor if options.volume_timeout else None
+            retry_memory = int(options.max_worker_memory * options.retry_factor) if options.max_worker_memory else None
+            print(f"\nRetrying {len(quarantined)} quarantined volumes one at a time "
+                  f"(limits x{options.retry_factor}: {retry_timeout or 'no'} s, {retry_memory or 'no'} MB)")
+            retries, quarantined = quarantined, []
+            with mp.Pool(processes=1, initializer=init_worker,
+                         initargs=(vocabulary_tables, retry_memory, (options.lookup_cache_size, snapshot, None),
+                                   retry_timeout, options.page_batch),
+                         maxtasksperchild=1) as pool:
+                tasks = ((path, output_path, options, None) for path in retries)
+                for record in tqdm(pool.imap_unordered(process_volume_wrapper, tasks),
+                                   total=len(retries), desc="Retrying quarantined volumes"):
+                    collect(record, 2, retry_timeout, retry_memory)
+    finally:
+        if manifest:
+            manifest.close()
+        if quarantine:
+            quarantine.close()
+        if profile_log:
+            profile_log.close()
+
+    elapsed = time.time() - start
+    summary['elapsed_seconds'] = round(elapsed, 1)
+    summary['volumes_per_second'] = round(summary['volumes'] / max(elapsed, 1e-9), 2)
+    # Share of the pool's wall time that workers spent on volumes (the rest is waiting for tasks)
+    summary['compute_seconds'] = round(summary['compute_seconds'], 1)
+    summary['worker_busy_share'] = round(pool_compute / max(pool_elapsed * options.num_processes, 1e-9), 3)
+    if options.prefetch_threads:
+        summary.update({key: round(value, 3) if isinstance(value, float) else value
+                        for key, value in io_stats.items()})
+    if options.profile_path:
+        summary['lookup_caches'] = lookup_cache_rates(lookup_totals)
+    if parts_dir:
+        saved = merge_lookup_snapshot(lookup_snapshot, fingerprint, options.lookup_cache_size, snapshot)
+        print(f"Saved lookup snapshot {lookup_snapshot} "
+              f"({', '.join(f'{count} {name}' for name, count in saved.items())} entries)")
+    if options.summary_path:
+        with open(options.summary_path, 'w', encoding='utf8') as f:
+            json.dump(summary, f, indent=2)
+
+    print(f"\nProcessed {summary['ok']}/{total_volumes} volumes successfully")
+    if summary['retried']:
+        print(f"Retried {summary['retried']} quarantined volumes: {summary['retried'] - summary['quarantined']} succeeded")
+    if summary['quarantined']:
+        print(f"Quarantined volumes: {summary['quarantined']}"
+              f"{f' (listed in {options.quarantine_path})' if options.quarantine_path else ''}")
+    if summary['worker_peak_rss_mb'] is not None:
+        print(f"Peak worker memory: {summary['worker_peak_rss_mb']} MB")
+    print(f"Workers busy {summary['worker_busy_share']:.0%} of the time "
+          f"({summary['compute_seconds']} s computing over {options.num_processes} workers)")
+    if options.prefetch_threads:
+        print(f"Prefetch: read {summary['io_bytes'] / 1e6:.1f} MB in {summary['io_seconds']} s "
+              f"({options.prefetch_threads} threads); waited {summary['io_wait_seconds']} s for reads")
+    if options.profile_path and summary['volumes']:
+        report_profile(options.profile_path, summary['lookup_caches'])
+    return summary
+
+
+def report_profile(profile_path, lookup_caches=None):
+    """
+    Print the timing summary and slowest volumes, and save them next to the timing log
+
+    lookup_caches: lookup_cache_rates() of the run, printed and saved as
+    <profile>.lookups.csv to help size --lookup-cache-size.
+    """
+    stage_summary, slowest = summarize_profile(profile_path)
+    profile_path = Path(profile_path)
+    stage_summary.to_csv(profile_path.with_suffix('.summary.csv'))
+    slowest.to_csv(profile_path.with_suffix('.slowest.csv'))
+    with pd.option_context('display.float_format', '{:.4f}'.format, 'display.width', 120):
+        print(f"\nSeconds per volume by stage (timing log: {profile_path}):")
+        print(stage_summary.to_string())
+        print(f"\nSlowest {len(slowest)} volumes:")
+        print(slowest.to_string())
+        if lookup_caches:
+            rates = pd.DataFrame.from_dict(lookup_caches, orient='index')
+            rates.index.name = 'cache'
+            rates.to_csv(profile_path.with_suffix('.lookups.csv'))
+            print("\nLookup caches (all workers):")
+            print(rates.to_string())
+
+
+# ============================================================================
+# STARTUP
+# ============================================================================
+
+processing_data_loaded = False
 
-    with mp.Pool(processes=num_processes) as pool:
-        results = list(tqdm(
-            pool.imap(process_volume_wrapper, volume_generator()),
-            total=total_volumes,
-            desc="Processing volumes"
-        ))
 
-    successful = sum(1 for r in results if r is not None)
-    print(f"\nProcessed {successful}/{total_volumes} volumes successfully")
+def load_processing_data():
+    """
+    Import the processing dependencies and load the reference tables (once per process).
+
+    Run as a script, main() calls this only when processing starts, so
+    --help and the catalog-based --dry-run return without paying for it.
+    Imported as a module (tests, notebooks, spawned workers), it runs at
+    import time and every function is ready to use.
+    """
+    global processing_data_loaded, lemmatizer, stemmer
+    if processing_data_loaded:
+        return
+    import_dependencies()
+    lemmatizer = WordNetLemmatizer()
+    stemmer = SnowballStemmer('english')
+    load_reference_tables()
+    processing_data_loaded = True
+
+
+def report_dry_run(args, sizes):
+    """Print what a run would process: volume count, input size and, from a previous run, an estimated time"""
+    print("="*80)
+    print("DRY RUN MODE")
+    print("="*80)
+    print(f"\nWould process {len(sizes)} volumes")
+    if sizes:
+        print(f"Input size: {sum(sizes) / 1e9:.2f} GB compressed "
+              f"(mean {sum(sizes) / len(sizes) / 1e6:.2f} MB, largest {max(sizes) / 1e6:.2f} MB per volume)")
+    summary_path = sibling_path(args.output, '.summary.json', args.shard)
+    try:
+        with open(summary_path, encoding='utf8') as f:
+            volumes_per_second = json.load(f).get('volumes_per_second')
+    except (OSError, ValueError):
+        volumes_per_second = None
+    if volumes_per_second and sizes:
+        print(f"Estimated time: {len(sizes) / volumes_per_second / 3600:.1f} h "
+              f"at the previous run's {volumes_per_second} volumes/sec ({summary_path})")
+    print(f"Output directory: {args.output}")
+    if args.output_format == 'corpus':
+        print(f"Output format: One line per volume in per-worker corpus shards"
+              f"{' (gzip)' if args.compress else ''}")
+    elif args.output_format == 'archive':
+        print(f"Output format: One member per volume in per-worker tar shards of up to "
+              f"{args.archive_shard_size} MB{' (gzip members)' if args.compress else ''}")
+    else:
+        print(f"Output format: One .txt file per volume")
+    print("\nRemove --dry-run flag to execute processing.")
 
 
 def main():
@@ -664,11 +3071,20 @@ def main():
     # Display configuration
     print_configuration(args)
 
+    # A plain --dry-run only needs the file catalog: answer it before loading anything heavy
+    if args.dry_run and not (args.resume or args.shard or args.merge_shards):
+        if not args.input.is_dir():
+            print(f"[ERROR] Input directory does not exist: {args.input}")
+            sys.exit(1)
+        report_dry_run(args, [row[3] for row in catalog_files(args.input, args.catalog, rescan=args.rescan)])
+        return
+
     # Validate environment
     validate_environment(args)
     print()
 
-    # Validate reference data (loaded at module import time)
+    # Load and validate reference data
+    load_processing_data()
     validate_reference_data(args)
     print()
 
@@ -676,18 +3092,33 @@ def main():
     print("="*80)
     print("Step 1/3: Scanning for HTRC Extracted Features files")
     print("="*80)
-    htrc_files = scan_htrc_files(args.input)
+    htrc_files = scan_htrc_files(args.input, catalog_path=args.catalog, rescan=args.rescan)
     print(f"Found {len(htrc_files)} HTRC Extracted Features files")
+    if htrc_files.empty:
+        print(f"\n[ERROR] No .json.bz2 files found in: {args.input}")
+        sys.exit(1)
+    if args.merge_shards:
+        print()
+        merge_shards(args, htrc_files)
+        return
+    if args.shard:
+        total_files = len(htrc_files)
+        htrc_files = select_shard(htrc_files, args.shard_index, args.shard_count)
+        print(f"Shard {args.shard_index} of {args.shard_count}: {len(htrc_files)} of {total_files} volumes "
+              f"({htrc_files['Size'].sum() / 1e6:.1f} MB)")
+    if args.resume:
+        total_files = len(htrc_files)
+        htrc_files = pending_volumes(htrc_files, load_manifest(args.manifest))
+        print(f"Resuming: {total_files - len(htrc_files)} volumes already complete, "
+              f"{len(htrc_files)} to process")
     print()
 
     if args.dry_run:
-        print("="*80)
-        print("DRY RUN MODE")
-        print("="*80)
-        print(f"\nWould process {len(htrc_files)} volumes")
-        print(f"Output directory: {args.output}")
-        print(f"Output format: One .txt file per volume")
-        print("\nRemove --dry-run flag to execute processing.")
+        report_dry_run(args, htrc_files['Size'].tolist())
+        return
+
+    if htrc_files.empty:
+        print("Nothing to process: every volume is recorded as complete in the manifest.")
         return
 
     # Create output directory
@@ -706,7 +3137,35 @@ def main():
     print("="*80)
     print("Step 3/3: Processing and writing cleaned text")
     print("="*80)
-    CleanAndWrite(corpus, args.output, args.num_processes)
+    lookup_snapshot = None
+    if not args.no_lookup_snapshot and args.lookup_cache_size > 0:
+        lookup_snapshot = args.lookup_snapshot or default_lookup_snapshot_path(lookup_snapshot_fingerprint())
+    vocabulary_tables = None
+    if args.two_pass:
+        vocabulary_tables = build_vocabulary_tables(corpus.ids, args.num_processes, reader=args.reader,
+                                                    page_batch=args.page_batch)
+        print()
+    options = RunOptions(
+        num_processes=args.num_processes, chunksize=args.chunksize, max_tasks_per_child=args.max_tasks_per_child,
+        engine=args.engine, reader=args.reader, page_batch=args.page_batch,
+        prefetch_threads=args.prefetch_threads, prefetch_depth=args.prefetch_depth,
+        lookup_cache_size=args.lookup_cache_size, lookup_snapshot=lookup_snapshot,
+        max_worker_memory=args.max_worker_memory, volume_timeout=args.volume_timeout,
+        retry_factor=args.retry_factor,
+        output_format=args.output_format, compress=args.compress, counts_sidecar=args.counts_sidecar,
+        archive_shard_size=args.archive_shard_size,
+        doc_term_dir=sibling_path(args.output, '.doc_term') if args.doc_term_matrix else None, shard=args.shard,
+        manifest_path=args.manifest, summary_path=sibling_path(args.output, '.summary.json', args.shard),
+        profile_path=sibling_path(args.output, '.profile.csv', args.shard) if args.profile else None,
+        quarantine_path=args.quarantine)
+    CleanAndWrite(corpus, args.output, options, vocabulary_tables)
+
+    # Sharded runs leave their parts to --merge-shards, which merges all shards at once
+    if args.doc_term_matrix and not args.shard:
+        print("\nMerging doc-term matrix parts...")
+        shape, nnz = merge_doc_term_parts(sibling_path(args.output, '.doc_term'))
+        print(f"Doc-term matrix: {shape[0]} volumes x {shape[1]} words, {nnz} nonzeros "
+              f"({sibling_path(args.output, '.doc_term')})")
 
     # Success message
     print("\n" + "="*80)
@@ -714,10 +3173,17 @@ def main():
     print("="*80)
     print(f"\nCleaned text files: {args.output}")
     print(f"Total volumes: {len(corpus)}")
-    print("\nOutput files are ready for MALLET topic modeling.")
+    if args.output_format == 'corpus':
+        print("\nCorpus shards are ready for MALLET topic modeling (mallet import-file).")
+    elif args.output_format == 'archive':
+        print("\nArchive shards are written; extract them (tar -xf) for MALLET topic modeling (mallet import-dir).")
+    else:
+        print("\nOutput files are ready for MALLET topic modeling.")
     print("="*80)
 
 
 if __name__ == "__main__":
     mp.freeze_support()  # Necessary for Windows
     main()
+else:
+    load_processing_data()
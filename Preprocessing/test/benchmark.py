@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Throughput Benchmark for HTRC Preprocessing Pipeline
+
+Generates a synthetic Extracted Features corpus (optionally together with
+the real volumes in sample_data/), then measures:
+
+  1. The per-volume pipeline of each engine in a single process
+  2. CleanAndWrite with 1..N worker processes
+
+and reports volumes/sec, tokens/sec (body tokens read) and peak RSS. Every
+run's output is checked against the first one, and against a golden
+reference of output digests when --golden is given.
+
+Synthetic volumes draw their (token, POS) pairs from the body counts of
+sample_data/, so the vocabulary, POS mix and Zipf-like frequencies are
+those of real HathiTrust volumes, plus a share of OCR-style corrupted
+tokens. Generation is deterministic for a given seed and settings.
+
+Usage:
+    python benchmark.py --volumes 200 --workers 1,2,4
+    python benchmark.py --write-golden golden.json     # save reference digests
+    python benchmark.py --golden golden.json           # check against them
+    python benchmark.py --startup --max-help-seconds 0.5  # CLI startup time only
+"""
+
+import argparse
+import bz2
+import hashlib
+import json
+import multiprocessing as mp
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import preprocessing module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from preprocess_htrc import (
+    POS_TAGS,
+    PIPELINE_ENGINES,
+    VOLUME_READERS,
+    DEFAULT_READER,
+    CleanAndWrite,
+    RunOptions,
+    getFeatureReader,
+    scan_htrc_files,
+    peak_rss_mb,
+    load_wordnet,
+    resource
+)
+
+SAMPLE_DATA = Path(__file__).parent / "sample_data"
+
+# Characters OCR commonly confuses or injects
+OCR_NOISE_CHARACTERS = "-'.,;:1l|ſﬁﬂ"
+
+
+def body_token_counts(path):
+    """Total body tokens of an Extracted Features file"""
+    with bz2.open(path, 'rt', encoding='utf8') as f:
+        pages = json.load(f)['features']['pages']
+    return sum(count for page in pages if page.get('body')
+               for pos_counts in page['body']['tokenPosCount'].values() for count in pos_counts.values())
+
+
+def sample_vocabulary(sample_dir=SAMPLE_DATA):
+    """
+    Body (token, POS) pairs of the sample volumes with their total counts.
+
+    Returns:
+        tuple: (list of (token, POS) pairs, np.ndarray of counts), most frequent first
+    """
+    totals = {}
+    for path in sorted(sample_dir.rglob('*.json.bz2')):
+        with bz2.open(path, 'rt', encoding='utf8') as f:
+            pages = json.load(f)['features']['pages']
+        for page in pages:
+            if not page.get('body'):
+                continue
+            for token, pos_counts in page['body']['tokenPosCount'].items():
+                for pos, count in pos_counts.items():
+                    totals[(token, pos)] = totals.get((token, pos), 0) + count
+    pairs = sorted(totals, key=lambda pair: (-totals[pair], pair))
+    return pairs, np.array([totals[pair] for pair in pairs], dtype=float)
+
+
+def corrupt_token(token, rng):
+    """An OCR-style variant of a token: one character replaced or inserted"""
+    position = rng.integers(0, len(token) + 1)
+    noise = OCR_NOISE_CHARACTERS[rng.integers(0, len(OCR_NOISE_CHARACTERS))]
+    if position < len(token) and rng.random() < 0.5:
+        return token[:position] + noise + token[position + 1:]
+    return token[:position] + noise + token[position:]
+
+
+class SyntheticCorpus:
+    """
+    Token distribution for synthetic Extracted Features volumes.
+
+    Args:
+        seed: Random seed; the corpus is fully determined by the settings
+        vocabulary_size: Most frequent sample (token, POS) pairs to draw from
+        noise_share: Share of tokens replaced by OCR-corrupted variants
+        retained_pos_share: Share of tokens with a POS in POS_TAGS
+            (None keeps the sample's mix)
+        median_pages, page_sigma: Lognormal distribution of pages per volume
+        tokens_per_page: Mean body tokens per page (Poisson)
+    """
+
+    def __init__(self, seed=0, vocabulary_size=20000, noise_share=0.05, retained_pos_share=None,
+                 median_pages=150, page_sigma=0.6, tokens_per_page=250):
+        self.settings = {
+            'seed': seed, 'vocabulary_size': vocabulary_size, 'noise_share': noise_share,
+            'retained_pos_share': retained_pos_share, 'median_pages': median_pages,
+            'page_sigma': page_sigma, 'tokens_per_page': tokens_per_page,
+        }
+        self.rng = np.random.default_rng(seed)
+        pairs, weights = sample_vocabulary()
+        pairs, weights = pairs[:vocabulary_size], weights[:vocabulary_size]
+
+        if retained_pos_share is not None:
+            retained = np.array([pos in POS_TAGS for _, pos in pairs])
+            weights[retained] *= retained_pos_share / weights[retained].sum()
+            weights[~retained] *= (1 - retained_pos_share) / weights[~retained].sum()
+
+        # Corrupted variants of a random subset of pairs, carrying noise_share of the mass
+        if noise_share:
+            sources = self.rng.choice(len(pairs), size=max(1, len(pairs) // 4), p=weights / weights.sum())
+            noise_pairs = [(corrupt_token(pairs[i][0], self.rng), pairs[i][1]) for i in sources]
+            noise_weights = weights[sources] * noise_share / weights[sources].sum()
+            pairs = pairs + noise_pairs
+            weights = np.concatenate([weights * (1 - noise_share) / weights.sum(), noise_weights])
+
+        self.pairs = pairs
+        self.probabilities = weights / weights.sum()
+
+    def page(self):
+        """tokenPosCount of one synthetic page body"""
+        size = self.rng.poisson(self.settings['tokens_per_page'])
+        drawn, counts = np.unique(self.rng.choice(len(self.pairs), size=size, p=self.probabilities),
+                                  return_counts=True)
+        body = {}
+        for index, count in zip(drawn, counts):
+            token, pos = self.pairs[index]
+            pos_counts = body.setdefault(token, {})
+            pos_counts[pos] = pos_counts.get(pos, 0) + int(count)
+        return body
+
+    def write_volume(self, path, htid):
+        """Write one synthetic volume; returns its body token count"""
+        page_count = max(1, int(round(self.rng.lognormal(np.log(self.settings['median_pages']),
+                                                           self.settings['page_sigma']))))
+        pages, tokens = [], 0
+        for seq in range(1, page_count + 1):
+            body = self.page()
+            body_tokens = sum(sum(pos_counts.values()) for pos_counts in body.values())
+            tokens += body_tokens
+            # A running header on every page, which the pipeline must ignore
+            header = {'chapter': {'NN': 1}}
+            pages.append({
+                'seq': f'{seq:08d}',
+                'tokenCount': body_tokens + 1,
+                'header': {'tokenCount': 1, 'tokenPosCount': header},
+                'body': {'tokenCount': body_tokens, 'tokenPosCount': body},
+                'footer': None,
+            })
+        volume = {
+            'htid': htid,
+            'metadata': {'genre': []},
+            'features': {
+                'schemaVersion': 'https://schemas.hathitrust.org/EF_Schema_FeaturesSubSchema_v_3.0',
+                'pageCount': page_count,
+                'pages': pages,
+            },
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with bz2.open(path, 'wt', encoding='utf8') as f:
+            json.dump(volume, f)
+        return tokens
+
+    def generate(self, input_dir, volumes):
+        """Write volumes into a pairtree-like layout; returns the total body token count"""
+        return sum(self.write_volume(Path(input_dir) / 'bench' / f'{i // 1000:03d}' / f'bench.{i:08d}.json.bz2',
+                                     f'bench.{i:08d}')
+                   for i in range(volumes))
+
+
+def output_digests(output_dir):
+    """sha256 of every output file, by file name"""
+    return {path.name: hashlib.sha256(path.read_bytes()).hexdigest()
+            for path in sorted(Path(output_dir).iterdir())}
+
+
+def benchmark_pipeline(paths, engine, reader, tokens):
+    """Time read + clean of every volume in this process"""
+    start = time.perf_counter()
+    for path in paths:
+        PIPELINE_ENGINES[engine](VOLUME_READERS[reader](path))
+    elapsed = time.perf_counter() - start
+    return {
+        'run': f'pipeline:{engine}', 'workers': 0, 'seconds': round(elapsed, 3),
+        'volumes_per_second': round(len(paths) / elapsed, 2),
+        'tokens_per_second': round(tokens / elapsed),
+        'peak_rss_mb': peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+    }
+
+
+def benchmark_clean_and_write(corpus, output_dir, workers, engine, reader, tokens):
+    """Time a full CleanAndWrite run"""
+    start = time.perf_counter()
+    summary = CleanAndWrite(corpus, output_dir, RunOptions(num_processes=workers, engine=engine, reader=reader))
+    elapsed = time.perf_counter() - start
+    return {
+        'run': f'CleanAndWrite:{engine}', 'workers': workers, 'seconds': round(elapsed, 3),
+        'volumes_per_second': round(summary['volumes'] / elapsed, 2),
+        'tokens_per_second': round(tokens / elapsed),
+        'peak_rss_mb': summary['worker_peak_rss_mb'],
+        'failed': summary['failed'],
+    }
+
+
+def benchmark_startup(repeats):
+    """Median wall time of the CLI fast paths and of a library import, each in a fresh interpreter"""
+    script = Path(__file__).parent.parent / 'preprocess_htrc.py'
+    with tempfile.TemporaryDirectory() as tmp:
+        commands = {
+            'help': [str(script), '--help'],
+            'dry-run': [str(script), '--input', str(SAMPLE_DATA), '--output', str(Path(tmp) / 'out'), '--dry-run'],
+            'import': ['-c', f'import sys; sys.path.insert(0, {str(script.parent)!r}); import preprocess_htrc'],
+        }
+        timings = {}
+        for name, command in commands.items():
+            seconds = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, *command], check=True, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+                seconds.append(time.perf_counter() - start)
+            timings[name] = round(statistics.median(seconds), 3)
+    return timings
+
+
+def default_worker_counts():
+    """1, 2, 4, ... up to the CPU count"""
+    counts, n = [], 1
+    while n < mp.cpu_count():
+        counts.append(n)
+        n *= 2
+    return counts + [mp.cpu_count()]
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='HTRC Preprocessing - Throughput Benchmark')
+    parser.add_argument('--volumes', type=int, default=100, help='Synthetic volumes to generate (default: 100)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--vocabulary-size', type=int, default=20000,
+                        help='Most frequent sample (token, POS) pairs to draw from (default: 20000)')
+    parser.add_argument('--noise-share', type=float, default=0.05,
+                        help='Share of OCR-corrupted tokens (default: 0.05)')
+    parser.add_argument('--retained-pos-share', type=float,
+                        help='Share of tokens with a retained POS tag (default: as in sample_data)')
+    parser.add_argument('--median-pages', type=int, default=150, help='Median pages per volume (default: 150)')
+    parser.add_argument('--page-sigma', type=float, default=0.6,
+                        help='Lognormal sigma of pages per volume (default: 0.6)')
+    parser.add_argument('--tokens-per-page', type=int, default=250,
+                        help='Mean body tokens per page (default: 250)')
+    parser.add_argument('--no-sample-data', action='store_true', help='Leave out the real sample_data volumes')
+    parser.add_argument('--workers', type=lambda value: [int(n) for n in value.split(',')],
+                        default=default_worker_counts(), help='Comma-separated worker counts (default: 1,2,4..CPUs)')
+    parser.add_argument('--engines', type=lambda value: value.split(','), default=sorted(PIPELINE_ENGINES),
+                        help='Comma-separated engines to benchmark (default: all)')
+    parser.add_argument('--reader', choices=sorted(VOLUME_READERS), default=DEFAULT_READER)
+    parser.add_argument('--golden', type=Path, help='Golden digests to check the output against')
+    parser.add_argument('--write-golden', type=Path, dest='write_golden', help='Save the output digests here')
+    parser.add_argument('--results', type=Path, help='Write the measurements as JSON')
+    parser.add_argument('--workdir', type=Path, help='Keep the corpus and outputs here (default: temporary)')
+    parser.add_argument('--startup', action='store_true',
+                        help='Only time --help, --dry-run and a library import, then exit')
+    parser.add_argument('--repeats', type=int, default=5, help='Runs per startup timing (default: 5)')
+    parser.add_argument('--max-help-seconds', type=float, dest='max_help_seconds',
+                        help='Fail if --help takes longer than this (with --startup)')
+    return parser.parse_args()
+
+
+def report_startup(args):
+    timings = benchmark_startup(args.repeats)
+    print("="*80)
+    print(f"STARTUP TIMES (median of {args.repeats})")
+    print("="*80)
+    for name, seconds in timings.items():
+        print(f"{name:<26}{seconds:>10}")
+    if args.results:
+        args.results.write_text(json.dumps({'startup': timings}, indent=2))
+    if args.max_help_seconds is not None and timings['help'] > args.max_help_seconds:
+        print(f"\n[FAILED] --help took {timings['help']}s, over the {args.max_help_seconds}s budget")
+        sys.exit(1)
+
+
+def main():
+    args = parse_arguments()
+    if args.startup:
+        report_startup(args)
+        return
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix='htrc_benchmark_'))
+    input_dir = workdir / 'input'
+    if input_dir.exists():
+        shutil.rmtree(input_dir)
+
+    print(f"Generating {args.volumes} synthetic volumes in {input_dir}")
+    generator = SyntheticCorpus(seed=args.seed, vocabulary_size=args.vocabulary_size,
+                                noise_share=args.noise_share, retained_pos_share=args.retained_pos_share,
+                                median_pages=args.median_pages, page_sigma=args.page_sigma,
+                                tokens_per_page=args.tokens_per_page)
+    generator.generate(input_dir, args.volumes)
+    if not args.no_sample_data:
+        shutil.copytree(SAMPLE_DATA, input_dir / 'sample_data')
+
+    htrc_files = scan_htrc_files(input_dir)
+    corpus = getFeatureReader(htrc_files)
+    paths = list(corpus.ids)
+    tokens = sum(body_token_counts(path) for path in paths)
+    print(f"Corpus: {len(paths)} volumes, {tokens} body tokens\n")
+
+    load_wordnet()
+    results, digests = [], {}
+    for engine in args.engines:
+        results.append(benchmark_pipeline(paths, engine, args.reader, tokens))
+        for workers in args.workers:
+            output_dir = workdir / f'output_{engine}_{workers}'
+            if output_dir.exists():
+                shutil.rmtree(output_dir)
+            output_dir.mkdir(parents=True)
+            results.append(benchmark_clean_and_write(corpus, output_dir, workers, engine, args.reader, tokens))
+            digests[results[-1]['run'], workers] = output_digests(output_dir)
+
+    # Every run must write the same files; the golden reference pins them across versions
+    mismatches = []
+    reference_run, reference = next(iter(digests.items()))
+    for run, run_digests in digests.items():
+        if run_digests != reference:
+            mismatches.append(f"{run[0]} with {run[1]} workers differs from {reference_run[0]} "
+                              f"with {reference_run[1]} workers")
+    golden = {'generator': generator.settings, 'sample_data': not args.no_sample_data,
+              'volumes': args.volumes, 'digests': reference}
+    if args.golden:
+        expected = json.loads(args.golden.read_text())
+        if {k: v for k, v in expected.items() if k != 'digests'} != {k: v for k, v in golden.items() if k != 'digests'}:
+            mismatches.append(f"Golden reference {args.golden} was made with different generator settings")
+        else:
+            differing = sorted(name for name in set(expected['digests']) | set(reference)
+                               if expected['digests'].get(name) != reference.get(name))
+            if differing:
+                mismatches.append(f"{len(differing)} output files differ from {args.golden}, e.g. {differing[0]}")
+    if args.write_golden:
+        args.write_golden.write_text(json.dumps(golden, indent=2))
+        print(f"\nGolden digests written to {args.write_golden}")
+
+    print("\n" + "="*80)
+    print("BENCHMARK RESULTS")
+    print("="*80)
+    print(f"{'Run':<26}{'Workers':>8}{'Seconds':>10}{'Volumes/s':>12}{'Tokens/s':>14}{'Peak RSS MB':>13}")
+    for result in results:
+        workers = result['workers'] or 'in-proc'
+        print(f"{result['run']:<26}{workers:>8}{result['seconds']:>10}{result['volumes_per_second']:>12}"
+              f"{result['tokens_per_second']:>14}{result['peak_rss_mb'] if result['peak_rss_mb'] is not None else '-':>13}")
+
+    if args.results:
+        args.results.write_text(json.dumps({'corpus': golden, 'tokens': tokens, 'results': results}, indent=2))
+    if not args.workdir:
+        shutil.rmtree(workdir)
+
+    if mismatches:
+        print("\n[FAILED] Output check:")
+        for mismatch in mismatches:
+            print(f"  {mismatch}")
+        sys.exit(1)
+    print(f"\n[OK] All {len(digests)} runs wrote identical output ({len(reference)} files)"
+          f"{' matching ' + str(args.golden) if args.golden else ''}")
+
+
+if __name__ == "__main__":
+    mp.freeze_support()
+    main()
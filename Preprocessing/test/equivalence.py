@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Differential Equivalence Harness: PT_Nov2024.py vs preprocess_htrc.py
+
+Runs the original script's correct_words() and every engine/reader
+combination of preprocess_htrc.py (every key of PIPELINE_ENGINES x
+VOLUME_READERS, so engines added later are picked up automatically) on the
+same volumes, in parallel worker processes. For each volume it diffs the
+per-volume stem counts of every implementation against the reference
+implementation (the original by default) and times each one, then reports
+mismatches and speedup ratios. It exits with status 1 if any
+implementation disagrees with the reference, so an optimization can be
+accepted on evidence rather than by inspection.
+
+The original is loaded from its source unchanged, except that the three
+hard-coded Windows paths of its reference CSVs are pointed at
+reference_data/. One compatibility shim applies: pandas 2 raises KeyError
+when .loc is given a list with labels missing from the index, where the
+pandas of the original run skipped them, so the original's pos_tags is
+narrowed to the tags present in each volume before correct_words() runs.
+
+Usage:
+    python equivalence.py                                    # sample_data, all implementations
+    python equivalence.py --input /data/htrc --sample 500 --workers 8
+    python equivalence.py --implementations original,vectorized/direct --report report.json
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import random
+import re
+import sys
+import time
+import types
+from pathlib import Path
+
+from tqdm import tqdm
+
+# Add parent directory to path to import preprocessing module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from preprocess_htrc import (
+    POS_TAGS,
+    PIPELINE_ENGINES,
+    VOLUME_READERS,
+    DEFAULT_DICT_CORRECTIONS,
+    DEFAULT_DICT_MA,
+    DEFAULT_WORLD_CITIES,
+    catalog_files,
+    load_wordnet,
+)
+
+SAMPLE_DATA = Path(__file__).parent / "sample_data"
+ORIGINAL_SCRIPT = Path(__file__).parent.parent / "PT_Nov2024.py"
+REFERENCE = 'original'
+
+# Reference files the original reads from hard-coded paths, by file name
+ORIGINAL_REFERENCE_FILES = {
+    'Master_Corrections.csv': DEFAULT_DICT_CORRECTIONS,
+    'MA_Dict_Final.csv': DEFAULT_DICT_MA,
+    'world_cities.csv': DEFAULT_WORLD_CITIES,
+}
+
+# Differences listed per volume and implementation
+MAX_EXAMPLES = 5
+
+# The original script's module, loaded once per process by load_original()
+original = None
+
+
+def load_original(script=ORIGINAL_SCRIPT):
+    """
+    Load the original script as a module, with its reference paths redirected.
+
+    Raises:
+        ValueError: If a hard-coded reference path is not found exactly once
+            (the original has changed and the harness needs updating)
+    """
+    global original
+    if original is not None:
+        return original
+    source = Path(script).read_text(encoding='utf8')
+    for name, path in ORIGINAL_REFERENCE_FILES.items():
+        pattern = r'''r(["'])[^"'\n]*\\''' + re.escape(name) + r'\1'
+        source, found = re.subn(pattern, lambda match: repr(str(path)), source)
+        if found != 1:
+            raise ValueError(f"Expected one hard-coded path to {name} in {script}, found {found}")
+    module = types.ModuleType('PT_Nov2024')
+    module.__file__ = str(script)
+    exec(compile(source, str(script), 'exec'), module.__dict__)
+    original = module
+    return original
+
+
+def run_original(path):
+    """(read seconds, pipeline seconds, stem counts) of the original correct_words()"""
+    start = time.perf_counter()
+    volume = VOLUME_READERS['htrc-features'](path)
+    read_seconds = time.perf_counter() - start
+    # Compatibility shim (not timed): see the module docstring
+    present = set(volume.tokenlist(pages=False, case=False, section='body').index.get_level_values('pos'))
+    original.pos_tags = tuple(tag for tag in POS_TAGS if tag in present)
+    start = time.perf_counter()
+    counts = original.correct_words(volume)['count']
+    return read_seconds, time.perf_counter() - start, counts
+
+
+def run_engine(path, engine, reader):
+    """(read seconds, pipeline seconds, stem counts) of a preprocess_htrc engine"""
+    start = time.perf_counter()
+    volume = VOLUME_READERS[reader](path)
+    read_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    counts = PIPELINE_ENGINES[engine](volume)['count']
+    return read_seconds, time.perf_counter() - start, counts
+
+
+def implementation_names():
+    """The original, then every engine/reader combination"""
+    return [REFERENCE] + [f'{engine}/{reader}' for engine in sorted(PIPELINE_ENGINES)
+                          for reader in sorted(VOLUME_READERS)]
+
+
+def run_implementation(name, path):
+    if name == REFERENCE:
+        return run_original(path)
+    engine, reader = name.split('/')
+    return run_engine(path, engine, reader)
+
+
+def init_harness(script, needs_original):
+    """Pool initializer: load the original (inherited when forked) and WordNet"""
+    if needs_original:
+        load_original(script)
+    load_wordnet()
+
+
+def compare_volume(args_tuple):
+    """
+    Run every implementation on one volume and diff each against the reference.
+
+    Returns:
+        dict: Volume record with {implementation: result} under 'results'.
+        Each result has read/pipeline seconds and the stem count, or an
+        error; non-reference results also have the number of differing
+        stems and up to MAX_EXAMPLES examples (stem, reference count, count).
+    """
+    index, path, names, reference = args_tuple
+    counts, results = {}, {}
+    # Rotate the running order from volume to volume so that warm-up costs are not always paid by the same one
+    shift = index % len(names)
+    for name in names[shift:] + names[:shift]:
+        try:
+            read_seconds, pipeline_seconds, series = run_implementation(name, path)
+        except Exception as e:
+            results[name] = {'error': f"{type(e).__name__}: {e}"}
+            continue
+        counts[name] = {stem: int(count) for stem, count in series.items()}
+        results[name] = {'read_seconds': read_seconds, 'pipeline_seconds': pipeline_seconds,
+                         'stems': len(counts[name])}
+
+    for name in names:
+        if name == reference or name not in counts or reference not in counts:
+            continue
+        expected, actual = counts[reference], counts[name]
+        differing = sorted(stem for stem in set(expected) | set(actual) if expected.get(stem) != actual.get(stem))
+        results[name]['differences'] = len(differing)
+        results[name]['examples'] = [(stem, expected.get(stem), actual.get(stem)) for stem in differing[:MAX_EXAMPLES]]
+    return {'path': str(path), 'results': {name: results[name] for name in names}}
+
+
+def sample_paths(input_dir, sample=None, seed=0):
+    """Input files in path order, or a seeded random sample of them"""
+    paths = [str(Path(directory) / name) for _, name, directory, _, _ in catalog_files(input_dir)]
+    if sample and sample < len(paths):
+        paths = sorted(random.Random(seed).sample(paths, sample))
+    return paths
+
+
+def summarize(records, names, reference):
+    """
+    Per-implementation totals and the list of disagreements.
+
+    A volume that every implementation fails to read counts as skipped, not
+    as a disagreement; speedups compare time on volumes where both the
+    implementation and the reference succeeded.
+    """
+    totals = {name: {'volumes': 0, 'errors': 0, 'mismatched_volumes': 0, 'differences': 0,
+                     'read_seconds': 0.0, 'pipeline_seconds': 0.0,
+                     'paired_seconds': 0.0, 'reference_paired_seconds': 0.0} for name in names}
+    problems, skipped = [], 0
+    for record in records:
+        results = record['results']
+        if all('error' in result for result in results.values()):
+            skipped += 1
+            continue
+        reference_result = results.get(reference, {})
+        for name in names:
+            result, total = results[name], totals[name]
+            if 'error' in result:
+                total['errors'] += 1
+                problems.append(f"{name} failed on {record['path']}: {result['error']}")
+                continue
+            total['volumes'] += 1
+            seconds = result['read_seconds'] + result['pipeline_seconds']
+            total['read_seconds'] += result['read_seconds']
+            total['pipeline_seconds'] += result['pipeline_seconds']
+            if 'error' in reference_result:
+                continue
+            total['paired_seconds'] += seconds
+            total['reference_paired_seconds'] += reference_result['read_seconds'] + reference_result['pipeline_seconds']
+            if result.get('differences'):
+                total['mismatched_volumes'] += 1
+                total['differences'] += result['differences']
+                examples = ', '.join(f"{stem}: {expected} -> {actual}" for stem, expected, actual in result['examples'])
+                problems.append(f"{name} differs from {reference} on {record['path']} "
+                                f"({result['differences']} stems, e.g. {examples})")
+    for total in totals.values():
+        total['speedup'] = (round(total['reference_paired_seconds'] / total['paired_seconds'], 2)
+                            if total['paired_seconds'] else None)
+        for key in ('read_seconds', 'pipeline_seconds', 'paired_seconds', 'reference_paired_seconds'):
+            total[key] = round(total[key], 3)
+    return totals, problems, skipped
+
+
+def parse_arguments():
+    implementations = implementation_names()
+    parser = argparse.ArgumentParser(description='HTRC Preprocessing - Differential Equivalence Harness')
+    parser.add_argument('--input', type=Path, default=SAMPLE_DATA,
+                        help='Directory of .json.bz2 files (default: test/sample_data)')
+    parser.add_argument('--sample', type=int, help='Random sample of this many volumes (default: all)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for --sample (default: 0)')
+    parser.add_argument('--workers', type=int, default=mp.cpu_count(), help='Worker processes (default: all CPUs)')
+    parser.add_argument('--implementations', type=lambda value: value.split(','), default=implementations,
+                        help=f'Comma-separated implementations (default: all of {", ".join(implementations)})')
+    parser.add_argument('--reference', default=REFERENCE,
+                        help=f'Implementation the others are diffed against (default: {REFERENCE})')
+    parser.add_argument('--original', type=Path, default=ORIGINAL_SCRIPT, help='Path to PT_Nov2024.py')
+    parser.add_argument('--report', type=Path, help='Write totals and per-volume results as JSON')
+    args = parser.parse_args()
+    unknown = [name for name in args.implementations if name not in implementations]
+    if unknown:
+        parser.error(f"Unknown implementations: {', '.join(unknown)} (choose from {', '.join(implementations)})")
+    if args.reference not in args.implementations:
+        args.implementations.insert(0, args.reference)
+    return args
+
+
+def main():
+    args = parse_arguments()
+    paths = sample_paths(args.input, args.sample, args.seed)
+    print(f"Comparing {len(args.implementations)} implementations on {len(paths)} volumes "
+          f"with {args.workers} workers (reference: {args.reference})")
+
+    needs_original = REFERENCE in args.implementations
+    if needs_original:
+        # Loaded once here so that forked workers inherit it
+        load_original(args.original)
+    tasks = ((index, path, args.implementations, args.reference) for index, path in enumerate(paths))
+    with mp.Pool(processes=args.workers, initializer=init_harness, initargs=(args.original, needs_original)) as pool:
+        records = list(tqdm(pool.imap_unordered(compare_volume, tasks), total=len(paths), desc="Comparing volumes"))
+    records.sort(key=lambda record: record['path'])
+    totals, problems, skipped = summarize(records, args.implementations, args.reference)
+
+    print("\n" + "="*80)
+    print("EQUIVALENCE RESULTS")
+    print("="*80)
+    print(f"{'Implementation':<28}{'Volumes':>8}{'Errors':>8}{'Mismatch':>10}{'Read s':>9}{'Pipeline s':>12}{'Speedup':>9}")
+    for name in args.implementations:
+        total = totals[name]
+        speedup = f"{total['speedup']}x" if total['speedup'] is not None else '-'
+        print(f"{name:<28}{total['volumes']:>8}{total['errors']:>8}{total['mismatched_volumes']:>10}"
+              f"{total['read_seconds']:>9}{total['pipeline_seconds']:>12}{speedup:>9}")
+    print(f"\nSpeedup: {args.reference} seconds / implementation seconds (read + pipeline, per worker), "
+          f"on volumes where both succeeded")
+    if skipped:
+        print(f"{skipped} volumes could not be read by any implementation and were skipped")
+
+    if args.report:
+        args.report.write_text(json.dumps({'reference': args.reference, 'input': str(args.input),
+                                           'volumes': len(paths), 'skipped': skipped, 'totals': totals,
+                                           'problems': problems, 'records': records}, indent=2))
+        print(f"Report written to {args.report}")
+
+    if problems:
+        print(f"\n[FAILED] {len(problems)} disagreements:")
+        for problem in problems[:20]:
+            print(f"  {problem}")
+        if len(problems) > 20:
+            print(f"  ... and {len(problems) - 20} more")
+        sys.exit(1)
+    print(f"\n[OK] All implementations agree with {args.reference} on {len(paths) - skipped} volumes")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,26 @@ Tests processing logic without requiring large HTRC files.
 Verifies that processing parameters are fixed for reproducibility.
 """
 
+import bz2
+import gzip
+import io
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import tarfile
+import tempfile
+import time
 import unittest
+from collections import Counter
 import sys
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
 # Add parent directory to path to import preprocessing module
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -21,8 +37,76 @@ from preprocess_htrc import (
     MIN_WORD_FREQUENCY,
     GREEK_CORRECTION,
     LIGATURES,
-    STOPWORD_FILTERS
+    STOPWORD_FILTERS,
+    PIPELINE_ENGINES,
+    normalize_token,
+    resolve_token,
+    resolve_word,
+    set_vocabulary_tables,
+    build_vocabulary_tables,
+    sibling_path,
+    load_manifest,
+    is_completed,
+    pending_volumes,
+    scan_htrc_files,
+    read_extracted_features,
+    stream_extracted_features,
+    JSONStream,
+    read_with_feature_reader,
+    volume_token_arrays,
+    getFeatureReader,
+    CleanAndWrite,
+    RunOptions,
+    htid_from_filename,
+    process_volume_pipeline,
+    process_volume_pipeline_vectorized,
+    process_volume_wrapper,
+    output_filename,
+    close_shards,
+    merge_doc_term_parts,
+    load_doc_term_matrix,
+    summarize_profile,
+    assign_shards,
+    select_shard,
+    shard_tag,
+    verify_shards,
+    TokenVocabulary,
+    DROPPED,
+    LookupCache,
+    lemmatize_or_stem,
+    lemmatize_uncached,
+    save_lookup_part,
+    merge_lookup_snapshot,
+    load_lookup_snapshot,
+    lookup_snapshot_parts_path,
+    prefetch_files,
+    load_quarantine,
+    load_archive_index,
+    read_archive_volume,
+    iter_archive,
+    VolumeTimeout,
 )
+import preprocess_htrc
+from benchmark import SyntheticCorpus, body_token_counts
+import equivalence
+
+
+SAMPLE_DATA = Path(__file__).parent / "sample_data"
+
+
+class FakeVolume:
+    """Minimal stand-in for an htrc_features Volume with a fixed body tokenlist"""
+
+    def __init__(self, rows):
+        index = pd.MultiIndex.from_tuples(
+            [('body', token, pos) for token, pos, _ in rows],
+            names=['section', 'lowercase', 'pos'])
+        self.id = 'test.fake'
+        self._df = pd.DataFrame({'count': [count for _, _, count in rows]},
+                                index=index).astype('uint32')
+
+    def tokenlist(self, pages=False, case=False, section='body'):
+        return self._df.copy()
 
 
 class TestProcessingParameters(unittest.TestCase):
@@ -163,6 +247,970 @@ class TestRomanNumerals(unittest.TestCase):
                            f"Roman numeral for {i} should be lowercase")
 
 
+class TestVectorizedEngine(unittest.TestCase):
+    """The vectorized engine must match the pandas pipeline exactly"""
+
+    def assertSameOutput(self, volume_factory):
+        expected = process_volume_pipeline(volume_factory()).sort_values('count', ascending=False)
+        actual = process_volume_pipeline_vectorized(volume_factory()).sort_values('count', ascending=False)
+        self.assertEqual(list(expected.index), list(actual.index))
+        self.assertEqual(list(expected['count']), list(actual['count']))
+        self.assertEqual(expected['count'].dtype, actual['count'].dtype)
+
+    def test_engines_registered(self):
+        """Both engines should be selectable"""
+        self.assertEqual(set(PIPELINE_ENGINES), {'pandas', 'vectorized'})
+
+    def test_normalize_token(self):
+        """Token normalization should strip punctuation and fix characters"""
+        self.assertEqual(normalize_token('ﬁrſt,'), 'first')
+        self.assertEqual(normalize_token('o\'er'), 'oer')
+
+    def test_synthetic_volume(self):
+        """Punctuation, corrections, stopwords, archaic words and low counts"""
+        rows = [
+            ('progress', 'NN', 5), ('progress,', 'NN', 2), ('progresses', 'NNS', 9),
+            ('improvements', 'NNS', 1), ('improvement', 'NN', 3), ('improved', 'VBD', 4),
+            ('ﬁnding', 'VBG', 3), ('finding', 'NN', 2), ('the', 'DT', 40),
+            ('tiie', 'DT', 7), ('iie', 'NN', 3), ('shew', 'VB', 6), ('shews', 'VBZ', 2),
+            ('capt', 'NNP', 3), ('xiv', 'NNP', 4), ('ab', 'NN', 10), ('rare', 'JJ', 1),
+            ('quickly', 'RB', 2), ('ran', 'VBD', 3), ('running', 'VBG', 2),
+        ]
+        self.assertSameOutput(lambda: FakeVolume(rows))
+
+    def test_empty_after_filters(self):
+        """Volumes with nothing left after filtering give an empty result"""
+        rows = [('the', 'DT', 5), ('of', 'IN', 3), ('a', 'DT', 2), ('word', 'NN', 1)]
+        self.assertSameOutput(lambda: FakeVolume(rows))
+        self.assertTrue(process_volume_pipeline_vectorized(FakeVolume(rows)).empty)
+
+    def test_sample_volumes(self):
+        """Sample HTRC volumes should produce identical output"""
+        from htrc_features import FeatureReader
+        paths = sorted(str(path) for path in SAMPLE_DATA.rglob('*.json.bz2'))
+        self.assertTrue(paths)
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertSameOutput(lambda: FeatureReader([path]).first())
+
+
+class TestTwoPassVocabulary(unittest.TestCase):
+    """Corpus-wide lookup tables must not change the output"""
+
+    ROWS = [
+        ('progress', 'NN', 5), ('progresses', 'NNS', 9), ('ﬁnding', 'VBG', 3),
+        ('finding', 'NN', 2), ('tiie', 'DT', 7), ('shew', 'VB', 6), ('capt', 'NNP', 3),
+    ]
+
+    def tearDown(self):
+        set_vocabulary_tables({}, {})
+
+    def test_resolvers(self):
+        """Per-value resolvers should apply corrections, filters and stemming"""
+        self.assertIsNone(resolve_token('ab'))
+        self.assertEqual(resolve_token('tiie'), 'the')
+        self.assertIsNone(resolve_word('the', 'DT'))
+        self.assertEqual(resolve_word('shew', 'VB'), 'show')
+
+    def test_tables_match_on_the_fly(self):
+        """Output with full tables should equal output without tables"""
+        expected = process_volume_pipeline_vectorized(FakeVolume(self.ROWS))
+        token_table = {token: resolve_token(token) for token, _, _ in self.ROWS}
+        word_table = {(token_table[token], pos): resolve_word(token_table[token], pos)
+                      for token, pos, _ in self.ROWS if token_table[token] is not None}
+        set_vocabulary_tables(token_table, word_table)
+        actual = process_volume_pipeline_vectorized(FakeVolume(self.ROWS))
+        pd.testing.assert_frame_equal(expected, actual)
+
+    def test_tables_are_used(self):
+        """Table entries should take precedence over resolving"""
+        set_vocabulary_tables({'progress': 'marker'}, {('marker', 'NN'): 'marker'})
+        result = process_volume_pipeline_vectorized(FakeVolume(self.ROWS))
+        self.assertEqual(result.loc['marker', 'count'], 5)
+
+    def test_build_tables_from_sample_data(self):
+        """The first pass should resolve every token in the sample volumes"""
+        paths = sorted(str(path) for path in SAMPLE_DATA.rglob('*.json.bz2'))
+        token_table, word_table = build_vocabulary_tables(paths, num_processes=1)
+        self.assertIn('the', token_table)
+        for (word, pos), stem in list(word_table.items())[:200]:
+            self.assertEqual(stem, resolve_word(word, pos))
+
+
+class TestManifest(unittest.TestCase):
+    """Manifest records drive --resume"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.input = self.dir / 'vol.json.bz2'
+        self.input.write_bytes(b'data')
+        self.output = self.dir / 'vol.txt'
+        self.output.write_text('word word ')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def record(self, **overrides):
+        stat = os.stat(self.input)
+        record = {'htid': 'vol', 'input': str(self.input), 'size': stat.st_size,
+                  'mtime': stat.st_mtime, 'output': str(self.output),
+                  'tokens': 2, 'stems': 1, 'status': 'ok'}
+        record.update(overrides)
+        return record
+
+    def test_default_path_outside_output(self):
+        """The manifest should not land inside the MALLET input directory"""
+        path = sibling_path(Path('/data/cleaned'), '.manifest.jsonl')
+        self.assertEqual(path, Path('/data/cleaned.manifest.jsonl'))
+        path = sibling_path(Path('/data/cleaned'), '.manifest.jsonl', 'shard-001-of-004')
+        self.assertEqual(path, Path('/data/cleaned.shard-001-of-004.manifest.jsonl'))
+
+    def test_latest_record_wins(self):
+        """Later records replace earlier ones; truncated lines are ignored"""
+        manifest_path = self.dir / 'manifest.jsonl'
+        with open(manifest_path, 'w') as f:
+            f.write(json.dumps(self.record(status='failed')) + '\n')
+            f.write(json.dumps(self.record()) + '\n')
+            f.write('{"htid": "vol", "sta')
+        self.assertEqual(load_manifest(manifest_path)['vol']['status'], 'ok')
+        self.assertEqual(load_manifest(self.dir / 'missing.jsonl'), {})
+
+    def test_is_completed(self):
+        """Only successful, unchanged volumes with existing output are complete"""
+        self.assertTrue(is_completed(self.record(), self.input))
+        self.assertFalse(is_completed(None, self.input))
+        self.assertFalse(is_completed(self.record(status='failed'), self.input))
+        self.assertFalse(is_completed(self.record(size=1), self.input))
+        self.output.unlink()
+        self.assertFalse(is_completed(self.record(), self.input))
+
+    def test_pending_volumes(self):
+        """Completed sample volumes should be skipped"""
+        htrc_files = scan_htrc_files(SAMPLE_DATA)
+        htid = htrc_files.index[0]
+        row = htrc_files.iloc[0]
+        sample = Path(row['Path']) / row['Filename']
+        stat = os.stat(sample)
+        manifest = {htid: {'htid': htid, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                           'output': str(self.output), 'status': 'ok'}}
+        pending = pending_volumes(htrc_files, manifest)
+        self.assertEqual(len(pending), len(htrc_files) - 1)
+        self.assertNotIn(htid, pending.index)
+
+
+def write_extracted_features(path, htid, pages):
+    """Write a minimal Extracted Features file; pages is a list of {section: tokenPosCount}"""
+    obj = {
+        'htid': htid,
+        'metadata': {'genre': []},
+        'features': {
+            'schemaVersion': 'https://schemas.hathitrust.org/EF_Schema_FeaturesSubSchema_v_3.0',
+            'pageCount': len(pages),
+            'pages': [
+                dict({'seq': f'{i + 1:08d}', 'tokenCount': sum(sum(c.values()) for s in page.values() for c in s.values())},
+                     **{section: ({'tokenCount': sum(sum(c.values()) for c in page[section].values()),
+                                   'tokenPosCount': page[section]} if section in page else None)
+                        for section in ('header', 'body', 'footer')})
+                for i, page in enumerate(pages)
+            ],
+        },
+    }
+    with bz2.open(path, 'wt', encoding='utf8') as f:
+        json.dump(obj, f)
+
+
+class TestDirectReader(unittest.TestCase):
+    """The direct reader must match htrc_features token counts"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assertSameCounts(self, path):
+        expected = volume_token_arrays(read_with_feature_reader(path))
+        keep = pd.Index(expected[1]).isin(POS_TAGS)
+        volume = read_extracted_features(path)
+        self.assertEqual(list(pd.Index(expected[0])[keep]), list(volume.tokens))
+        self.assertEqual(list(pd.Index(expected[1])[keep]), list(volume.pos_tags))
+        self.assertEqual(list(expected[2][keep]), list(volume.counts))
+        self.assertEqual(expected[2].dtype, volume.counts.dtype)
+
+    def test_sample_volumes(self):
+        """Sample HTRC volumes should give the same (token, POS) counts"""
+        for path in sorted(SAMPLE_DATA.rglob('*.json.bz2')):
+            with self.subTest(path=path):
+                self.assertSameCounts(str(path))
+                self.assertEqual(read_extracted_features(path).id,
+                                 read_with_feature_reader(str(path)).id)
+
+    def test_case_folding_and_long_tokens(self):
+        """Case variants are summed and long tokens truncated like htrc_features"""
+        path = self.dir / 'test.fake.json.bz2'
+        long_token = 'a' * 70
+        write_extracted_features(path, 'test.fake', [
+            {'body': {'Progress': {'NN': 2}, 'progress': {'NN': 1, 'VB': 1}, long_token: {'NN': 1}},
+             'header': {'Title': {'NNP': 1}}},
+            {'body': {'PROGRESS': {'NN': 4, 'CD': 3}, 'a' * 65: {'NN': 2}}},
+        ])
+        self.assertSameCounts(str(path))
+        volume = read_extracted_features(path)
+        self.assertEqual(dict(zip(zip(volume.tokens, volume.pos_tags), volume.counts)),
+                         {('a' * 64, 'NN'): 3, ('progress', 'NN'): 7, ('progress', 'VB'): 1})
+
+    def test_volume_without_tokens(self):
+        """A volume with no tokens at all fails, as with htrc_features"""
+        path = self.dir / 'test.empty.json.bz2'
+        write_extracted_features(path, 'test.empty', [{}])
+        with self.assertRaises(ValueError):
+            read_extracted_features(path)
+
+
+class TestCleanAndWrite(unittest.TestCase):
+    """End-to-end pool run with streamed records"""
+
+    def test_streamed_records_and_summary(self):
+        """Records go to the manifest, totals to the summary, with worker recycling"""
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            output = tmp / 'out'
+            output.mkdir()
+            corpus = getFeatureReader(scan_htrc_files(SAMPLE_DATA))
+            summary = CleanAndWrite(corpus, output, RunOptions(
+                num_processes=2, chunksize=1, max_tasks_per_child=1,
+                manifest_path=tmp / 'manifest.jsonl', summary_path=tmp / 'summary.json'))
+            records = [json.loads(line) for line in open(tmp / 'manifest.jsonl')]
+
+            self.assertEqual(summary['volumes'], len(corpus))
+            self.assertEqual(summary['ok'], len(corpus))
+            self.assertEqual(json.load(open(tmp / 'summary.json'))['ok'], len(corpus))
+            self.assertEqual(sorted(r['htid'] for r in records),
+                             sorted(htid_from_filename(Path(path).name) for path in corpus.ids))
+            self.assertEqual(summary['tokens'], sum(r['tokens'] for r in records))
+            self.assertEqual(len(list(output.iterdir())), len(corpus))
+
+    def test_missing_input_fails_one_volume(self):
+        """A file removed after the scan is recorded as failed; the run carries on"""
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            shutil.copytree(SAMPLE_DATA, tmp / 'input')
+            output = tmp / 'out'
+            output.mkdir()
+            corpus = getFeatureReader(scan_htrc_files(tmp / 'input'))
+            missing = Path(sorted(corpus.ids)[0])
+            missing.unlink()
+
+            record = process_volume_wrapper((missing, output, RunOptions(), None))
+            self.assertEqual((record['status'], record['size'], record['mtime']), ('failed', None, None))
+
+            summary = CleanAndWrite(corpus, output, RunOptions(num_processes=2, manifest_path=tmp / 'manifest.jsonl'))
+            self.assertEqual((summary['ok'], summary['failed']), (len(corpus) - 1, 1))
+            records = {r['input']: r for r in map(json.loads, open(tmp / 'manifest.jsonl'))}
+            self.assertEqual(records[str(missing)]['status'], 'failed')
+
+
+class TestReferenceCache(unittest.TestCase):
+    """Precompiled reference-data cache"""
+
+    def setUp(self):
+        self.cache_dir = preprocess_htrc.REFERENCE_CACHE_DIR
+
+    def tearDown(self):
+        preprocess_htrc.REFERENCE_CACHE_DIR = self.cache_dir
+
+    def test_fingerprint_is_stable_and_versioned(self):
+        """Same sources give the same key; the format version is part of the file name"""
+        fingerprint = preprocess_htrc.reference_data_fingerprint()
+        self.assertEqual(fingerprint, preprocess_htrc.reference_data_fingerprint())
+        name = preprocess_htrc.reference_cache_path(fingerprint).name
+        self.assertTrue(name.startswith(f"reference_v{preprocess_htrc.REFERENCE_CACHE_VERSION}_"))
+
+    def test_cache_round_trip(self):
+        """A miss builds and writes the cache; the next load reads identical data from it"""
+        with tempfile.TemporaryDirectory() as tmp:
+            preprocess_htrc.REFERENCE_CACHE_DIR = Path(tmp) / 'cache'
+            built, from_cache = preprocess_htrc.load_reference_data()
+            self.assertFalse(from_cache)
+            loaded, from_cache = preprocess_htrc.load_reference_data()
+            self.assertTrue(from_cache)
+
+        self.assertEqual(loaded.keys(), built.keys())
+        for key, value in built.items():
+            if isinstance(value, pd.DataFrame):
+                pd.testing.assert_frame_equal(loaded[key], value)
+            else:
+                self.assertEqual(loaded[key], value)
+        self.assertEqual(loaded['stems'], preprocess_htrc.stems)
+
+
+class TestOutputFormats(unittest.TestCase):
+    """Per-volume files, sharded corpus and archive output"""
+
+    def tearDown(self):
+        close_shards()
+
+    def run_volumes(self, output, options):
+        paths = sorted(SAMPLE_DATA.rglob('*.json.bz2'))[:2]
+        return [process_volume_wrapper((path, output, options, None)) for path in paths]
+
+    def test_corpus_lines_match_volume_files(self):
+        """Each corpus line carries exactly the text of the volume's .txt file"""
+        with tempfile.TemporaryDirectory() as tmp:
+            files, corpus = Path(tmp) / 'files', Path(tmp) / 'corpus'
+            files.mkdir()
+            corpus.mkdir()
+            self.run_volumes(files, RunOptions())
+            records = self.run_volumes(corpus, RunOptions(output_format='corpus', compress=True,
+                                                          counts_sidecar=True, run_tag='test'))
+
+            shards = sorted(path.name for path in corpus.iterdir())
+            self.assertEqual(shards, [f'corpus-test-{os.getpid()}.txt.gz', f'counts-test-{os.getpid()}.txt.gz'])
+            self.assertEqual({r['output'] for r in records}, {str(corpus / shards[0])})
+
+            lines = gzip.open(corpus / shards[0], 'rt', encoding='utf8').read().splitlines()
+            counts = gzip.open(corpus / shards[1], 'rt', encoding='utf8').read().splitlines()
+            self.assertEqual(len(lines), len(records))
+            for line, count_line, record in zip(lines, counts, records):
+                htid, label, text = line.split('\t')
+                self.assertEqual(htid, record['htid'])
+                self.assertEqual(label, 'corpus')
+                self.assertEqual(text, open(files / output_filename(htid), encoding='utf8').read().rstrip(' '))
+
+                htid, pairs = count_line.split('\t')
+                self.assertEqual(htid, record['htid'])
+                self.assertEqual({word: int(n) for word, n in (pair.split(':') for pair in pairs.split())},
+                                 dict(Counter(text.split())))
+
+    def test_archive_members_match_volume_files(self):
+        """Archive members, read by seek or by streaming, are the volumes' .txt files; shards roll over"""
+        for compress in (False, True):
+            with tempfile.TemporaryDirectory() as tmp, self.subTest(compress=compress):
+                files, archive = Path(tmp) / 'files', Path(tmp) / 'archive'
+                files.mkdir()
+                archive.mkdir()
+                self.run_volumes(files, RunOptions())
+                # A shard size of 0 starts a new shard for every volume
+                records = self.run_volumes(archive, RunOptions(output_format='archive', compress=compress,
+                                                               run_tag='test', archive_shard_size=0))
+                close_shards()
+
+                shards = sorted(archive.glob('*.tar'))
+                self.assertEqual([shard.name for shard in shards],
+                                 [f'volumes-test-{os.getpid()}-{n:03d}.tar' for n in range(len(records))])
+                self.assertEqual([r['output'] for r in records], [str(shard) for shard in shards])
+
+                index = load_archive_index(archive)
+                for record, shard in zip(records, shards):
+                    expected = open(files / output_filename(record['htid']), encoding='utf8').read()
+                    self.assertEqual(read_archive_volume(index[record['htid']]), expected)
+                    self.assertEqual([text for _, text in iter_archive(shard)], [expected])
+                    with tarfile.open(shard) as tar:
+                        self.assertEqual(tar.getnames(), [index[record['htid']][1]])
+
+    def test_archive_never_truncates_a_shard(self):
+        """A new process with a reused pid starts a new shard instead of overwriting the earlier one"""
+        paths = sorted(SAMPLE_DATA.rglob('*.json.bz2'))[:2]
+        options = RunOptions(output_format='archive', run_tag='test')
+        with tempfile.TemporaryDirectory() as tmp:
+            files, archive = Path(tmp) / 'files', Path(tmp) / 'archive'
+            files.mkdir()
+            archive.mkdir()
+            self.run_volumes(files, RunOptions())
+            records = []
+            for path in paths:
+                records.append(process_volume_wrapper((path, archive, options, None)))
+                # Fresh per-process state, as in a recycled worker given the same pid
+                close_shards()
+                preprocess_htrc.archive_sequences.clear()
+
+            self.assertEqual([Path(r['output']).name for r in records],
+                             [f'volumes-test-{os.getpid()}-{n:03d}.tar' for n in range(len(records))])
+            index = load_archive_index(archive)
+            for record in records:
+                expected = open(files / output_filename(record['htid']), encoding='utf8').read()
+                self.assertEqual(read_archive_volume(index[record['htid']]), expected)
+                self.assertEqual([text for _, text in iter_archive(record['output'])], [expected])
+
+
+class TestDocTermMatrix(unittest.TestCase):
+    """Doc-term matrix parts and merge"""
+
+    def tearDown(self):
+        close_shards()
+
+    def test_matrix_matches_volume_files(self):
+        """Each row holds the word counts of the volume's .txt file; reruns keep the latest counts"""
+        with tempfile.TemporaryDirectory() as tmp:
+            output, doc_term = Path(tmp) / 'out', Path(tmp) / 'out.doc_term'
+            (doc_term / 'parts').mkdir(parents=True)
+            output.mkdir()
+            paths = sorted(SAMPLE_DATA.rglob('*.json.bz2'))
+            for run_tag, run_paths in (('run1', paths[:3]), ('run2', paths[2:])):
+                options = RunOptions(run_tag=run_tag, doc_term_dir=doc_term)
+                for path in run_paths:
+                    process_volume_wrapper((path, output, options, None))
+                close_shards()
+
+            shape, _ = merge_doc_term_parts(doc_term)
+            matrix, htids, vocabulary = load_doc_term_matrix(doc_term)
+
+            self.assertEqual(shape, (len(paths), len(vocabulary)))
+            self.assertEqual(htids, sorted(htids))
+            self.assertEqual(vocabulary, sorted(vocabulary))
+            for row, htid in enumerate(htids):
+                text = open(output / output_filename(htid), encoding='utf8').read()
+                counts = matrix.getrow(row)
+                self.assertEqual({vocabulary[column]: int(n) for column, n in zip(counts.indices, counts.data)},
+                                 dict(Counter(text.split())))
+
+    def merged_rows(self, doc_term):
+        merge_doc_term_parts(doc_term)
+        matrix, htids, vocabulary = load_doc_term_matrix(doc_term)
+        rows = {htid: {vocabulary[column]: int(n) for column, n in zip(row.indices, row.data)}
+                for htid, row in zip(htids, matrix)}
+        return rows, vocabulary
+
+    def test_duplicate_htid_lines_in_one_part(self):
+        """The last line of an HTID wins, even within one part; superseded words leave no columns"""
+        with tempfile.TemporaryDirectory() as tmp:
+            doc_term = Path(tmp)
+            (doc_term / 'parts').mkdir()
+            (doc_term / 'parts' / 'counts-run-1.txt').write_text(
+                "a.1\told:2 gone:1\n"       # superseded by a longer line
+                "b.2\tsame:1\n"
+                "a.1\tnew:3 word:1 more:2\n"
+                "b.2\tsame:4\n",             # superseded by a line of the same length
+                encoding='utf8')
+            rows, vocabulary = self.merged_rows(doc_term)
+            self.assertEqual(rows, {'a.1': {'new': 3, 'word': 1, 'more': 2}, 'b.2': {'same': 4}})
+            self.assertEqual(vocabulary, ['more', 'new', 'same', 'word'])
+
+    def test_truncated_gzip_part(self):
+        """A gzip member cut off by a killed worker keeps the complete lines before it"""
+        with tempfile.TemporaryDirectory() as tmp:
+            doc_term = Path(tmp)
+            (doc_term / 'parts').mkdir()
+            last = gzip.compress(b"c.3\tlost:1\n")
+            (doc_term / 'parts' / 'counts-run-1.txt.gz').write_bytes(
+                gzip.compress(b"a.1\tone:1\n") + gzip.compress(b"b.2\ttwo:2\n") + last[:len(last) // 2])
+            (doc_term / 'parts' / 'counts-run-2.txt').write_text("d.4\tfour:4\n", encoding='utf8')
+            with self.assertLogs(level='WARNING'):
+                rows, vocabulary = self.merged_rows(doc_term)
+            self.assertEqual(rows, {'a.1': {'one': 1}, 'b.2': {'two': 2}, 'd.4': {'four': 4}})
+
+
+class TestFileCatalog(unittest.TestCase):
+    """Single-pass scanner and its cached catalog"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input = Path(self.tmp.name) / 'input'
+        shutil.copytree(SAMPLE_DATA, self.input)
+        self.catalog = Path(self.tmp.name) / 'catalog.json'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_default_path_outside_output(self):
+        """The catalog should not land inside the MALLET input directory"""
+        self.assertEqual(sibling_path(Path('/data/cleaned'), '.catalog.json'), Path('/data/cleaned.catalog.json'))
+
+    def test_scan_finds_every_file(self):
+        """One scan finds the same files as a recursive glob, with their size"""
+        htrc_files = scan_htrc_files(self.input, catalog_path=self.catalog)
+        expected = sorted(self.input.rglob('*.json.bz2'))
+        self.assertEqual(sorted(Path(row.Path) / row.Filename for row in htrc_files.itertuples()), expected)
+        self.assertEqual(sorted(htrc_files['Size']), sorted(path.stat().st_size for path in expected))
+        self.assertTrue(self.catalog.exists())
+
+    def test_refresh_sees_added_and_removed_files(self):
+        """Directories changed since the catalog was saved are listed again"""
+        first = scan_htrc_files(self.input, catalog_path=self.catalog)
+        removed = next(self.input.rglob('*.json.bz2'))
+        added = removed.parent.parent / 'new' / 'test.00000001.json.bz2'
+        added.parent.mkdir()
+        shutil.copy(removed, added)
+        removed.unlink()
+
+        refreshed = scan_htrc_files(self.input, catalog_path=self.catalog)
+        self.assertIn('test.00000001', refreshed.index)
+        self.assertNotIn(htid_from_filename(removed.name), refreshed.index)
+        self.assertEqual(len(refreshed), len(first))
+        pd.testing.assert_frame_equal(refreshed, scan_htrc_files(self.input, catalog_path=self.catalog, rescan=True))
+
+
+class TestProfiling(unittest.TestCase):
+    """--profile stage timings and their summary"""
+
+    def test_record_carries_stage_timings(self):
+        """Each engine reports its stages, from reading to writing, with row counts"""
+        path = sorted(SAMPLE_DATA.rglob('*.json.bz2'))[0]
+        with tempfile.TemporaryDirectory() as tmp:
+            for engine in PIPELINE_ENGINES:
+                options = RunOptions(engine=engine, profile_path=Path(tmp) / 'profile.csv')
+                record = process_volume_wrapper((path, Path(tmp), options, None))
+                stages = record['stages']
+                self.assertEqual(list(stages)[0], 'read')
+                self.assertEqual(list(stages)[-1], 'write')
+                self.assertEqual(stages['write'][1], record['stems'])
+                self.assertTrue(all(seconds >= 0 for seconds, _ in stages.values()))
+
+            record = process_volume_wrapper((path, Path(tmp), RunOptions(), None))
+            self.assertNotIn('stages', record)
+
+    def test_summary_quantiles_and_slowest(self):
+        """Per-stage quantiles, a total row, and volumes ranked by total time"""
+        with tempfile.TemporaryDirectory() as tmp:
+            log = Path(tmp) / 'out.profile.csv'
+            rows = [['htid', 'stage', 'seconds', 'rows']]
+            for i in range(1, 101):
+                rows += [[f'vol{i}', 'read', i / 100, ''], [f'vol{i}', 'write', 0.5, 10]]
+            log.write_text(''.join(','.join(map(str, row)) + '\n' for row in rows))
+
+            summary, slowest = summarize_profile(log)
+
+        self.assertEqual(list(summary.index), ['read', 'write', 'total'])
+        self.assertEqual(summary.loc['read', 'volumes'], 100)
+        self.assertAlmostEqual(summary.loc['read', 'p50'], 0.505)
+        self.assertAlmostEqual(summary.loc['total', 'p99'], 1.4901)
+        self.assertEqual(slowest.index[0], 'vol100')
+        self.assertAlmostEqual(slowest.loc['vol100', 'total'], 1.5)
+
+
+class TestSyntheticCorpus(unittest.TestCase):
+    """Synthetic volumes used by benchmark.py"""
+
+    def test_generated_volumes_are_deterministic_and_readable(self):
+        """Same seed, same files; both readers and both engines agree on them"""
+        with tempfile.TemporaryDirectory() as tmp:
+            digests = []
+            for run in ('a', 'b'):
+                corpus = SyntheticCorpus(seed=7, vocabulary_size=2000, median_pages=3, tokens_per_page=100)
+                tokens = corpus.generate(Path(tmp) / run, 3)
+                paths = sorted((Path(tmp) / run).rglob('*.json.bz2'))
+                self.assertEqual(tokens, sum(body_token_counts(path) for path in paths))
+                digests.append([bz2.open(path).read() for path in paths])
+            self.assertEqual(digests[0], digests[1])
+
+            for path in paths:
+                outputs = [PIPELINE_ENGINES[engine](reader(str(path))) for engine in sorted(PIPELINE_ENGINES)
+                           for reader in (read_extracted_features, read_with_feature_reader)]
+                for output in outputs[1:]:
+                    self.assertTrue(output.equals(outputs[0]))
+
+
+class TestEquivalenceHarness(unittest.TestCase):
+    """equivalence.py: the original script and the refactor agree"""
+
+    def test_original_matches_refactor(self):
+        equivalence.load_original()
+        names = [equivalence.REFERENCE, 'vectorized/direct']
+        self.assertIn(names[1], equivalence.implementation_names())
+        smallest = sorted(SAMPLE_DATA.rglob('*.json.bz2'), key=lambda path: path.stat().st_size)[:3]
+        records = [equivalence.compare_volume((index, str(path), names, equivalence.REFERENCE))
+                   for index, path in enumerate(smallest)]
+        totals, problems, skipped = equivalence.summarize(records, names, equivalence.REFERENCE)
+        self.assertEqual((problems, skipped), ([], 0))
+        self.assertTrue(all(total['volumes'] == 3 and total['speedup'] for total in totals.values()))
+
+    def test_differences_are_reported(self):
+        result = {'read_seconds': 0.1, 'pipeline_seconds': 0.1, 'stems': 2}
+        records = [{'path': 'vol.json.bz2', 'results': {
+            'original': dict(result),
+            'vectorized/direct': dict(result, differences=1, examples=[('word', 3, 2)]),
+            'pandas/direct': {'error': 'ValueError: unreadable'}}}]
+        totals, problems, skipped = equivalence.summarize(records, ['original', 'vectorized/direct', 'pandas/direct'],
+                                                          'original')
+        self.assertEqual(totals['vectorized/direct']['mismatched_volumes'], 1)
+        self.assertEqual(totals['pandas/direct']['errors'], 1)
+        self.assertEqual(len(problems), 2)
+        self.assertIn('word: 3 -> 2', problems[1] + problems[0])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            script = Path(tmp) / 'PT_Nov2024.py'
+            script.write_text("corr = pd.read_csv('Master_Corrections.csv')\n")
+            with self.assertRaises(ValueError):
+                equivalence.original = None
+                equivalence.load_original(script)
+
+
+class TestSharding(unittest.TestCase):
+    """Deterministic size-balanced shards and their verification"""
+
+    def catalog(self, sizes):
+        return pd.DataFrame({'Filename': [f'vol{i}.json.bz2' for i in range(len(sizes))],
+                             'Path': '/input', 'Size': sizes},
+                            index=pd.Index([f'vol{i}' for i in range(len(sizes))], name='HTID'))
+
+    def test_assignment_is_balanced_and_order_independent(self):
+        """Shard totals differ by at most the largest file; row order does not matter"""
+        sizes = [int(size) for size in np.random.default_rng(0).lognormal(10, 1, 500)]
+        htrc_files = self.catalog(sizes)
+        assignment = pd.Series(assign_shards(htrc_files, 7), index=htrc_files.index)
+        totals = htrc_files['Size'].groupby(assignment).sum()
+        self.assertEqual(len(totals), 7)
+        self.assertLessEqual(totals.max() - totals.min(), max(sizes))
+
+        shuffled = htrc_files.sample(frac=1, random_state=1)
+        self.assertTrue(pd.Series(assign_shards(shuffled, 7), index=shuffled.index)
+                        .sort_index().equals(assignment.sort_index()))
+        shards = [select_shard(htrc_files, index, 7) for index in range(7)]
+        self.assertEqual(sorted(htid for shard in shards for htid in shard.index), sorted(htrc_files.index))
+
+    def test_verify_reports_missing_and_duplicated(self):
+        """Volumes in no shard, or in two, are reported"""
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            output = tmp / 'out'
+            output.mkdir()
+            for i in range(3):
+                (tmp / f'vol{i}.json.bz2').write_bytes(b'x' * (i + 1))
+                (output / f'vol{i}.txt').write_text('word ')
+            htrc_files = self.catalog([1, 2, 3]).assign(Path=str(tmp))
+
+            def record(htid):
+                stat = os.stat(tmp / f'{htid}.json.bz2')
+                return json.dumps({'htid': htid, 'status': 'ok', 'size': stat.st_size, 'mtime': stat.st_mtime,
+                                   'output': str(output / f'{htid}.txt')}) + '\n'
+
+            (tmp / f'out.{shard_tag(0, 2)}.manifest.jsonl').write_text(record('vol0') + record('vol1'))
+            (tmp / f'out.{shard_tag(1, 2)}.manifest.jsonl').write_text(record('vol1'))
+
+            report = verify_shards(htrc_files, output, 2)
+        self.assertEqual(report['missing'], ['vol2'])
+        self.assertEqual(report['duplicated'], ['vol1'])
+        self.assertEqual(report['incomplete'], [])
+        self.assertEqual(report['missing_manifests'], [])
+
+
+class TestTokenVocabulary(unittest.TestCase):
+    """Per-worker integer interning used by the vectorized engine"""
+
+    def test_remaps_are_cached(self):
+        """Tokens and pairs are resolved once; later lookups are array remaps"""
+        vocabulary = TokenVocabulary()
+        token_ids = vocabulary.intern_all(np.array(['progress', 'ab', 'progress', 'tiie'], dtype=object))
+        self.assertEqual(token_ids[0], token_ids[2])
+
+        words = vocabulary.words(token_ids)
+        self.assertEqual(words[1], DROPPED)
+        self.assertEqual(vocabulary.strings[words[3]], 'the')
+        size = len(vocabulary)
+        np.testing.assert_array_equal(vocabulary.words(token_ids), words)
+        self.assertEqual(len(vocabulary), size)
+
+        tag = vocabulary.tags.index('NN')
+        stems = vocabulary.stems(words[[0, 3]], np.array([tag, vocabulary.tags.index('DT')]))
+        self.assertEqual(vocabulary.strings[stems[0]], 'progress')
+        self.assertEqual(stems[1], DROPPED)
+        size = len(vocabulary)
+        np.testing.assert_array_equal(vocabulary.stems(words[[3, 0, 0]], np.array([vocabulary.tags.index('DT'), tag, tag])),
+                                      stems[[1, 0, 0]])
+        self.assertEqual(len(vocabulary), size)
+
+    def test_pair_remap_is_keyed_by_pair(self):
+        """Only resolved (word, POS) pairs take memory, not a row per interned string"""
+        vocabulary = TokenVocabulary()
+        words = vocabulary.words(vocabulary.intern_all(np.array(['progress', 'industry'], dtype=object)))
+        vocabulary.intern_all(np.array([f'token{i}' for i in range(5000)], dtype=object))
+        tag = vocabulary.tags.index('NN')
+        vocabulary.stems(words, np.array([tag, tag]))
+        self.assertEqual(len(vocabulary.pair_stem), 2)
+
+    def test_growth_keeps_results(self):
+        """Growing past the initial capacity keeps earlier remaps"""
+        vocabulary = TokenVocabulary()
+        first = vocabulary.words(vocabulary.intern_all(np.array(['progress'], dtype=object)))
+        vocabulary.intern_all(np.array([f'token{i}' for i in range(5000)], dtype=object))
+        self.assertGreaterEqual(len(vocabulary.token_word), len(vocabulary))
+        np.testing.assert_array_equal(vocabulary.words(vocabulary.intern_all(np.array(['progress'], dtype=object))),
+                                      first)
+
+
+class TestLookupCache(unittest.TestCase):
+    """Bounded lemma/stem caches and their snapshots"""
+
+    def test_lru_eviction_and_counts(self):
+        """The least recently used entry is evicted; hits, misses and evictions are counted"""
+        calls = []
+        cache = LookupCache(lambda key: calls.append(key) or key.upper(), maxsize=2)
+        self.assertEqual([cache.lookup(key) for key in 'aba'], ['A', 'B', 'A'])
+        cache.lookup('c')  # evicts 'b', the least recently used
+        cache.lookup('a')
+        cache.lookup('b')
+        self.assertEqual(calls, ['a', 'b', 'c', 'b'])
+        self.assertEqual(cache.counts(), (2, 4, 2))
+
+        disabled = LookupCache(str.upper, maxsize=0)
+        disabled.lookup('a')
+        disabled.lookup('a')
+        self.assertEqual((len(disabled), disabled.counts()), (0, (0, 2, 0)))
+
+    def test_cached_lemmas_match_uncached(self):
+        """Keying on the first letter of the tag gives the same lemma for every tag"""
+        for word in ('houses', 'running', 'better', 'quickly', 'progress', 'improvements'):
+            for pos in POS_TAGS:
+                with self.subTest(word=word, pos=pos):
+                    self.assertEqual(lemmatize_or_stem((word, pos)), lemmatize_uncached((word, pos[:1])))
+
+    def test_snapshot_round_trip(self):
+        """Worker parts are merged into a snapshot that only loads for the same fingerprint"""
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot_path = Path(tmp) / 'lookup.pkl'
+            parts_dir = lookup_snapshot_parts_path(snapshot_path)
+            parts_dir.mkdir()
+            lemmatize_or_stem(('houses', 'NNS'))
+            save_lookup_part(parts_dir)
+
+            saved = merge_lookup_snapshot(snapshot_path, 'abc', maxsize=100)
+            self.assertEqual(list(parts_dir.iterdir()), [])
+            snapshot = load_lookup_snapshot(snapshot_path, 'abc')
+            self.assertEqual({name: len(entries) for name, entries in snapshot.items()}, saved)
+            self.assertIn((('houses', 'N'), 'house'), snapshot['lemma'])
+            self.assertEqual(load_lookup_snapshot(snapshot_path, 'other'), {})
+
+            warmed = LookupCache(lemmatize_uncached, maxsize=2)
+            warmed.warm(snapshot['lemma'])
+            self.assertEqual(list(warmed.entries.items()), snapshot['lemma'][-2:])
+
+
+class TestPrefetch(unittest.TestCase):
+    """Reading input files ahead of the workers"""
+
+    def test_order_depth_and_failures(self):
+        """Files come back in order, at most depth ahead; an unreadable file yields None"""
+        paths = sorted(SAMPLE_DATA.rglob('*.json.bz2'))
+        consumed = []
+
+        def source():
+            for path in paths + [SAMPLE_DATA / 'missing.json.bz2']:
+                consumed.append(path)
+                yield path
+
+        stats = {}
+        results = []
+        for result in prefetch_files(source(), threads=3, depth=2, stats=stats):
+            self.assertLessEqual(len(consumed) - len(results), 2)
+            results.append(result)
+
+        self.assertEqual([path for path, _, _ in results], paths + [SAMPLE_DATA / 'missing.json.bz2'])
+        self.assertEqual([data for _, data, _ in results[:-1]], [path.read_bytes() for path in paths])
+        self.assertIsNone(results[-1][1])
+        self.assertEqual(stats['io_bytes'], sum(path.stat().st_size for path in paths))
+
+    def test_prefetched_volume_matches(self):
+        """A worker given the compressed bytes writes the same output, and profiles the read as 'io'"""
+        path = sorted(SAMPLE_DATA.rglob('*.json.bz2'))[0]
+        with tempfile.TemporaryDirectory() as tmp:
+            own, prefetched = Path(tmp) / 'own', Path(tmp) / 'prefetched'
+            own.mkdir()
+            prefetched.mkdir()
+            expected = process_volume_wrapper((path, own, RunOptions(), None))
+            options = RunOptions(profile_path=Path(tmp) / 'profile.csv')
+            record = process_volume_wrapper((path, prefetched, options, (path.read_bytes(), 0.25)))
+            self.assertEqual(record['stages']['io'], (0.25, None))
+            self.assertEqual((record['htid'], record['stems']), (expected['htid'], expected['stems']))
+            self.assertEqual(Path(record['output']).read_bytes(), Path(expected['output']).read_bytes())
+
+
+class TestStreamingReader(unittest.TestCase):
+    """--page-batch: streamed, page-batched reads match whole-file reads"""
+
+    def assertSameVolume(self, volume, expected):
+        self.assertEqual(volume.id, expected.id)
+        self.assertEqual(list(volume.tokens), list(expected.tokens))
+        self.assertEqual(list(volume.pos_tags), list(expected.pos_tags))
+        self.assertEqual(volume.counts.dtype, expected.counts.dtype)
+        np.testing.assert_array_equal(volume.counts, expected.counts)
+
+    def test_json_stream_across_chunks(self):
+        """Values split across reads, including numbers and multi-byte characters, parse whole"""
+        document = {'id': 'x', 'n': 1234567, 'features': {'pages': [{'s': 'caf\u00e9 \u00fc' * i, 'v': i * 1.5}
+                                                                     for i in range(20)], 'after': [None, True]}}
+        raw = json.dumps(document, ensure_ascii=False).encode('utf8')
+        for chunk_size in (1, 3, 7, 4096):
+            stream = JSONStream(io.BytesIO(raw), chunk_size=chunk_size)
+            parsed = {}
+            for key in stream.members():
+                if key != 'features':
+                    parsed[key] = stream.value()
+                    continue
+                parsed[key] = {}
+                for feature in stream.members():
+                    parsed[key][feature] = list(stream.elements()) if feature == 'pages' else stream.value()
+            self.assertEqual(parsed, document)
+
+    def test_json_stream_numbers_fuzz(self):
+        """Numbers cut anywhere, including after '.', 'e' or a sign, parse as json.loads does"""
+        rng = random.Random(0)
+        numbers = [0, -0.5, 1e-07, 26806.38125, -3.5e+300, 12345678901234567890, 7]
+        numbers += [rng.uniform(-1e6, 1e6) for _ in range(30)] + [rng.randrange(-10**6, 10**6) for _ in range(10)]
+        documents = [json.dumps(number) for number in numbers]
+        documents.append(json.dumps(numbers))
+        documents.append(json.dumps({str(i): number for i, number in enumerate(numbers)}, indent=1))
+        for document in documents:
+            raw = document.encode('utf8')
+            for chunk_size in range(1, 9):
+                with self.subTest(document=document[:40], chunk_size=chunk_size):
+                    stream = JSONStream(io.BytesIO(raw), chunk_size=chunk_size)
+                    if document.startswith('['):
+                        parsed = list(stream.elements())
+                    elif document.startswith('{'):
+                        parsed = {key: stream.value() for key in stream.members()}
+                    else:
+                        parsed = stream.value()
+                    self.assertEqual(parsed, json.loads(document))
+
+    def test_matches_whole_file_reads(self):
+        for path in sorted(SAMPLE_DATA.rglob('*.json.bz2')):
+            expected = read_extracted_features(path, page_batch=0)
+            for page_batch in (1, 3, 1000):
+                with self.subTest(path=path.name, page_batch=page_batch):
+                    self.assertSameVolume(read_extracted_features(path, page_batch=page_batch), expected)
+            self.assertSameVolume(stream_extracted_features(path, data=path.read_bytes()), expected)
+
+    def test_clean_and_write_output_unchanged(self):
+        corpus = getFeatureReader(scan_htrc_files(SAMPLE_DATA))
+        with tempfile.TemporaryDirectory() as tmp:
+            outputs = {}
+            for page_batch in (0, 2):
+                output = Path(tmp) / f'out{page_batch}'
+                output.mkdir()
+                summary = CleanAndWrite(corpus, output, RunOptions(num_processes=2, page_batch=page_batch))
+                self.assertEqual(summary['failed'], 0)
+                outputs[page_batch] = {path.name: path.read_bytes() for path in output.iterdir()}
+            self.assertEqual(outputs[2], outputs[0])
+
+
+class TestVolumeLimits(unittest.TestCase):
+    """Per-volume time and memory limits, quarantine and retry"""
+
+    def setUp(self):
+        self.paths = sorted(SAMPLE_DATA.rglob('*.json.bz2'))
+        self.slow_htid = htid_from_filename(self.paths[0].name)
+
+        def slow(volume):
+            if volume.id == self.slow_htid:
+                time.sleep(2)
+            return process_volume_pipeline_vectorized(volume)
+
+        def out_of_memory(volume):
+            raise MemoryError("simulated")
+
+        PIPELINE_ENGINES['slow'] = slow
+        PIPELINE_ENGINES['out-of-memory'] = out_of_memory
+
+    def tearDown(self):
+        del PIPELINE_ENGINES['slow'], PIPELINE_ENGINES['out-of-memory']
+        preprocess_htrc.stop_volume_timer()
+        preprocess_htrc.volume_timeout = None
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+
+    def slow_lookups(self, name):
+        """Make each membership test of a lookup index sleep, so the timer fires inside the row lookups"""
+        index = getattr(preprocess_htrc, name)
+
+        class SlowIndex:
+            def __contains__(self, row):
+                time.sleep(0.01)
+                return row in index
+
+        setattr(preprocess_htrc, name, SlowIndex())
+        self.addCleanup(setattr, preprocess_htrc, name, index)
+
+    def test_limits_quarantine_the_volume(self):
+        """A timeout or MemoryError is recorded as quarantined with its reason, and nothing is written"""
+        preprocess_htrc.init_worker(timeout=0.5)
+        with tempfile.TemporaryDirectory() as tmp:
+            for engine, reason in (('slow', 'timeout'), ('out-of-memory', 'memory')):
+                record = process_volume_wrapper((self.paths[0], Path(tmp), RunOptions(engine=engine), None))
+                self.assertEqual((record['status'], record['reason']), ('quarantined', reason))
+                self.assertFalse(Path(record['output']).exists())
+
+            preprocess_htrc.init_worker(timeout=30)
+            record = process_volume_wrapper((self.paths[1], Path(tmp), RunOptions(engine='slow'), None))
+            self.assertEqual(record['status'], 'ok')
+            self.assertNotIn('reason', record)
+
+    def test_row_lookups_do_not_swallow_timeout(self):
+        """The per-row lookups of the pandas engine let the timeout through instead of returning 'error'"""
+        preprocess_htrc.init_worker(timeout=0.05)
+        for lookup, index in ((preprocess_htrc.spell_correction_lookup, 'spelling_corrections_index'),
+                              (preprocess_htrc.ma_search, 'archaic_words_index')):
+            with self.subTest(lookup=lookup.__name__):
+                self.slow_lookups(index)
+                results = []
+                preprocess_htrc.start_volume_timer()
+                with self.assertRaises(VolumeTimeout):
+                    for _ in range(100):
+                        results.append(lookup('progress'))
+                preprocess_htrc.stop_volume_timer()
+                self.assertNotIn('error', results)
+
+    def test_pandas_engine_timeout(self):
+        """A timer firing inside the pandas engine quarantines the volume"""
+        self.slow_lookups('spelling_corrections_index')
+        preprocess_htrc.init_worker(timeout=0.5)
+        with tempfile.TemporaryDirectory() as tmp:
+            record = process_volume_wrapper((self.paths[0], Path(tmp), RunOptions(engine='pandas'), None))
+            self.assertEqual((record['status'], record['reason']), ('quarantined', 'timeout'))
+            self.assertFalse(Path(record['output']).exists())
+
+    def test_retry_with_higher_limit(self):
+        """Quarantined volumes are listed and retried with the limits raised"""
+        corpus = getFeatureReader(scan_htrc_files(SAMPLE_DATA))
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            output = tmp / 'out'
+            output.mkdir()
+            quarantine = tmp / 'quarantine.jsonl'
+            summary = CleanAndWrite(corpus, output, RunOptions(num_processes=2, engine='slow', volume_timeout=1,
+                                                              quarantine_path=quarantine, retry_factor=0))
+            self.assertEqual((summary['ok'], summary['quarantined']), (len(corpus) - 1, 1))
+            self.assertEqual(load_quarantine(quarantine)[self.slow_htid]['reason'], 'timeout')
+
+            summary = CleanAndWrite(corpus, output, RunOptions(num_processes=2, engine='slow', volume_timeout=1,
+                                                              quarantine_path=quarantine, retry_factor=4))
+            self.assertEqual((summary['ok'], summary['quarantined'], summary['retried']), (len(corpus), 0, 1))
+            self.assertEqual(summary['volumes'], len(corpus))
+            self.assertTrue((output / output_filename(self.slow_htid)).exists())
+
+
+class TestLazyImports(unittest.TestCase):
+    """--help and --dry-run must not import the processing dependencies"""
+
+    HEAVY_MODULES = {'pandas', 'nltk', 'htrc_features', 'pycountry'}
+
+    def imported_modules(self, *arguments):
+        script = Path(__file__).parent.parent / 'preprocess_htrc.py'
+        result = subprocess.run([sys.executable, '-X', 'importtime', str(script), *arguments],
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        modules = {line.rsplit('|', 1)[-1].strip().split('.')[0]
+                   for line in result.stderr.splitlines() if line.startswith('import time:')}
+        return modules, result.stdout
+
+    def test_help(self):
+        modules, stdout = self.imported_modules('--help')
+        self.assertIn('--dry-run', stdout)
+        self.assertFalse(modules & self.HEAVY_MODULES)
+
+    def test_dry_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            modules, stdout = self.imported_modules('--input', str(SAMPLE_DATA), '--output', str(Path(tmp) / 'out'),
+                                                    '--dry-run')
+        self.assertIn(f"Would process {len(list(SAMPLE_DATA.rglob('*.json.bz2')))} volumes", stdout)
+        self.assertFalse(modules & self.HEAVY_MODULES)
+
+    def test_library_import_loads_data(self):
+        """Importing the module still loads everything, as the tests above rely on"""
+        self.assertTrue(preprocess_htrc.processing_data_loaded)
+        self.assertIsNotNone(preprocess_htrc.stemmer)
+
+
 class TestConfigurationParsing(unittest.TestCase):
     """Test configuration file parsing"""
 
@@ -230,6 +1278,25 @@ def run_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestProcessingParameters))
     suite.addTests(loader.loadTestsFromTestCase(TestCharacterCleaning))
     suite.addTests(loader.loadTestsFromTestCase(TestRomanNumerals))
+    suite.addTests(loader.loadTestsFromTestCase(TestVectorizedEngine))
+    suite.addTests(loader.loadTestsFromTestCase(TestTwoPassVocabulary))
+    suite.addTests(loader.loadTestsFromTestCase(TestManifest))
+    suite.addTests(loader.loadTestsFromTestCase(TestDirectReader))
+    suite.addTests(loader.loadTestsFromTestCase(TestCleanAndWrite))
+    suite.addTests(loader.loadTestsFromTestCase(TestReferenceCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestOutputFormats))
+    suite.addTests(loader.loadTestsFromTestCase(TestDocTermMatrix))
+    suite.addTests(loader.loadTestsFromTestCase(TestFileCatalog))
+    suite.addTests(loader.loadTestsFromTestCase(TestProfiling))
+    suite.addTests(loader.loadTestsFromTestCase(TestSyntheticCorpus))
+    suite.addTests(loader.loadTestsFromTestCase(TestEquivalenceHarness))
+    suite.addTests(loader.loadTestsFromTestCase(TestSharding))
+    suite.addTests(loader.loadTestsFromTestCase(TestTokenVocabulary))
+    suite.addTests(loader.loadTestsFromTestCase(TestLookupCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestPrefetch))
+    suite.addTests(loader.loadTestsFromTestCase(TestStreamingReader))
+    suite.addTests(loader.loadTestsFromTestCase(TestVolumeLimits))
+    suite.addTests(loader.loadTestsFromTestCase(TestLazyImports))
     suite.addTests(loader.loadTestsFromTestCase(TestConfigurationParsing))
     suite.addTests(loader.loadTestsFromTestCase(TestPOSTagCoverage))
     suite.addTests(loader.loadTestsFromTestCase(TestReproducibilityGuarantees))
@@ -5,12 +5,48 @@ This script calculates sentiment scores for all volumes using various dictionari
 It consolidates the logic from multiple Jupyter notebooks into a single, maintainable script.
 """
 
+import codecs
+import io
+import json
+import multiprocessing as mp
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 import os
+from collections import Counter
 from nltk.stem.porter import PorterStemmer
 
 
+# Files handed to a worker process at a time
+DEFAULT_CHUNKSIZE = 64
+
+
+def map_in_order(function, tasks, total, desc, num_processes=1, chunksize=DEFAULT_CHUNKSIZE,
+                 initializer=None, initargs=()):
+    """
+    Apply function to each task, yielding results in task order.
+
+    With num_processes > 1 the tasks run in a process pool, handed out
+    chunksize at a time; otherwise they run in this process.
+
+    Args:
+        function: Picklable function of one task
+        tasks: Iterable of tasks
+        total: Number of tasks, for the progress bar
+        desc: Progress bar label
+        num_processes: Worker processes (1 runs in this process)
+        chunksize: Tasks per worker batch
+        initializer, initargs: Run once in each worker (or here) first
+    """
+    if num_processes > 1:
+        with mp.Pool(processes=num_processes, initializer=initializer, initargs=initargs) as pool:
+            yield from tqdm(pool.imap(function, tasks, chunksize=chunksize), total=total, desc=desc)
+    else:
+        if initializer is not None:
+            initializer(*initargs)
+        yield from tqdm(map(function, tasks), total=total, desc=desc)
+
+
 def load_dictionaries():
     """
     Load all sentiment dictionaries and organize them into two structures:
@@ -100,22 +136,30 @@ def load_dictionaries():
     return simple_dicts, weighted_dicts
 
 
-def score_volume_simple(volume_path, dict_df):
+def read_distribution(volume_path):
     """
-    Calculate simple (unweighted) sentiment score for a volume.
-
-    Methodology: Sum of pct (percentage) values for matching words
+    Load a volume word distribution CSV.
 
     Args:
         volume_path: Path to volume word distribution CSV
+
+    Returns:
+        DataFrame: count, pct and total_words columns, indexed by word
+    """
+    return pd.read_csv(volume_path).set_index('word')
+
+
+def score_distribution_simple(df_vol, dict_df):
+    """
+    Simple (unweighted) score of an already loaded word distribution.
+
+    Args:
+        df_vol: Volume word distribution (see read_distribution())
         dict_df: Dictionary DataFrame with word index only
 
     Returns:
         float: Sentiment score (sum of word percentages)
     """
-    # Load volume word distribution
-    df_vol = pd.read_csv(volume_path).set_index('word')
-
     # Join dictionary with volume (left join keeps only dictionary words)
     df_joined = dict_df.join(df_vol, how='left').fillna(0)
 
@@ -125,21 +169,17 @@ def score_volume_simple(volume_path, dict_df):
     return score
 
 
-def score_volume_weighted(volume_path, dict_df):
+def score_distribution_weighted(df_vol, dict_df):
     """
-    Calculate weighted sentiment score for a volume.
-
-    Methodology: (Sum of count × weight) / total_words
+    Weighted score of an already loaded word distribution.
 
     Args:
-        volume_path: Path to volume word distribution CSV
+        df_vol: Volume word distribution (see read_distribution())
         dict_df: Dictionary DataFrame with word index and 'count' column (weights)
 
     Returns:
         float: Weighted sentiment score
     """
-    # Load volume word distribution
-    df_vol = pd.read_csv(volume_path).set_index('word')
     total_words = df_vol['total_words'].max()
 
     # Join dictionary with volume (left join, add suffix to volume columns)
@@ -154,14 +194,283 @@ def score_volume_weighted(volume_path, dict_df):
     return score
 
 
-def score_all_volumes(DF_ids, simple_dicts, weighted_dicts):
+def score_volume_simple(volume_path, dict_df):
+    """
+    Calculate simple (unweighted) sentiment score for a volume.
+
+    Methodology: Sum of pct (percentage) values for matching words
+
+    Args:
+        volume_path: Path to volume word distribution CSV
+        dict_df: Dictionary DataFrame with word index only
+
+    Returns:
+        float: Sentiment score (sum of word percentages)
+    """
+    return score_distribution_simple(read_distribution(volume_path), dict_df)
+
+
+def score_volume_weighted(volume_path, dict_df):
+    """
+    Calculate weighted sentiment score for a volume.
+
+    Methodology: (Sum of count × weight) / total_words
+
+    Args:
+        volume_path: Path to volume word distribution CSV
+        dict_df: Dictionary DataFrame with word index and 'count' column (weights)
+
+    Returns:
+        float: Weighted sentiment score
+    """
+    return score_distribution_weighted(read_distribution(volume_path), dict_df)
+
+
+# Scoring function for each dictionary type
+SCORING_METHODS = {
+    'simple': score_distribution_simple,
+    'weighted': score_distribution_weighted,
+}
+
+
+def register_dictionaries(simple_dicts, weighted_dicts):
+    """
+    List every dictionary with its scoring method, in results column order.
+
+    Args:
+        simple_dicts: Dictionary of simple (unweighted) dictionaries
+        weighted_dicts: Dictionary of weighted dictionaries
+
+    Returns:
+        list: (column name, method, dictionary DataFrame) tuples, simple
+            dictionaries first
+    """
+    return ([(name, 'simple', dict_df) for name, dict_df in simple_dicts.items()] +
+            [(name, 'weighted', dict_df) for name, dict_df in weighted_dicts.items()])
+
+
+# Dictionaries used by score_volume_task() in this process, set by init_scoring_worker()
+worker_dictionaries = None
+
+
+def init_scoring_worker(dictionaries):
+    """Pool initializer: install the registered dictionaries once per worker"""
+    global worker_dictionaries
+    worker_dictionaries = dictionaries
+
+
+def score_volume_task(volume_path):
+    """score_volume() with the worker's dictionaries"""
+    return score_volume(volume_path, worker_dictionaries)
+
+
+def score_volume(volume_path, dictionaries):
+    """
+    Score one volume against every registered dictionary, reading it once.
+
+    Args:
+        volume_path: Path to volume word distribution CSV
+        dictionaries: List from register_dictionaries()
+
+    Returns:
+        list: One score per dictionary, in the same order
+    """
+    df_vol = read_distribution(volume_path)
+    return [SCORING_METHODS[method](df_vol, dict_df) for _, method, dict_df in dictionaries]
+
+
+def vocabulary_key(word):
+    """
+    Key of a word in doc-term vocabularies.
+
+    pandas reads words such as 'nan', 'null' and 'None' as NaN, and joins
+    match NaN to NaN; NaN is never equal to itself as a dict key, so all
+    NaN words share the key None.
+    """
+    return None if isinstance(word, float) and word != word else word
+
+
+def dictionary_vocabulary(dictionaries):
+    """Every word of the registered dictionaries, as vocabulary keys"""
+    return {vocabulary_key(word) for _, _, dict_df in dictionaries for word in dict_df.index}
+
+
+def distribution_row(args_tuple):
+    """
+    One doc-term row: vocabulary keys, counts, pct and total_words of a volume.
+
+    Words outside vocabulary (a set, or None for all) are dropped.
+    """
+    path, vocabulary = args_tuple
+    df_vol = read_distribution(path)
+    keys = [vocabulary_key(word) for word in df_vol.index]
+    counts = df_vol['count'].to_numpy(dtype=np.float64)
+    pct = df_vol['pct'].to_numpy(dtype=np.float64)
+    if vocabulary is not None:
+        keep = np.array([key in vocabulary for key in keys], dtype=bool)
+        keys = [key for key, kept in zip(keys, keep) if kept]
+        counts, pct = counts[keep], pct[keep]
+    return keys, counts, pct, df_vol['total_words'].max()
+
+
+def build_doc_term_matrix(paths, vocabulary=None, num_processes=1, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Read word distributions into sparse document-term matrices.
+
+    Args:
+        paths: Word distribution CSV paths, one matrix row each
+        vocabulary: Words to keep (e.g. dictionary_vocabulary()); None keeps
+            every word, so that dictionaries added later can be scored from
+            a saved matrix without reading the files again
+        num_processes: Worker processes reading the files (1 reads them here)
+        chunksize: Files per worker batch
+
+    Returns:
+        dict: 'counts' and 'pct' CSR matrices (volumes × words),
+            'total_words' per volume (NaN for an empty distribution),
+            'vocabulary' (column order) and 'paths'
+    """
+    from scipy import sparse
+
+    paths = list(paths)
+    if vocabulary is not None:
+        vocabulary = set(vocabulary)
+    columns = {} if vocabulary is None else {word: i for i, word in enumerate(sorted(vocabulary, key=str))}
+    indices, counts, pct, indptr, total_words = [], [], [], [0], []
+    rows = map_in_order(distribution_row, ((path, vocabulary) for path in paths), len(paths),
+                        "  Reading distributions", num_processes, chunksize)
+    for keys, row_counts, row_pct, row_total in rows:
+        row = np.array([columns.setdefault(key, len(columns)) for key in keys], dtype=np.int64)
+        indices.append(row)
+        counts.append(row_counts)
+        pct.append(row_pct)
+        indptr.append(indptr[-1] + len(row))
+        total_words.append(row_total)
+
+    shape = (len(indptr) - 1, len(columns))
+    indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64)
+    matrices = {}
+    for name, data in (('counts', counts), ('pct', pct)):
+        data = np.concatenate(data) if data else np.zeros(0)
+        matrix = sparse.csr_matrix((data, indices, np.array(indptr)), shape=shape)
+        # Several NaN words in one volume share a column
+        matrix.sum_duplicates()
+        matrices[name] = matrix
+    return {'counts': matrices['counts'], 'pct': matrices['pct'],
+            'total_words': np.array(total_words, dtype=np.float64),
+            'vocabulary': sorted(columns, key=columns.get), 'paths': paths}
+
+
+def save_doc_term_matrix(doc_term, directory):
+    """Save a build_doc_term_matrix() result to directory"""
+    from scipy import sparse
+
+    os.makedirs(directory, exist_ok=True)
+    sparse.save_npz(os.path.join(directory, 'counts.npz'), doc_term['counts'])
+    sparse.save_npz(os.path.join(directory, 'pct.npz'), doc_term['pct'])
+    np.save(os.path.join(directory, 'total_words.npy'), doc_term['total_words'])
+    with open(os.path.join(directory, 'index.json'), 'w', encoding='utf8') as f:
+        json.dump({'vocabulary': doc_term['vocabulary'], 'paths': [str(path) for path in doc_term['paths']]}, f)
+
+
+def load_doc_term_matrix(directory):
+    """Load a doc-term matrix saved by save_doc_term_matrix()"""
+    from scipy import sparse
+
+    with open(os.path.join(directory, 'index.json'), encoding='utf8') as f:
+        index = json.load(f)
+    return {'counts': sparse.load_npz(os.path.join(directory, 'counts.npz')).tocsr(),
+            'pct': sparse.load_npz(os.path.join(directory, 'pct.npz')).tocsr(),
+            'total_words': np.load(os.path.join(directory, 'total_words.npy')),
+            'vocabulary': index['vocabulary'], 'paths': index['paths']}
+
+
+def dictionary_weight_matrix(dictionaries, vocabulary):
+    """
+    Words × dictionaries weight matrix for score_doc_term_matrix().
+
+    A simple dictionary gives each word a weight of 1 per occurrence in the
+    dictionary (duplicated stems count once per row, as in the join), and a
+    weighted dictionary the sum of the word's weights. Words outside
+    vocabulary can never match and are dropped.
+
+    Args:
+        dictionaries: List from register_dictionaries()
+        vocabulary: Doc-term matrix columns
+
+    Returns:
+        CSR matrix: len(vocabulary) × len(dictionaries)
+    """
+    from scipy import sparse
+
+    columns = {word: i for i, word in enumerate(vocabulary)}
+    rows, cols, data = [], [], []
+    for column, (_, method, dict_df) in enumerate(dictionaries):
+        if method == 'weighted':
+            weights = dict_df['count'].fillna(0).to_numpy(dtype=np.float64)
+        else:
+            weights = np.ones(len(dict_df))
+        for word, weight in zip(dict_df.index, weights):
+            row = columns.get(vocabulary_key(word))
+            if row is not None:
+                rows.append(row)
+                cols.append(column)
+                data.append(weight)
+    return sparse.csr_matrix((data, (rows, cols)), shape=(len(vocabulary), len(dictionaries)))
+
+
+def score_doc_term_matrix(doc_term, dictionaries):
+    """
+    Score every volume against every dictionary as two sparse products.
+
+    Simple scores are pct × weights; weighted scores are counts × weights
+    divided by total_words. Both are linear in the doc-term rows, so a new
+    dictionary only adds a column to the weight matrix.
+
+    Args:
+        doc_term: Result of build_doc_term_matrix() or load_doc_term_matrix()
+        dictionaries: List from register_dictionaries()
+
+    Returns:
+        ndarray: volumes × dictionaries scores
+    """
+    weights = dictionary_weight_matrix(dictionaries, doc_term['vocabulary'])
+    weighted = np.array([method == 'weighted' for _, method, _ in dictionaries])
+    scores = np.empty((doc_term['pct'].shape[0], len(dictionaries)))
+    scores[:, ~weighted] = (doc_term['pct'] @ weights[:, ~weighted]).toarray()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores[:, weighted] = (doc_term['counts'] @ weights[:, weighted]).toarray() / doc_term['total_words'][:, None]
+    return scores
+
+
+# How score_all_volumes computes scores
+SCORING_ENGINES = ('single-pass', 'sparse')
+DEFAULT_SCORING_ENGINE = 'single-pass'
+
+
+def score_all_volumes(DF_ids, simple_dicts, weighted_dicts, engine=DEFAULT_SCORING_ENGINE, doc_term=None,
+                      num_processes=1, chunksize=DEFAULT_CHUNKSIZE):
     """
     Score all volumes using all dictionaries and generate results DataFrame.
 
+    Each word distribution is read once and scored against every
+    dictionary, instead of once per dictionary. The 'single-pass' engine
+    runs the per-dictionary joins on each volume (see score_volume()); the
+    'sparse' engine reads the volumes into a doc-term matrix restricted to
+    the dictionary words and computes all scores as sparse products (see
+    score_doc_term_matrix()), agreeing to floating-point precision.
+
     Args:
         DF_ids: DataFrame with volume file paths
         simple_dicts: Dictionary of simple (unweighted) dictionaries
         weighted_dicts: Dictionary of weighted dictionaries
+        engine: One of SCORING_ENGINES
+        doc_term: Prebuilt matrix for the sparse engine, with one row per
+            DF_ids row (see build_doc_term_matrix()); read from the files
+            when None
+        num_processes: Worker processes reading and scoring volumes (1
+            scores them in this process); rows keep DF_ids order either way
+        chunksize: Volumes per worker batch
 
     Returns:
         DataFrame: Results with filename as index and score columns
@@ -175,38 +484,69 @@ def score_all_volumes(DF_ids, simple_dicts, weighted_dicts):
     print("SCORING ALL VOLUMES")
     print("="*60)
 
-    # Score all volumes for each simple dictionary
-    print("\nProcessing simple (unweighted) dictionaries...")
-    for dict_name, dict_df in simple_dicts.items():
-        print(f"  Scoring: {dict_name}")
-        scores = []
+    if engine not in SCORING_ENGINES:
+        raise ValueError(f"Unknown scoring engine: {engine} (choose from {', '.join(SCORING_ENGINES)})")
+    dictionaries = register_dictionaries(simple_dicts, weighted_dicts)
+    print(f"\nScoring {len(DF_ids)} volumes against {len(dictionaries)} dictionaries "
+          f"({len(simple_dicts)} simple, {len(weighted_dicts)} weighted), engine: {engine}...")
+    if engine == 'sparse':
+        if doc_term is None:
+            doc_term = build_doc_term_matrix(DF_ids['Path'].tolist(), dictionary_vocabulary(dictionaries),
+                                             num_processes, chunksize)
+        elif doc_term['pct'].shape[0] != len(DF_ids):
+            raise ValueError(f"doc_term has {doc_term['pct'].shape[0]} rows for {len(DF_ids)} volumes")
+        scores = score_doc_term_matrix(doc_term, dictionaries)
+    else:
+        scores = list(map_in_order(score_volume_task, DF_ids['Path'], len(DF_ids), "  Scoring volumes",
+                                   num_processes, chunksize, init_scoring_worker, (dictionaries,)))
 
-        for idx, row in tqdm(DF_ids.iterrows(), total=len(DF_ids), desc=f"  {dict_name}"):
-            score = score_volume_simple(row['Path'], dict_df)
-            scores.append(score)
+    # One column per dictionary, in registration order
+    for column, (dict_name, _, _) in enumerate(dictionaries):
+        results[dict_name] = [float(volume_scores[column]) for volume_scores in scores]
 
-        results[dict_name] = scores
+    print(f"\nScoring complete! Generated {len(results)} rows × {len(results.columns)} columns")
 
-    # Score all volumes for each weighted dictionary
-    print("\nProcessing weighted dictionaries...")
-    for dict_name, dict_df in weighted_dicts.items():
-        print(f"  Scoring: {dict_name}")
-        scores = []
+    return results
 
-        for idx, row in tqdm(DF_ids.iterrows(), total=len(DF_ids), desc=f"  {dict_name}"):
-            score = score_volume_weighted(row['Path'], dict_df)
-            scores.append(score)
 
-        results[dict_name] = scores
+# Bytes of raw text read at a time by count_words()
+READ_CHUNK_SIZE = 1 << 20
 
-    print(f"\nScoring complete! Generated {len(results)} rows × {len(results.columns)} columns")
 
-    return results
+def count_words(raw_text_path, chunk_size=READ_CHUNK_SIZE):
+    """
+    Count the whitespace-separated words of a UTF-8 text file.
 
+    Reads the file chunk_size bytes at a time, carrying a word cut at the
+    end of a chunk over to the next one, so memory is bounded by the chunk
+    size and the number of distinct words rather than the length of the
+    text. The words are exactly those of raw.split() on the whole text.
 
-def generate_word_distribution(raw_text_path, output_path):
+    Args:
+        raw_text_path: Path to raw cleaned text file
+        chunk_size: Bytes per read
+
+    Returns:
+        Counter: word -> occurrences
     """
-    Generate word distribution file from raw text.
+    counts = Counter()
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    carry = ''
+    with open(raw_text_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            text = carry + decoder.decode(chunk, final=not chunk)
+            words = text.split()
+            # A chunk that does not end in whitespace may end mid-word
+            carry = words.pop() if chunk and words and not text[-1].isspace() else ''
+            counts.update(words)
+            if not chunk:
+                return counts
+
+
+def word_distribution(raw_text_path, chunk_size=READ_CHUNK_SIZE):
+    """
+    Word distribution of a raw text file, without writing it.
 
     Matches the exact methodology from the original notebooks:
     1. Read raw text
@@ -215,24 +555,26 @@ def generate_word_distribution(raw_text_path, output_path):
     4. Filter words appearing more than once
     5. Calculate percentages
 
+    Words are counted with count_words() instead of a one-row-per-word
+    DataFrame; the counts are then laid out as the original groupby left
+    them (distinct words in sorted order) before the same sort by count,
+    so ties keep the original order and the output is identical.
+
     Args:
         raw_text_path: Path to raw cleaned text file
-        output_path: Path to save word distribution CSV
+        chunk_size: Bytes per read (see count_words())
 
     Returns:
         DataFrame: Word distribution with columns: word (index), count, pct, total_words
     """
-    # Read raw text file
-    with open(raw_text_path, 'rb') as f:
-        raw = f.read().decode('utf-8')
-
-    # Split into words
-    lines = raw.split()
+    # Read and count words
+    counts = count_words(raw_text_path, chunk_size)
 
-    # Create DataFrame and count words
-    df = pd.DataFrame(lines, columns=['word'])
-    df['count'] = 1
-    df = df.groupby('word').sum().sort_values('count', ascending=False)
+    # Sorted by word, as groupby('word') returns them, then by count
+    words = sorted(counts)
+    df = pd.DataFrame({'count': np.array([counts[word] for word in words], dtype=np.int64)},
+                      index=pd.Index(words, dtype=object, name='word'))
+    df = df.sort_values('count', ascending=False)
 
     # Filter words that appear more than once (matching notebook logic)
     df = df[df['count'] > 1]
@@ -243,13 +585,67 @@ def generate_word_distribution(raw_text_path, output_path):
     # Add total_words column
     df['total_words'] = df['count'].sum()
 
+    return df
+
+
+def as_read_from_csv(df):
+    """
+    A word distribution as read_distribution() would read it back from CSV.
+
+    Two things change in the round trip: words pandas parses as missing
+    values ('nan', 'null', ...) become NaN, which changes which dictionary
+    entries they match, and read_csv's default float parser can return pct
+    one unit in the last place away from the value written. The words and
+    pct are passed through the same writer and parser in memory, so both
+    follow whatever the installed pandas does; counts are integers and
+    unchanged.
+    """
+    df = df.copy()
+    if len(df):
+        restored = pd.read_csv(io.StringIO(df[['pct']].to_csv()))
+        df.index = pd.Index(restored['word'], name='word')
+        df['pct'] = restored['pct'].to_numpy()
+    return df
+
+
+def generate_word_distribution(raw_text_path, output_path):
+    """
+    Generate word distribution file from raw text.
+
+    Args:
+        raw_text_path: Path to raw cleaned text file
+        output_path: Path to save word distribution CSV
+
+    Returns:
+        DataFrame: Word distribution with columns: word (index), count, pct, total_words
+            (see word_distribution())
+    """
+    df = word_distribution(raw_text_path)
+
     # Save to CSV
     df.to_csv(output_path)
 
     return df
 
 
-def generate_all_distributions(source_dir, output_dir, filenames):
+def generate_distribution_task(args_tuple):
+    """
+    Generate one word distribution file.
+
+    Returns:
+        tuple: (filename, None) on success, (filename, error message) on failure
+    """
+    filename, source_path, output_path = args_tuple
+    try:
+        if not os.path.exists(source_path):
+            return filename, "Source file not found"
+        generate_word_distribution(source_path, output_path)
+        return filename, None
+    except Exception as e:
+        return filename, str(e)
+
+
+def generate_all_distributions(source_dir, output_dir, filenames, num_processes=1, chunksize=DEFAULT_CHUNKSIZE):
     """
     Generate word distributions for multiple volumes.
 
@@ -257,6 +653,8 @@ def generate_all_distributions(source_dir, output_dir, filenames):
         source_dir: Directory containing raw cleaned text files
         output_dir: Directory to save word distribution files
         filenames: List of filenames to process
+        num_processes: Worker processes (1 generates them in this process)
+        chunksize: Files per worker batch
 
     Returns:
         int: Number of files successfully generated
@@ -271,22 +669,18 @@ def generate_all_distributions(source_dir, output_dir, filenames):
     print("="*60)
     print(f"Source: {source_dir}")
     print(f"Output: {output_dir}")
-    print(f"Files to process: {len(filenames)}\n")
-
-    for filename in tqdm(filenames, desc="Generating distributions"):
-        source_path = os.path.join(source_dir, filename)
-        output_path = os.path.join(output_dir, filename)
-
-        try:
-            if not os.path.exists(source_path):
-                failed.append((filename, "Source file not found"))
-                continue
-
-            df = generate_word_distribution(source_path, output_path)
+    print(f"Files to process: {len(filenames)}")
+    print(f"Processes: {num_processes}\n")
+
+    tasks = ((filename, os.path.join(source_dir, filename), os.path.join(output_dir, filename))
+             for filename in filenames)
+    # Results arrive in filename order, so failures are listed as in a serial run
+    for filename, error in map_in_order(generate_distribution_task, tasks, len(filenames),
+                                        "Generating distributions", num_processes, chunksize):
+        if error is None:
             successful += 1
-
-        except Exception as e:
-            failed.append((filename, str(e)))
+        else:
+            failed.append((filename, error))
 
     print(f"\n{'='*60}")
     print(f"Generation complete!")
@@ -302,6 +696,95 @@ def generate_all_distributions(source_dir, output_dir, filenames):
     return successful
 
 
+def score_text_task(args_tuple):
+    """
+    Fused distribution and scoring of one raw text file.
+
+    Returns:
+        tuple: (filename, scores, None) on success, (filename, None, error
+            message) on failure
+    """
+    filename, source_path, output_path = args_tuple
+    try:
+        if not os.path.exists(source_path):
+            return filename, None, "Source file not found"
+        df = word_distribution(source_path)
+        if output_path is not None:
+            df.to_csv(output_path)
+        df = as_read_from_csv(df)
+        return filename, [SCORING_METHODS[method](df, dict_df) for _, method, dict_df in worker_dictionaries], None
+    except Exception as e:
+        return filename, None, str(e)
+
+
+def score_all_texts(source_dir, filenames, simple_dicts, weighted_dicts, output_dir=None,
+                    num_processes=1, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Score raw cleaned text files directly, without the distribution CSV round trip.
+
+    Fuses generate_all_distributions() and score_all_volumes(): each text
+    is counted in memory and scored against every dictionary with the same
+    per-dictionary code, so scores are identical to generating the
+    distributions and then scoring them. The distribution CSVs are only
+    written when output_dir is given.
+
+    Args:
+        source_dir: Directory containing raw cleaned text files
+        filenames: List of filenames to process
+        simple_dicts: Dictionary of simple (unweighted) dictionaries
+        weighted_dicts: Dictionary of weighted dictionaries
+        output_dir: Also save the word distribution files here (default: not saved)
+        num_processes: Worker processes (1 scores them in this process)
+        chunksize: Files per worker batch
+
+    Returns:
+        DataFrame: Results with filename as index and score columns, for the
+            files that could be read, in filenames order
+    """
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    dictionaries = register_dictionaries(simple_dicts, weighted_dicts)
+
+    print("\n" + "="*60)
+    print("SCORING RAW TEXT (FUSED)")
+    print("="*60)
+    print(f"Source: {source_dir}")
+    print(f"Distributions: {output_dir if output_dir is not None else 'not saved'}")
+    print(f"Files to process: {len(filenames)}, {len(dictionaries)} dictionaries")
+    print(f"Processes: {num_processes}\n")
+
+    tasks = ((filename, os.path.join(source_dir, filename),
+              os.path.join(output_dir, filename) if output_dir is not None else None)
+             for filename in filenames)
+    scored, scores, failed = [], [], []
+    for filename, volume_scores, error in map_in_order(score_text_task, tasks, len(filenames), "Scoring texts",
+                                                       num_processes, chunksize, init_scoring_worker,
+                                                       (dictionaries,)):
+        if error is None:
+            scored.append(filename)
+            scores.append(volume_scores)
+        else:
+            failed.append((filename, error))
+
+    results = pd.DataFrame(index=scored)
+    results.index.name = 'Filename'
+    for column, (dict_name, _, _) in enumerate(dictionaries):
+        results[dict_name] = [float(volume_scores[column]) for volume_scores in scores]
+
+    print(f"\n{'='*60}")
+    print(f"Scoring complete!")
+    print(f"  Successful: {len(scored)}/{len(filenames)}")
+    if failed:
+        print(f"  Failed: {len(failed)}")
+        for fname, error in failed[:5]:
+            print(f"    - {fname}: {error}")
+        if len(failed) > 5:
+            print(f"    ... and {len(failed) - 5} more")
+    print("="*60)
+
+    return results
+
+
 def get_prob_df():
     """
     Load index of all volume word distribution files.
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the Sentiment Scorer
+
+Checks the optimized scoring paths against the original per-dictionary loop
+on the small fixture in sample_data/: raw texts, their word distributions
+(generated by the original notebook code) and tiny simple and weighted
+dictionaries, with duplicate stems and words pandas reads as NaN.
+"""
+
+import filecmp
+import sys
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+
+# Add parent directory to path to import the scorer
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sentiment_scorer import (
+    as_read_from_csv,
+    build_doc_term_matrix,
+    count_words,
+    save_doc_term_matrix,
+    load_doc_term_matrix,
+    generate_all_distributions,
+    read_distribution,
+    score_all_texts,
+    score_all_volumes,
+    score_volume_simple,
+    score_volume_weighted,
+    word_distribution,
+)
+
+try:
+    import scipy
+except ImportError:
+    scipy = None
+
+
+SAMPLE_DATA = Path(__file__).parent / "sample_data"
+
+
+def load_sample_dictionaries():
+    """Simple and weighted dictionaries of sample_data, indexed by word as load_dictionaries() leaves them"""
+    path = SAMPLE_DATA / 'dictionaries'
+    simple_dicts = {name: pd.read_csv(path / f'{name.lower()}.csv').set_index('word')
+                    for name in ('Progress', 'Optimism')}
+    weighted_dicts = {'Industrial': pd.read_csv(path / 'industrial.csv').set_index('word')}
+    return simple_dicts, weighted_dicts
+
+
+def sample_ids():
+    """The sample distributions as get_prob_df() lists them, in reverse name order"""
+    names = sorted((path.name for path in (SAMPLE_DATA / 'distributions').iterdir()), reverse=True)
+    return pd.DataFrame({'Filename': names, 'Path': [str(SAMPLE_DATA / 'distributions' / name) for name in names]},
+                        index=pd.Index(names, name='HTID'))
+
+
+def groupby_word_distribution(raw_text_path):
+    """The original word distribution: a one-row-per-word DataFrame grouped by word"""
+    with open(raw_text_path, 'rb') as f:
+        raw = f.read().decode('utf-8')
+    df = pd.DataFrame(raw.split(), columns=['word'])
+    df['count'] = 1
+    df = df.groupby('word').sum().sort_values('count', ascending=False)
+    df = df[df['count'] > 1]
+    df['pct'] = df['count'] / df['count'].sum()
+    df['total_words'] = df['count'].sum()
+    return df
+
+
+def score_per_dictionary(DF_ids, simple_dicts, weighted_dicts):
+    """The original score_all_volumes(): every volume is read again for each dictionary"""
+    results = pd.DataFrame(index=DF_ids['Filename'].tolist())
+    results.index.name = 'Filename'
+    for dict_name, dict_df in simple_dicts.items():
+        results[dict_name] = [score_volume_simple(path, dict_df) for path in DF_ids['Path']]
+    for dict_name, dict_df in weighted_dicts.items():
+        results[dict_name] = [score_volume_weighted(path, dict_df) for path in DF_ids['Path']]
+    return results
+
+
+class TestScoreAllVolumes(unittest.TestCase):
+    """Single-pass, process pool and sparse scoring agree with the per-dictionary loop"""
+
+    def setUp(self):
+        self.simple_dicts, self.weighted_dicts = load_sample_dictionaries()
+        self.ids = sample_ids()
+        self.expected = score_per_dictionary(self.ids, self.simple_dicts, self.weighted_dicts)
+
+    def test_fixture_exercises_matches(self):
+        """Every dictionary matches some volume; a volume without repeated words scores 0, or NaN weighted"""
+        self.assertTrue((self.expected > 0).any().all())
+        self.assertEqual(self.expected.loc['vol.empty.txt', 'Progress'], 0)
+        self.assertTrue(pd.isna(self.expected.loc['vol.empty.txt', 'Industrial']))
+
+    def test_single_pass_is_exact(self):
+        results = score_all_volumes(self.ids, self.simple_dicts, self.weighted_dicts)
+        pd.testing.assert_frame_equal(results, self.expected, check_exact=True)
+
+    def test_process_pool_is_exact(self):
+        """Rows keep DF_ids order whatever the chunking"""
+        for chunksize in (1, 2, 64):
+            with self.subTest(chunksize=chunksize):
+                results = score_all_volumes(self.ids, self.simple_dicts, self.weighted_dicts,
+                                            num_processes=2, chunksize=chunksize)
+                pd.testing.assert_frame_equal(results, self.expected, check_exact=True)
+
+    @unittest.skipIf(scipy is None, "scipy is not installed")
+    def test_sparse_engine_matches(self):
+        """The sparse engine agrees to floating-point precision, with or without a prebuilt matrix"""
+        results = score_all_volumes(self.ids, self.simple_dicts, self.weighted_dicts, engine='sparse')
+        self.assertEqual(results.index.tolist(), self.ids['Filename'].tolist())
+        pd.testing.assert_frame_equal(results, self.expected, check_exact=False, rtol=1e-12, atol=1e-15)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            save_doc_term_matrix(build_doc_term_matrix(self.ids['Path'], num_processes=2, chunksize=1), tmp)
+            results = score_all_volumes(self.ids, self.simple_dicts, self.weighted_dicts, engine='sparse',
+                                        doc_term=load_doc_term_matrix(tmp))
+        pd.testing.assert_frame_equal(results, self.expected, check_exact=False, rtol=1e-12, atol=1e-15)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            score_all_volumes(self.ids, self.simple_dicts, self.weighted_dicts, engine='dense')
+
+
+class TestFusedScoring(unittest.TestCase):
+    """score_all_texts() equals generating the distributions and then scoring them"""
+
+    def setUp(self):
+        self.simple_dicts, self.weighted_dicts = load_sample_dictionaries()
+        self.filenames = sorted(path.name for path in (SAMPLE_DATA / 'raw').iterdir())
+
+    def test_fixture_has_csv_na_words(self):
+        """Words read_csv turns into NaN, and a volume whose words it reads as numbers"""
+        words = read_distribution(SAMPLE_DATA / 'distributions' / 'vol.industri.txt').index
+        self.assertGreaterEqual(int(words.isna().sum()), 4)
+        self.assertEqual(read_distribution(SAMPLE_DATA / 'distributions' / 'vol.numbers.txt').index.dtype, float)
+
+    def test_as_read_from_csv(self):
+        for filename in self.filenames:
+            with self.subTest(filename=filename), tempfile.TemporaryDirectory() as tmp:
+                generate_all_distributions(SAMPLE_DATA / 'raw', tmp, [filename])
+                expected = read_distribution(Path(tmp) / filename)
+                restored = as_read_from_csv(read_distribution(SAMPLE_DATA / 'distributions' / filename))
+                if len(expected):
+                    pd.testing.assert_frame_equal(restored, expected, check_exact=True)
+
+    def test_matches_generate_then_score(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            generated, fused = Path(tmp) / 'generated', Path(tmp) / 'fused'
+            generate_all_distributions(SAMPLE_DATA / 'raw', generated, self.filenames)
+            ids = pd.DataFrame({'Filename': self.filenames, 'Path': [str(generated / name) for name in self.filenames]})
+            expected = score_all_volumes(ids, self.simple_dicts, self.weighted_dicts)
+            self.assertTrue((expected.loc['vol.industri.txt', ['Progress', 'Industrial']] > 0).all())
+
+            for num_processes in (1, 2):
+                with self.subTest(num_processes=num_processes):
+                    results = score_all_texts(SAMPLE_DATA / 'raw', self.filenames + ['missing.txt'],
+                                              self.simple_dicts, self.weighted_dicts, output_dir=fused,
+                                              num_processes=num_processes, chunksize=1)
+                    pd.testing.assert_frame_equal(results, expected, check_exact=True)
+                    for name in self.filenames:
+                        self.assertTrue(filecmp.cmp(generated / name, fused / name, shallow=False), name)
+
+
+class TestWordDistribution(unittest.TestCase):
+    """The streamed Counter build equals the original groupby, whatever the read size"""
+
+    CHUNK_SIZES = (1, 2, 3, 5, 64, 1 << 20)
+
+    def setUp(self):
+        self.paths = sorted((SAMPLE_DATA / 'raw').iterdir())
+
+    def test_fixture_edge_cases(self):
+        """Count ties, multi-byte characters and whitespace, an empty file and an all-singleton file"""
+        raw = {path.name: path.read_bytes() for path in self.paths}
+        self.assertEqual(raw['vol.empty.txt'], b'')
+        self.assertEqual(set(Counter(raw['vol.singletons.txt'].split()).values()), {1})
+        self.assertIn('\u3000'.encode('utf8'), raw['vol.unicode.txt'])
+        self.assertIn('\U0001d4d2'.encode('utf8'), raw['vol.unicode.txt'])
+        counts = groupby_word_distribution(SAMPLE_DATA / 'raw' / 'vol.industri.txt')['count']
+        self.assertGreater(counts.duplicated().sum(), 5)
+
+    def test_count_words(self):
+        for path in self.paths:
+            expected = Counter(path.read_bytes().decode('utf-8').split())
+            for chunk_size in self.CHUNK_SIZES:
+                with self.subTest(path=path.name, chunk_size=chunk_size):
+                    self.assertEqual(count_words(path, chunk_size), expected)
+
+    def test_matches_groupby(self):
+        """Same frame and byte-identical CSV, including the order of count ties"""
+        for path in self.paths:
+            expected = groupby_word_distribution(path)
+            for chunk_size in self.CHUNK_SIZES:
+                with self.subTest(path=path.name, chunk_size=chunk_size):
+                    df = word_distribution(path, chunk_size)
+                    pd.testing.assert_frame_equal(df, expected, check_exact=True)
+                    self.assertEqual(df.to_csv(), expected.to_csv())
+
+    def test_matches_sample_distributions(self):
+        """The checked-in distributions were written by the original code"""
+        for path in self.paths:
+            with self.subTest(path=path.name):
+                self.assertEqual(word_distribution(path).to_csv(),
+                                 (SAMPLE_DATA / 'distributions' / path.name).read_text(encoding='utf8'))
+
+
+def run_tests():
+    """Run all tests and return results"""
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    suite.addTests(loader.loadTestsFromTestCase(TestWordDistribution))
+    suite.addTests(loader.loadTestsFromTestCase(TestScoreAllVolumes))
+    suite.addTests(loader.loadTestsFromTestCase(TestFusedScoring))
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    return result.wasSuccessful()
+
+
+if __name__ == '__main__':
+    success = run_tests()
+    sys.exit(0 if success else 1)